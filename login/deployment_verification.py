@@ -99,6 +99,55 @@ def check_database():
         print(f"❌ Database error: {e}")
         return False
 
+def check_database_profile():
+    """Report the active database profile and its tuning"""
+    print("\n🔍 Checking database profile...")
+
+    try:
+        from django.conf import settings
+        from django.db import connection
+
+        profile = getattr(settings, 'DB_PROFILE', 'unknown')
+        db = settings.DATABASES['default']
+        print(f"Active profile: {profile} ({db['ENGINE']})")
+
+        if connection.vendor == 'sqlite':
+            expected = getattr(settings, 'SQLITE_PRAGMAS', {})
+            all_good = True
+            with connection.cursor() as cursor:
+                for pragma, wanted in expected.items():
+                    cursor.execute(f"PRAGMA {pragma}")
+                    actual = cursor.fetchone()[0]
+                    # journal_mode/temp_store come back lower-case or numeric
+                    ok = str(actual).lower() == str(wanted).lower() or (pragma, actual) in (
+                        ('synchronous', 1), ('temp_store', 2),
+                    )
+                    print(f"{'✅' if ok else '⚠️ '} {pragma} = {actual} (wanted {wanted})")
+                    all_good = all_good and ok
+            print(f"✅ transaction_mode = {db['OPTIONS'].get('transaction_mode', 'DEFERRED')}")
+            return all_good
+
+        if connection.vendor == 'postgresql':
+            pool = db.get('OPTIONS', {}).get('pool')
+            if pool:
+                print(f"✅ psycopg connection pool: {pool}")
+            else:
+                print(f"✅ Persistent connections: CONN_MAX_AGE={db.get('CONN_MAX_AGE')}, "
+                      f"health checks {'on' if db.get('CONN_HEALTH_CHECKS') else 'off'}")
+                if not db.get('CONN_MAX_AGE'):
+                    print("⚠️  CONN_MAX_AGE is 0 and no pool is configured - every request reconnects")
+            with connection.cursor() as cursor:
+                cursor.execute("SHOW server_version")
+                print(f"✅ PostgreSQL {cursor.fetchone()[0]}")
+            return True
+
+        print(f"⚠️  No tuning checks for {connection.vendor}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Database profile error: {e}")
+        return False
+
 def check_static_files():
     """Check static files configuration"""
     print("\n🔍 Checking static files...")
@@ -165,6 +214,7 @@ def main():
         check_requirements,
         check_django_configuration,
         check_database,
+        check_database_profile,
         check_static_files,
         check_wsgi_config
     ]
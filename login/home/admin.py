@@ -1,3 +1,102 @@
 from django.contrib import admin
 
-# Register your models here.
+from .booking import cancel_booking
+from .models import Booking, BookingEvent, Contact, Notification, Register, RouteDailyStats, SeatHold, TravelOption
+
+
+@admin.register(TravelOption)
+class TravelOptionAdmin(admin.ModelAdmin):
+    list_display = ('travel_id', 'type', 'source', 'destination', 'date_time', 'price', 'available_seats')
+    list_filter = ('type',)
+    search_fields = ('source', 'destination')
+    date_hierarchy = 'date_time'
+
+
+@admin.register(Booking)
+class BookingAdmin(admin.ModelAdmin):
+    # Read-only: bookings change only through home/booking.py, which moves
+    # the seats and keeps route stats, events and the route cache in step.
+    list_display = ('booking_id', 'user', 'travel_option', 'number_of_seats', 'total_price', 'status', 'booking_date')
+    list_filter = ('status',)
+    list_select_related = ('user', 'travel_option')
+    actions = ('cancel_bookings',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def has_cancel_permission(self, request):
+        return request.user.has_perm('home.change_booking')
+
+    @admin.action(description="Cancel selected bookings", permissions=('cancel',))
+    def cancel_bookings(self, request, queryset):
+        cancelled = sum(
+            cancel_booking(booking)
+            for booking in queryset.filter(status='Confirmed').select_related('travel_option')
+        )
+        self.message_user(request, f"Cancelled {cancelled} booking(s).")
+
+
+@admin.register(SeatHold)
+class SeatHoldAdmin(admin.ModelAdmin):
+    # Status changes must go through home/holds.py, which moves the seats.
+    list_display = ('hold_id', 'user', 'travel_option', 'seats', 'status', 'expires_at')
+    list_filter = ('status',)
+    list_select_related = ('user', 'travel_option')
+    raw_id_fields = ('user', 'travel_option')
+    readonly_fields = ('status',)
+
+
+@admin.register(BookingEvent)
+class BookingEventAdmin(admin.ModelAdmin):
+    # Append-only log written by home/booking.py and home/holds.py.
+    list_display = ('event_id', 'kind', 'booking_id', 'user_id', 'travel_option_id', 'seats', 'amount', 'created_at')
+    list_filter = ('kind',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    # Sent by `manage.py dispatch_notifications`. To resend a failed one, set it back to Pending with 0 attempts.
+    list_display = ('id', 'subject', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('recipient', 'key')
+    readonly_fields = ('key', 'recipient', 'subject', 'body', 'last_error', 'created_at', 'sent_at')
+
+
+@admin.register(Register)
+class RegisterAdmin(admin.ModelAdmin):
+    list_display = ('id', 'username', 'email')
+    search_fields = ('username', 'email')
+    exclude = ('password',)
+
+
+@admin.register(Contact)
+class ContactAdmin(admin.ModelAdmin):
+    list_display = ('fullname', 'email', 'date')
+    search_fields = ('fullname', 'email')
+
+
+@admin.register(RouteDailyStats)
+class RouteDailyStatsAdmin(admin.ModelAdmin):
+    # Derived data: rebuild it with `manage.py rebuild_route_stats`, never edit it.
+    list_display = ('day', 'type', 'source', 'destination', 'departures', 'capacity', 'bookings', 'seats_booked', 'revenue')
+    list_filter = ('type',)
+    search_fields = ('source', 'destination')
+    date_hierarchy = 'day'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
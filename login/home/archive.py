@@ -0,0 +1,127 @@
+"""
+Archival of departed trips.
+
+``archive_batch`` moves a bounded batch of TravelOptions that departed
+before a cutoff, with all their Bookings, into ArchivedTravelOption and
+ArchivedBooking, in one transaction per batch. The hot tables keep only
+current and upcoming departures, so they and their indexes stay small.
+Run it with ``manage.py archive_departures``.
+
+Archived rows keep their ids. Booking history reads both tables through
+``booking_history_page`` / ``booking_history_rows``, merging two keyset
+queries newest-first.
+
+Route stats for archived days are left as they are: they are final, and
+``route_stats.rebuild`` never recomputes days that have been archived.
+"""
+
+import heapq
+import itertools
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedBooking, ArchivedTravelOption, Booking, SeatHold, TravelOption
+
+OPTION_FIELDS = ('travel_id', 'type', 'source', 'destination', 'date_time', 'price', 'available_seats')
+BOOKING_FIELDS = ('booking_id', 'user_id', 'travel_option_id', 'number_of_seats', 'total_price', 'booking_date', 'status')
+TRAVEL_TYPES = [choice for choice, _ in TravelOption.TRAVEL_TYPES]
+
+
+def default_cutoff():
+    """Start of the local day ARCHIVE_AFTER_DAYS ago; whole days are archived at once."""
+    day = timezone.localdate() - timedelta(days=getattr(settings, 'ARCHIVE_AFTER_DAYS', 30))
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def archive_batch(cutoff, batch_size=500):
+    """
+    Archive up to ``batch_size`` TravelOptions departing before ``cutoff``,
+    with their bookings. Returns ``(options, bookings)`` moved.
+    """
+    with transaction.atomic():
+        # type IN (...) lets the (type, date_time) index find departed rows.
+        # Oldest first: route stats treat every day up to the latest archived
+        # departure as final, so a stopped run must not leave earlier days behind.
+        ids = list(
+            TravelOption.objects.filter(type__in=TRAVEL_TYPES, date_time__lt=cutoff)
+            .order_by('date_time', 'travel_id')
+            .values_list('travel_id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0, 0
+        ArchivedTravelOption.objects.bulk_create([
+            ArchivedTravelOption(**row) for row in TravelOption.objects.filter(travel_id__in=ids).values(*OPTION_FIELDS)
+        ])
+        bookings = ArchivedBooking.objects.bulk_create([
+            ArchivedBooking(**row) for row in Booking.objects.filter(travel_option_id__in=ids).values(*BOOKING_FIELDS)
+        ], batch_size=1000)
+
+        # Raw deletes: the rows are moving, not going away, so the delete
+        # signals (stats recount, cache eviction) must not run, and nothing
+        # needs loading just to cascade. Holds on departed trips are spent.
+        SeatHold.objects.filter(travel_option_id__in=ids)._raw_delete(SeatHold.objects.db)
+        Booking.objects.filter(travel_option_id__in=ids)._raw_delete(Booking.objects.db)
+        TravelOption.objects.filter(travel_id__in=ids)._raw_delete(TravelOption.objects.db)
+    return len(ids), len(bookings)
+
+
+def _history_querysets(user_id, fields, before):
+    live = Booking.objects.filter(user_id=user_id)
+    archived = ArchivedBooking.objects.filter(user_id=user_id)
+    if before is not None:
+        live = live.filter(booking_id__lt=before)
+        archived = archived.filter(booking_id__lt=before)
+    return [
+        qs.select_related('travel_option').only(*fields).order_by('-booking_id')
+        for qs in (live, archived)
+    ]
+
+
+def _page(live, archived, page_size):
+    bookings = list(heapq.merge(live, archived, key=lambda b: b.booking_id, reverse=True))[:page_size + 1]
+    if len(bookings) > page_size:
+        return bookings[:page_size], bookings[page_size - 1].booking_id
+    return bookings, None
+
+
+def booking_history_page(user_id, fields, page_size, before=None):
+    """
+    One newest-first page of a user's live and archived bookings, loaded
+    with ``fields``, and the ``before`` id of the next page (or None).
+    """
+    live, archived = (list(qs[:page_size + 1]) for qs in _history_querysets(user_id, fields, before))
+    return _page(live, archived, page_size)
+
+
+async def abooking_history_page(user_id, fields, page_size, before=None):
+    live, archived = [
+        [booking async for booking in qs[:page_size + 1]]
+        for qs in _history_querysets(user_id, fields, before)
+    ]
+    return _page(live, archived, page_size)
+
+
+def booking_history_rows(user_id, fields, chunk_size=2000):
+    """A user's live and archived bookings as ``fields`` tuples, newest first, streamed."""
+    live, archived = (
+        model.objects.filter(user_id=user_id).order_by('-booking_id').values_list(*fields).iterator(chunk_size=chunk_size)
+        for model in (Booking, ArchivedBooking)
+    )
+    position = fields.index('booking_id')
+    return heapq.merge(live, archived, key=lambda row: row[position], reverse=True)
+
+
+async def abooking_history_rows(user_id, fields, chunk_size=2000):
+    """
+    Async ``booking_history_rows``, read ``chunk_size`` rows at a time on
+    the sync thread (``values_list().aiterator()`` queries on the event loop).
+    """
+    rows = booking_history_rows(user_id, fields, chunk_size)
+    next_chunk = sync_to_async(lambda: list(itertools.islice(rows, chunk_size)))
+    while chunk := await next_chunk():
+        for row in chunk:
+            yield row
@@ -0,0 +1,66 @@
+"""
+Static files for the ASGI deployment.
+
+WhiteNoiseMiddleware is sync-only. With it in MIDDLEWARE, Django under
+ASGI wraps the whole middleware chain in one thread-sensitive
+sync_to_async, so every request runs on a single shared thread and the
+async views gain nothing. Under ASGI (settings.ASGI) the middleware is
+left out, and login/asgi.py wraps the application in StaticFilesApp
+instead. It serves the same files with the same headers (hashed names
+cached for a year, precompressed variants picked from Accept-Encoding)
+from WhiteNoise's file table, and reads them off the event loop.
+"""
+
+from asgiref.sync import sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StaticFilesApp:
+
+    def __init__(self, application):
+        self.application = application
+        # Only WhiteNoise's settings and file table are used, never its request handling.
+        self.whitenoise = WhiteNoiseMiddleware()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            static_file = self._find(scope)
+            if static_file is not None:
+                await self._serve(static_file, scope, send)
+                return
+        await self.application(scope, receive, send)
+
+    def _find(self, scope):
+        path, root = scope['path'], scope.get('root_path', '')
+        if root and path.startswith(root):
+            path = path[len(root):]
+        if self.whitenoise.autorefresh:
+            return self.whitenoise.find_file(path)
+        return self.whitenoise.files.get(path)
+
+    async def _serve(self, static_file, scope, send):
+        # WhiteNoise reads request headers in their WSGI environ form.
+        environ = {
+            'HTTP_' + name.decode('latin-1').upper().replace('-', '_'): value.decode('latin-1')
+            for name, value in scope['headers']
+        }
+        response = static_file.get_response(scope['method'], environ)
+        await send({
+            'type': 'http.response.start',
+            'status': int(response.status),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers],
+        })
+        if response.file is None:
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        read = sync_to_async(response.file.read, thread_sensitive=False)
+        try:
+            while True:
+                chunk = await read(CHUNK_SIZE)
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': bool(chunk)})
+                if not chunk:
+                    break
+        finally:
+            response.file.close()
@@ -0,0 +1,191 @@
+"""
+Async versions of the hot views, used when the project runs under ASGI
+(``settings.ASYNC_VIEWS``). They mirror the sync views in ``views.py``: DB
+access goes through the async ORM, and work that needs a transaction, burns
+CPU or blocks on files (seat reservation, password hashing, the contact
+spool) is handed to a thread.
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.urls import reverse
+
+from . import login_throttle
+from .archive import abooking_history_page, abooking_history_rows
+from .booking import BookingError, book_seats
+from .hashers import acheck_password, amake_password
+from .models import Register
+from .route_cache import route_options
+from .search import SearchError, asearch_travel_options, parse_search_params
+from .views import (
+    EXPORT_CHUNK_SIZE, EXPORT_FIELDS, LOGIN_THROTTLED_MESSAGE, MY_BOOKINGS_FIELDS, MY_BOOKINGS_PAGE_SIZE,
+    export_encoder, parse_cursor, parse_day, parse_int, submit_contact_form,
+)
+
+
+# Register
+async def Register_view(request):
+    if request.method == "POST":
+        username = request.POST.get("username")
+        email = request.POST.get("email")
+        password = request.POST.get("password")
+        confirm_password = request.POST.get("confirm_password")
+
+        if password != confirm_password:
+            return render(request, 'register.html', {'error': "Passwords do not match"})
+        if await Register.objects.filter(username=username).aexists():
+            return render(request, 'register.html', {'error': "Username already exists"})
+        if await Register.objects.filter(email=email).aexists():
+            return render(request, 'register.html', {'error': "Email already exists"})
+
+        # Hash only once the cheap checks have passed.
+        await Register.objects.acreate(username=username, email=email, password=await amake_password(password))
+        return redirect("home")
+
+    return render(request, "register.html")
+
+
+# Login
+async def Login_view(request):
+    if request.method == "POST":
+        email = request.POST.get('email')
+        password = request.POST.get('password')
+        remember_me = request.POST.get('remember_me') == 'on'
+
+        # Refuse throttled attempts before any lookup or hashing.
+        if await sync_to_async(login_throttle.blocked)(request, email):
+            return render(request, 'login.html', {'error': LOGIN_THROTTLED_MESSAGE}, status=429)
+
+        user = await Register.objects.filter(email=email).afirst()
+        if user is None:
+            await sync_to_async(login_throttle.failed)(request, email)
+            return render(request, 'login.html', {'error': "Invalid credentials"})
+
+        valid, new_hash = await acheck_password(password, user.password)
+        if not valid:
+            await sync_to_async(login_throttle.failed)(request, email)
+            return render(request, 'login.html', {'error': "Invalid credentials"})
+        await sync_to_async(login_throttle.succeeded)(request, email)
+        if new_hash:
+            await Register.objects.filter(pk=user.pk).aupdate(password=new_hash)
+
+        await request.session.aset('user_id', user.id)
+        # Session expiry: 30 days, or until the browser closes
+        await request.session.aset_expiry(2592000 if remember_me else 0)
+        return redirect('home')
+
+    return render(request, 'login.html')
+
+
+# Home
+async def home_view(request):
+    user = await request.atraveler()
+    if not user:
+        await request.session.aflush()
+        return redirect('login')
+    return render(request, 'home.html', {'user': user})
+
+
+async def book_view(request):
+    user = await request.atraveler()
+    if not user:
+        return redirect('login')
+
+    if request.method == "POST":
+        try:
+            travel_id = parse_int(request.POST.get("travel_id"))
+            seats = parse_int(request.POST.get("seats", 1))
+        except (TypeError, ValueError):
+            return render(request, "book.html", {"error": "❌ Invalid booking request"}, status=400)
+
+        try:
+            # The seat reservation needs a transaction, which the async ORM lacks.
+            booking = await sync_to_async(book_seats)(user, travel_id, seats)
+        except BookingError as e:
+            return render(request, "book.html", {"error": f"❌ {e}"})
+        return render(request, "book.html", {"success": f"✅ Booking #{booking.booking_id} confirmed for {seats} seat(s)!"})
+
+    context = {"params": request.GET}
+    if request.GET.get("from_station") and request.GET.get("to_station"):
+        journey_date = parse_day(request.GET.get("journey_date"))
+        transport_type = request.GET.get("transport_type")
+        if not journey_date:
+            context["error"] = "❌ Invalid journey date"
+        else:
+            options = await sync_to_async(route_options)(
+                request.GET["from_station"].strip(), request.GET["to_station"].strip(), journey_date,
+            )
+            context["options"] = [
+                option for option in options
+                if not transport_type or option["type"] == transport_type
+            ]
+    return render(request, "book.html", context)
+
+
+async def my_bookings_view(request):
+    user = await request.atraveler()
+    if not user:
+        return redirect('login')
+
+    bookings, next_before = await abooking_history_page(
+        user.id, MY_BOOKINGS_FIELDS, MY_BOOKINGS_PAGE_SIZE, parse_cursor(request.GET.get('before')),
+    )
+
+    return render(request, "my_bookings.html", {"bookings": bookings, "user": user, "next_before": next_before})
+
+
+async def export_bookings_view(request):
+    user = await request.atraveler()
+    if not user:
+        return redirect('login')
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return JsonResponse({'error': "format must be csv or ndjson"}, status=400)
+
+    content_type, header, encode = export_encoder(export_format)
+
+    async def lines():
+        # Under ASGI a sync iterator would be read whole into memory before
+        # the first byte is sent; an async one streams.
+        for line in header:
+            yield line
+        async for row in abooking_history_rows(user.id, EXPORT_FIELDS, chunk_size=EXPORT_CHUNK_SIZE):
+            yield encode(row)
+
+    response = StreamingHttpResponse(lines(), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="bookings.{export_format}"'
+    return response
+
+
+async def contact_view(request):
+    if request.method == "POST":
+        # Spooling is a small blocking file append plus cache calls.
+        await sync_to_async(submit_contact_form)(request)
+
+    return redirect(reverse("home") + "#contact")
+
+
+# Travel search
+async def travel_search_view(request):
+    context = {'params': request.GET}
+    if request.GET:
+        try:
+            options, next_cursor = await asearch_travel_options(**parse_search_params(request.GET))
+            context['options'] = options
+            if next_cursor:
+                query = request.GET.copy()
+                query['cursor'] = next_cursor
+                context['next_query'] = query.urlencode()
+        except SearchError as e:
+            context['error'] = str(e)
+    return render(request, "search.html", context)
+
+
+async def travel_search_api(request):
+    try:
+        options, next_cursor = await asearch_travel_options(**parse_search_params(request.GET))
+    except SearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'results': options, 'next_cursor': next_cursor})
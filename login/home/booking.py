@@ -0,0 +1,231 @@
+"""
+Seat inventory for TravelOption bookings.
+
+Seats are taken with a single conditional UPDATE
+(``available_seats = available_seats - n WHERE available_seats >= n AND
+date_time > now``) inside the same transaction that creates the Booking, so
+two requests racing for the last seat can never both succeed, the counter can
+never go negative and a departed trip cannot be booked. The same transaction
+appends the change to the BookingEvent log (home/events.py).
+
+Group bookings (``book_group``) lock their TravelOption rows in travel_id
+order, so two overlapping groups always queue on the same row first instead
+of deadlocking, and then take every seat in one UPDATE and create every
+Booking in one INSERT.
+"""
+
+import random
+import time
+from functools import wraps
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from .events import BOOKED, CANCELLED, append as append_events
+from .itinerary import record_changes as record_itinerary_changes
+from .models import MAX_INTEGER, Booking, TravelOption
+from .route_cache import invalidate_route, invalidate_travel_option
+from .route_stats import KEY_FIELDS, record_booking, record_cancellation, stats_key
+
+LOCK_RETRIES = 8
+LOCK_BACKOFF = 0.01  # seconds, doubled on every retry
+
+
+class BookingError(Exception):
+    pass
+
+
+class NotEnoughSeats(BookingError):
+    pass
+
+
+class GroupBookingError(BookingError):
+    """An atomic group booking was refused; ``results`` says which items failed."""
+
+    def __init__(self, message, results):
+        super().__init__(message)
+        self.results = results
+
+
+def _is_locked(exc):
+    return 'database is locked' in str(exc) or 'database table is locked' in str(exc)
+
+
+def retry_on_locked(func):
+    """
+    Retry a write that failed because SQLite could not get the write lock.
+
+    The post-commit hooks of these writes are registered ``robust``: one that
+    fails (say, a cache eviction whose route lookup hits the lock) is logged
+    rather than raised, so it can never make this repeat a committed write.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        delay = LOCK_BACKOFF
+        for attempt in range(LOCK_RETRIES):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                # Inside an outer transaction the whole unit has to be retried
+                # by the caller, not just this statement.
+                if not _is_locked(e) or connection.in_atomic_block or attempt == LOCK_RETRIES - 1:
+                    raise
+                time.sleep(delay + random.uniform(0, delay))
+                delay *= 2
+    return wrapper
+
+
+def refusal(travel_id, now):
+    """The error for a conditional seat UPDATE on ``travel_id`` that matched no row."""
+    departure = TravelOption.objects.filter(travel_id=travel_id).values_list('date_time', flat=True).first()
+    if departure is None:
+        return BookingError("Travel option not found")
+    if departure <= now:
+        return BookingError("This trip has already departed")
+    return NotEnoughSeats("Not enough seats available")
+
+
+@retry_on_locked
+def book_seats(user, travel_id, seats):
+    """Reserve ``seats`` on a travel option for ``user`` and return the Booking."""
+    if seats < 1:
+        raise BookingError("Seats must be at least 1")
+
+    now = timezone.now()
+    with transaction.atomic():
+        taken = TravelOption.objects.filter(
+            travel_id=travel_id, available_seats__gte=seats, date_time__gt=now,
+        ).update(available_seats=F('available_seats') - seats)
+        if not taken:
+            raise refusal(travel_id, now)
+
+        option = TravelOption.objects.values('price', 'type', 'source', 'destination', 'date_time').get(
+            travel_id=travel_id,
+        )
+        booking = Booking.objects.create(
+            user=user,
+            travel_option_id=travel_id,
+            number_of_seats=seats,
+            total_price=option.pop('price') * seats,
+        )
+        record_booking(stats_key(**option), seats, booking.total_price)
+        append_events(BOOKED, [booking])
+        return booking
+
+
+@retry_on_locked
+def cancel_booking(booking):
+    """Cancel a confirmed booking and hand its seats back. Returns False if it was already cancelled."""
+    with transaction.atomic():
+        # Flip the status conditionally so a double cancel cannot release seats twice.
+        cancelled = Booking.objects.filter(
+            booking_id=booking.booking_id, status='Confirmed',
+        ).update(status='Cancelled')
+        if not cancelled:
+            return False
+        TravelOption.objects.filter(travel_id=booking.travel_option_id).update(
+            available_seats=F('available_seats') + booking.number_of_seats,
+        )
+        option = booking.travel_option
+        record_cancellation(
+            stats_key(option.type, option.source, option.destination, option.date_time),
+            booking.number_of_seats, booking.total_price,
+        )
+        append_events(CANCELLED, [booking])
+        # Queryset updates skip post_save, so evict the route cache here.
+        transaction.on_commit(lambda: invalidate_travel_option(booking.travel_option_id), robust=True)
+    booking.status = 'Cancelled'
+    return True
+
+
+@retry_on_locked
+def book_group(user, items, partial=False):
+    """
+    Book a batch of ``(travel_id, seats)`` items for ``user`` in one transaction.
+
+    Returns one result dict per item, in order: ``status`` is ``'booked'``
+    (with ``booking_id`` and ``total_price``) or ``'rejected'`` (with
+    ``error``). By default the group is all or nothing: any rejection raises
+    GroupBookingError, whose results mark the other items ``'skipped'``.
+    With ``partial`` the bookable items are kept.
+    """
+    results = [{'travel_id': travel_id, 'seats': seats} for travel_id, seats in items]
+    now = timezone.now()
+    with transaction.atomic():
+        # Lock in travel_id order; on SQLite the transaction already holds the write lock.
+        # Ids no integer column can hold are simply not found.
+        ids = sorted({travel_id for travel_id, _ in items if -MAX_INTEGER <= travel_id <= MAX_INTEGER})
+        options = {
+            option['travel_id']: option
+            for option in TravelOption.objects.select_for_update().filter(travel_id__in=ids).order_by('travel_id')
+            .values('travel_id', 'price', 'available_seats', 'type', 'source', 'destination', 'date_time')
+        }
+
+        taken = {}
+        for result in results:
+            option = options.get(result['travel_id'])
+            if result['seats'] < 1:
+                result['error'] = "Seats must be at least 1"
+            elif option is None:
+                result['error'] = "Travel option not found"
+            elif option['date_time'] <= now:
+                result['error'] = "This trip has already departed"
+            elif option['available_seats'] - taken.get(option['travel_id'], 0) < result['seats']:
+                result['error'] = "Not enough seats available"
+            else:
+                taken[option['travel_id']] = taken.get(option['travel_id'], 0) + result['seats']
+                result['total_price'] = option['price'] * result['seats']
+        rejected = [result for result in results if 'error' in result]
+        for result in rejected:
+            result['status'] = 'rejected'
+        if rejected and not partial:
+            for result in results:
+                result.setdefault('status', 'skipped')
+            raise GroupBookingError(f"{len(rejected)} of {len(results)} bookings could not be made", results)
+        if not taken:
+            return results
+
+        # One UPDATE for every option, still conditional so seats can never go negative.
+        updated = TravelOption.objects.filter(
+            Q(*[Q(travel_id=travel_id, available_seats__gte=seats) for travel_id, seats in taken.items()], _connector=Q.OR),
+            date_time__gt=now,
+        ).update(available_seats=Case(
+            *[When(travel_id=travel_id, then=F('available_seats') - seats) for travel_id, seats in taken.items()],
+            default=F('available_seats'),
+            output_field=TravelOption._meta.get_field('available_seats'),
+        ))
+        if updated != len(taken):
+            raise BookingError("Seat availability changed during booking, please retry")
+
+        booked = [result for result in results if 'error' not in result]
+        bookings = Booking.objects.bulk_create([
+            Booking(user=user, travel_option_id=result['travel_id'], number_of_seats=result['seats'],
+                    total_price=result['total_price'])
+            for result in booked
+        ])
+        stats = {}
+        for result, booking in zip(booked, bookings):
+            result.update(status='booked', booking_id=booking.booking_id)
+            option = options[result['travel_id']]
+            key = tuple(stats_key(option['type'], option['source'], option['destination'], option['date_time']).values())
+            count, seats, revenue = stats.get(key, (0, 0, 0))
+            stats[key] = (count + 1, seats + result['seats'], revenue + result['total_price'])
+        # One stats row update per route and day, not per booking.
+        for key, (count, seats, revenue) in stats.items():
+            record_booking(dict(zip(KEY_FIELDS, key)), seats, revenue, bookings=count)
+        append_events(BOOKED, bookings)
+
+        # bulk_create skips post_save, so do the signal handlers' work here.
+        routes = {
+            (options[travel_id]['source'], options[travel_id]['destination'],
+             timezone.localdate(options[travel_id]['date_time']))
+            for travel_id in taken
+        }
+
+        def evict():
+            for route in routes:
+                invalidate_route(*route)
+            record_itinerary_changes(list(taken))
+        transaction.on_commit(evict, robust=True)
+    return results
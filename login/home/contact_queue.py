@@ -0,0 +1,201 @@
+"""
+Append-only spool for contact form submissions.
+
+The contact view only appends a JSON line to ``CONTACT_SPOOL_DIR/current.jsonl``;
+``manage.py drain_contact_queue`` later rotates that file aside and writes its
+rows to the Contact table with bulk_create. Per-IP rate limiting and a dedupe
+window for identical messages keep bursts of spam out of the spool.
+
+Submissions are checked against the Contact fields before they are spooled.
+A line the drain still cannot write (hand-edited, or spooled by an older
+version) is moved to ``rejected.jsonl`` rather than holding up its file.
+
+Delivery is at-least-once: if the drain crashes after committing a batch but
+before deleting its file, those rows are written again on the next run. Only
+one drain runs at a time (an flock on ``drain.lock`` in the spool directory);
+one started while another holds the lock (cron next to a --loop worker, say)
+returns at once and leaves the files to it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Contact
+from .ratelimit import hit
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on O_APPEND alone, and run a single drain
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CURRENT = 'current.jsonl'
+REJECTED = 'rejected.jsonl'
+DRAIN_LOCK = 'drain.lock'
+
+QUEUED = 'queued'
+DUPLICATE = 'duplicate'
+RATE_LIMITED = 'rate_limited'
+INVALID = 'invalid'
+
+
+def spool_dir():
+    path = Path(getattr(settings, 'CONTACT_SPOOL_DIR', settings.BASE_DIR / 'spool' / 'contact'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _lock(fd):
+    if fcntl:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+def append(record):
+    """Append one record to the live spool file."""
+    line = (json.dumps(record) + '\n').encode()
+    path = spool_dir() / CURRENT
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        try:
+            _lock(fd)
+            # The drain may have rotated the file between open() and the lock;
+            # if so, start again on the new live file.
+            try:
+                same_file = os.fstat(fd).st_ino == os.stat(path).st_ino
+            except FileNotFoundError:
+                same_file = False
+            if same_file:
+                os.write(fd, line)
+                return
+        finally:
+            os.close(fd)
+
+
+def clean(fullname, email, message):
+    """
+    The submission as Contact field values: stripped, the name and message
+    cut to length (CONTACT_MESSAGE_MAX_LENGTH for the message) and the email
+    validated. Raises ValidationError if a value is missing or the email is
+    not a valid address.
+    """
+    cleaned = {}
+    for name, value in (('fullname', fullname), ('email', email), ('message', message)):
+        field = Contact._meta.get_field(name)
+        if isinstance(value, str):
+            value = value.strip()
+            if name != 'email':  # a shortened address is someone else's
+                value = value[:field.max_length or getattr(settings, 'CONTACT_MESSAGE_MAX_LENGTH', 5000)]
+        cleaned[name] = field.clean(value, None)
+    return cleaned
+
+
+def submit(ip, fullname, email, message):
+    """Queue a contact message; returns QUEUED, DUPLICATE, RATE_LIMITED or INVALID."""
+    limit, window = getattr(settings, 'CONTACT_RATE_LIMIT', (5, 60))
+    if not hit('contact', ip, limit, window):
+        return RATE_LIMITED
+
+    try:
+        record = clean(fullname, email, message)
+    except ValidationError:
+        return INVALID
+
+    digest = hashlib.sha256(f"{record['email'].lower()}\x00{record['message']}".encode()).hexdigest()
+    if not cache.add(f"contact-dedupe:{digest}", 1, timeout=getattr(settings, 'CONTACT_DEDUPE_WINDOW', 600)):
+        return DUPLICATE
+
+    append({**record, 'date': timezone.now().isoformat()})
+    return QUEUED
+
+
+def rotate():
+    """Move the live spool file aside for draining and return every file awaiting a drain."""
+    directory = spool_dir()
+    current = directory / CURRENT
+    if current.exists():
+        current.rename(directory / f"batch-{time.time_ns()}-{os.getpid()}.jsonl")
+    return sorted(directory.glob('batch-*.jsonl'))
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        # Wait for a writer that opened the file just before the rotation.
+        _lock(f.fileno())
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def _contact(line):
+    """The Contact a spooled line describes. Raises ValueError, LookupError, TypeError or ValidationError."""
+    record = json.loads(line)
+    return Contact(
+        **clean(record['fullname'], record['email'], record['message']),
+        date=parse_datetime(record.get('date') or '') or timezone.now(),
+    )
+
+
+@contextmanager
+def _drain_lock():
+    """Take the drain lock without waiting; yields whether it was taken."""
+    fd = os.open(spool_dir() / DRAIN_LOCK, os.O_RDWR | os.O_CREAT, 0o640)
+    try:
+        if fcntl:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+        yield True
+    finally:
+        os.close(fd)  # releases the lock
+
+
+def drain(batch_size=500):
+    """
+    Write every spooled submission to the database; returns the number of
+    rows written. Lines that are not a valid submission go to REJECTED.
+    Returns 0 without reading anything while another drain is running.
+    """
+    with _drain_lock() as locked:
+        return _drain(batch_size) if locked else 0
+
+
+def _drain(batch_size):
+    written = 0
+    for path in rotate():
+        batch, rejected = [], []
+        with transaction.atomic():
+            for line in _read(path):
+                try:
+                    batch.append(_contact(line))
+                except (ValueError, LookupError, TypeError, ValidationError):
+                    rejected.append(line)
+                    continue
+                if len(batch) >= batch_size:
+                    Contact.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                Contact.objects.bulk_create(batch)
+                written += len(batch)
+        if rejected:
+            logger.warning("Moved %d unreadable contact submission(s) from %s to %s", len(rejected), path.name, REJECTED)
+            with open(path.parent / REJECTED, 'ab') as f:
+                f.write(b''.join(line + b'\n' for line in rejected))
+        path.unlink()
+    return written
@@ -0,0 +1,45 @@
+"""
+Template context processors for the home app.
+"""
+
+import hashlib
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.template.loader import get_template
+
+
+@lru_cache(maxsize=8)
+def _source_digest(path, mtime_ns):
+    with open(path, 'rb') as f:
+        return hashlib.md5(f.read(), usedforsecurity=False).hexdigest()[:12]
+
+
+def _template_version(template_name):
+    path = get_template(template_name).origin.name
+    return _source_digest(path, os.stat(path).st_mtime_ns)
+
+
+@lru_cache(maxsize=8)
+def _startup_version(template_name):
+    return _template_version(template_name)
+
+
+def template_fragments(request):
+    """
+    ``fragment_timeout`` and ``fragment_version`` for ``{% cache %}`` blocks.
+
+    The version is TEMPLATE_FRAGMENT_VERSION when set (e.g. the release tag),
+    otherwise a digest of home.html, so editing the template never serves
+    fragments rendered from the old one. Outside DEBUG the digest is taken
+    once per process, since the cached template loader only picks up an
+    edit on restart too; with DEBUG it follows edits as they are saved.
+    """
+    version = getattr(settings, 'TEMPLATE_FRAGMENT_VERSION', None)
+    if not version:
+        version = _template_version('home.html') if settings.DEBUG else _startup_version('home.html')
+    return {
+        'fragment_timeout': getattr(settings, 'TEMPLATE_FRAGMENT_TIMEOUT', 3600),
+        'fragment_version': version,
+    }
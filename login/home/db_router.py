@@ -0,0 +1,77 @@
+"""
+Read-replica routing.
+
+With replica aliases configured (DATABASE_REPLICAS, see settings), reads of
+the search and booking tables go to a replica and every write goes to the
+primary. The primary is still used for reads when:
+
+- the read runs inside a transaction on the primary (seat checks, locks);
+- the current request has already written to one of those tables, so a
+  request always sees its own writes;
+- the request carries the pin cookie that ReplicaPinMiddleware sets after
+  a write, so the page a form redirects to sees it too, whatever the
+  replication lag;
+- the read fills the shared route cache (home/route_cache.py asks for the
+  primary itself), so a stale replica can't outlive its lag in the cache.
+
+Every other model (sessions, users, holds, ...) always uses the primary.
+"""
+
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Models whose reads may be served by a replica.
+REPLICA_MODELS = {
+    'home.traveloption', 'home.booking', 'home.routedailystats',
+    'home.archivedtraveloption', 'home.archivedbooking',
+}
+
+# {'pinned': bool} for the request running in this context, None outside requests.
+# A mutable holder, so writes made in sync_to_async threads pin the request too.
+_request_state = contextvars.ContextVar('replica_request_state', default=None)
+
+
+def start_request(pinned=False):
+    """Begin tracking a request; returns the token for ``end_request``."""
+    return _request_state.set({'pinned': pinned, 'wrote': False})
+
+
+def end_request(token):
+    """Stop tracking the request and return whether it wrote to a replicated table."""
+    state = _request_state.get()
+    _request_state.reset(token)
+    return bool(state and state['wrote'])
+
+
+class ReplicaRouter:
+
+    def _replicas(self):
+        return getattr(settings, 'DATABASE_REPLICAS', [])
+
+    def db_for_read(self, model, **hints):
+        replicas = self._replicas()
+        if not replicas or model._meta.label_lower not in REPLICA_MODELS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        state = _request_state.get()
+        if state is not None and (state['pinned'] or state['wrote']):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None and model._meta.label_lower in REPLICA_MODELS:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication.
+        return db == DEFAULT_DB_ALIAS
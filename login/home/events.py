@@ -0,0 +1,136 @@
+"""
+Booking event outbox.
+
+Every booking and cancellation appends a BookingEvent in the same
+transaction as the change itself (``append``), so the log holds exactly the
+changes that committed, in order. Subsystems that need to follow bookings
+register a consumer instead of re-scanning the Booking table:
+
+    @events.consumer('welcome-mail')
+    def send_welcome_mail(batch):
+        ...
+
+``consume`` hands a consumer the events after its EventCheckpoint, oldest
+first, and moves the checkpoint in the same transaction as the handler
+runs. Database work done by a handler therefore happens exactly once;
+anything else it does (mail, HTTP calls) must cope with seeing an event
+again if the process dies mid-batch. A new consumer starts from the oldest
+event still kept. Run consumers with ``manage.py consume_booking_events``.
+
+That transaction holds the database write lock (SQLite allows a single
+writer), so bookings wait while a handler runs. A consumer with slow
+read-only work, such as rendering, registers it as ``prepare``; it runs
+before the transaction, and the handler gets its result:
+
+    @events.consumer('receipts', prepare=render_receipts)
+    def store_receipts(batch, receipts):
+        Receipt.objects.bulk_create(receipts)
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import BookingEvent, EventCheckpoint
+
+BOOKED = BookingEvent.BOOKED
+CANCELLED = BookingEvent.CANCELLED
+
+# consumer name -> handler(list of BookingEvent[, prepared])
+CONSUMERS = {}
+# consumer name -> prepare(list of BookingEvent), run outside the transaction
+PREPARERS = {}
+
+
+def consumer(name, prepare=None):
+    """
+    Register the decorated function as the handler of consumer ``name``.
+    If ``prepare`` is given, it is called with each batch before the write
+    transaction, and its result is passed to the handler.
+    """
+    def register(handler):
+        CONSUMERS[name] = handler
+        if prepare is None:
+            PREPARERS.pop(name, None)
+        else:
+            PREPARERS[name] = prepare
+        return handler
+    return register
+
+
+def append(kind, bookings):
+    """Log a ``kind`` event for each of ``bookings``. Call it inside the transaction that changed them."""
+    BookingEvent.objects.bulk_create([
+        BookingEvent(
+            kind=kind, booking_id=booking.booking_id, user_id=booking.user_id,
+            travel_option_id=booking.travel_option_id, seats=booking.number_of_seats,
+            amount=booking.total_price,
+        )
+        for booking in bookings
+    ])
+
+
+def _settled(events):
+    # SQLite commits one writer at a time, so ids become visible in order.
+    # Elsewhere a transaction can commit a lower id after a higher one has
+    # been read; leave the newest events until such transactions are done.
+    settle = getattr(settings, 'BOOKING_EVENT_SETTLE_SECONDS', 2)
+    if connection.vendor == 'sqlite' or not settle:
+        return events
+    return events.filter(created_at__lte=timezone.now() - timedelta(seconds=settle))
+
+
+def consume(name, batch_size=500):
+    """
+    Hand consumer ``name`` its next batch of at most ``batch_size`` events
+    and advance its checkpoint past them. Returns the number of events
+    handled; call again until it is below ``batch_size``.
+    """
+    handler, prepare = CONSUMERS[name], PREPARERS.get(name)
+    # Read and prepare the batch before taking the write lock.
+    position = EventCheckpoint.objects.filter(consumer=name).values_list('position', flat=True).first() or 0
+    batch = list(
+        _settled(BookingEvent.objects.filter(event_id__gt=position))
+        .order_by('event_id')[:batch_size]
+    )
+    if not batch:
+        return 0
+    prepared = prepare(batch) if prepare else None
+    with transaction.atomic():
+        # The row lock keeps two workers of one consumer off the same batch.
+        checkpoint, _ = EventCheckpoint.objects.select_for_update().get_or_create(consumer=name)
+        if checkpoint.position != position:
+            return 0  # another worker handled this batch meanwhile and carries on from here
+        if prepare:
+            handler(batch, prepared)
+        else:
+            handler(batch)
+        checkpoint.position = batch[-1].event_id
+        checkpoint.save(update_fields=['position', 'updated_at'])
+    return len(batch)
+
+
+def consume_all(name, batch_size=500):
+    """Consume batches until consumer ``name`` has caught up. Returns the total handled."""
+    total = 0
+    while True:
+        handled = consume(name, batch_size)
+        total += handled
+        if handled < batch_size:
+            return total
+
+
+def prune(older_than):
+    """
+    Delete events created before ``older_than`` that every registered
+    consumer has handled. Returns the number of events deleted.
+    """
+    events = BookingEvent.objects.filter(created_at__lt=older_than)
+    if CONSUMERS:
+        positions = list(EventCheckpoint.objects.filter(consumer__in=CONSUMERS).values_list('position', flat=True))
+        if len(positions) < len(CONSUMERS):
+            return 0  # a consumer that has never run still needs every event
+        events = events.filter(event_id__lte=min(positions))
+    return events.delete()[0]
@@ -0,0 +1,81 @@
+"""
+Password hashers whose cost parameters come from settings.
+
+They keep Django's algorithm names, so existing hashes still verify and any
+hash made with different parameters is upgraded on the next login (see
+``Login_view``).
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+    check_password,
+    make_password,
+)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = getattr(settings, 'PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    work_factor = getattr(settings, 'SCRYPT_WORK_FACTOR', ScryptPasswordHasher.work_factor)
+    block_size = getattr(settings, 'SCRYPT_BLOCK_SIZE', ScryptPasswordHasher.block_size)
+    parallelism = getattr(settings, 'SCRYPT_PARALLELISM', ScryptPasswordHasher.parallelism)
+
+    @property
+    def maxmem(self):
+        # scrypt needs about 128 * N * r bytes; OpenSSL's default cap (32 MiB)
+        # rejects anything above N=2**14, so allow twice the requirement.
+        return 256 * self.work_factor * self.block_size
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Requires the argon2-cffi package."""
+
+    time_cost = getattr(settings, 'ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+    memory_cost = getattr(settings, 'ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+    parallelism = getattr(settings, 'ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+# Async views run hashing here instead of on the event loop. The pool is
+# bounded so a login burst queues up rather than spawning a thread per request.
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+
+def _get_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            workers = getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+            _hash_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+    return _hash_pool
+
+
+def _in_hash_pool(func):
+    return sync_to_async(func, thread_sensitive=False, executor=_get_hash_pool())
+
+
+async def acheck_password(password, encoded):
+    """
+    Check ``password`` on the hashing pool.
+
+    Returns ``(valid, new_hash)``; ``new_hash`` is set when the stored hash
+    should be replaced because the hasher or its cost settings changed.
+    """
+    outdated = []
+    valid = await _in_hash_pool(check_password)(password, encoded, outdated.append)
+    new_hash = await _in_hash_pool(make_password)(password) if valid and outdated else None
+    return valid, new_hash
+
+
+async def amake_password(password):
+    return await _in_hash_pool(make_password)(password)
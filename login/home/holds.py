@@ -0,0 +1,178 @@
+"""
+Temporary seat holds for checkout.
+
+A hold takes its seats from ``TravelOption.available_seats`` with the same
+conditional UPDATE as a booking, so availability reads never have to look
+at holds at all, however many old ones there are. Confirming a hold turns
+it into a Booking without touching the seat count again, unless the trip
+has departed meanwhile: then the hold is expired instead. Releasing it, or
+the sweeper finding it expired, hands the seats back.
+
+Every status change is a conditional UPDATE on ``status='Active'``, so a
+hold can be confirmed, released or expired exactly once, whichever wins.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Sum, When
+from django.utils import timezone
+
+from .booking import BookingError, NotEnoughSeats, refusal, retry_on_locked
+from .events import BOOKED, append as append_events
+from .itinerary import record_changes as record_itinerary_changes
+from .models import Booking, SeatHold, TravelOption
+from .route_cache import invalidate_travel_option
+from .route_stats import record_booking, stats_key
+
+
+class HoldExpired(BookingError):
+    pass
+
+
+def _seats_changed(travel_ids):
+    # Queryset updates skip post_save, so evict the cached routes here.
+    def evict():
+        for travel_id in travel_ids:
+            invalidate_travel_option(travel_id)
+        record_itinerary_changes(travel_ids)
+    transaction.on_commit(evict, robust=True)
+
+
+@retry_on_locked
+def place_hold(user, travel_id, seats, ttl=None):
+    """Set ``seats`` aside for ``user`` for ``ttl`` seconds (default SEAT_HOLD_TTL) and return the SeatHold."""
+    if seats < 1:
+        raise BookingError("Seats must be at least 1")
+    ttl = getattr(settings, 'SEAT_HOLD_TTL', 600) if ttl is None else ttl
+
+    now = timezone.now()
+    with transaction.atomic():
+        taken = TravelOption.objects.filter(
+            travel_id=travel_id, available_seats__gte=seats, date_time__gt=now,
+        ).update(available_seats=F('available_seats') - seats)
+        if not taken:
+            raise refusal(travel_id, now)
+        hold = SeatHold.objects.create(
+            user=user, travel_option_id=travel_id, seats=seats,
+            expires_at=now + timedelta(seconds=ttl),
+        )
+        _seats_changed([travel_id])
+        return hold
+
+
+@retry_on_locked
+def confirm_hold(hold):
+    """
+    Turn an unexpired active hold on a trip that has not departed into a
+    Booking and return it. A hold whose trip has departed is expired and its
+    seats handed back.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        confirmed = SeatHold.objects.filter(
+            hold_id=hold.hold_id, status='Active', expires_at__gt=now, travel_option__date_time__gt=now,
+        ).update(status='Confirmed')
+        if confirmed:
+            booking = _book_hold(hold)
+        else:
+            departed = _expire_departed(hold, now)
+    if not confirmed:
+        # Raised outside the transaction, so a departed hold's expiry commits.
+        if departed:
+            hold.status = 'Expired'
+            raise HoldExpired("This trip has already departed")
+        raise HoldExpired("This hold has expired or was already used")
+    hold.status = 'Confirmed'
+    return booking
+
+
+def _expire_departed(hold, now):
+    expired = SeatHold.objects.filter(
+        hold_id=hold.hold_id, status='Active', travel_option__date_time__lte=now,
+    ).update(status='Expired')
+    if expired:
+        TravelOption.objects.filter(travel_id=hold.travel_option_id).update(
+            available_seats=F('available_seats') + hold.seats,
+        )
+        _seats_changed([hold.travel_option_id])
+    return bool(expired)
+
+
+def _book_hold(hold):
+    # The seats already left available_seats when the hold was placed.
+    option = TravelOption.objects.values('price', 'type', 'source', 'destination', 'date_time').get(
+        travel_id=hold.travel_option_id,
+    )
+    booking = Booking.objects.create(
+        user_id=hold.user_id,
+        travel_option_id=hold.travel_option_id,
+        number_of_seats=hold.seats,
+        total_price=option.pop('price') * hold.seats,
+    )
+    record_booking(stats_key(**option), hold.seats, booking.total_price)
+    append_events(BOOKED, [booking])
+    return booking
+
+
+@retry_on_locked
+def release_hold(hold):
+    """Hand an active hold's seats back. Returns False if it was no longer active."""
+    with transaction.atomic():
+        released = SeatHold.objects.filter(hold_id=hold.hold_id, status='Active').update(status='Released')
+        if not released:
+            return False
+        TravelOption.objects.filter(travel_id=hold.travel_option_id).update(
+            available_seats=F('available_seats') + hold.seats,
+        )
+        _seats_changed([hold.travel_option_id])
+    hold.status = 'Released'
+    return True
+
+
+@retry_on_locked
+def sweep_expired(batch_size=500, now=None):
+    """
+    Expire one batch of at most ``batch_size`` active holds past their expiry
+    and return their seats. Returns the number of holds expired; call again
+    until it is below ``batch_size``.
+
+    The batch is read through the partial index on active holds' expiry.
+    Rows locked by another sweeper are skipped (PostgreSQL), so several
+    sweepers can run at once.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        batch = list(
+            SeatHold.objects.select_for_update(skip_locked=True)
+            .filter(status='Active', expires_at__lte=now)
+            .order_by('expires_at')
+            .values_list('hold_id', flat=True)[:batch_size]
+        )
+        if not batch:
+            return 0
+        seats = dict(
+            SeatHold.objects.filter(hold_id__in=batch).values('travel_option_id')
+            .annotate(seats=Sum('seats')).order_by().values_list('travel_option_id', 'seats')
+        )
+        SeatHold.objects.filter(hold_id__in=batch).update(status='Expired')
+        # One UPDATE returns the seats to every travel option in the batch.
+        TravelOption.objects.filter(travel_id__in=seats).update(available_seats=Case(
+            *[When(travel_id=travel_id, then=F('available_seats') + n) for travel_id, n in seats.items()],
+            default=F('available_seats'),
+            output_field=TravelOption._meta.get_field('available_seats'),
+        ))
+        _seats_changed(list(seats))
+    return len(batch)
+
+
+def sweep_all_expired(batch_size=500):
+    """Sweep batches until no expired active holds are left. Returns the total expired."""
+    now = timezone.now()
+    total = 0
+    while True:
+        expired = sweep_expired(batch_size, now)
+        total += expired
+        if expired < batch_size:
+            return total
@@ -0,0 +1,405 @@
+"""
+Multi-leg itinerary planning over the TravelOption timetable.
+
+Departures are held in an in-memory ``ConnectionIndex``: for every city, its
+outgoing legs sorted by departure time, so "what leaves X after t" is a
+bisect rather than a query. Searches run in rounds, one per leg (at most
+``max_legs``), keeping at every city only the (arrival, cost) labels no other
+label beats on both, which answers both earliest-arrival and cheapest
+queries exactly.
+
+TravelOption has no arrival time, so a leg's arrival is its departure plus
+the ITINERARY_LEG_MINUTES duration of its travel type.
+
+Each process builds its index once and then refreshes it incrementally:
+TravelOption and Booking changes append the affected travel_id to a change
+log in the cache (see ``record_changes`` and home/signals.py), and the next
+search reloads just those departures. The log is a ring of
+ITINERARY_CHANGE_LOG_SIZE cache keys, so it never holds more entries than
+that; a process that falls further behind rebuilds. Bulk imports call ``mark_stale()``,
+which makes every process rebuild. With a per-process cache (locmem) other
+processes only see changes after ITINERARY_INDEX_MAX_AGE, when they rebuild.
+A rebuild loads the new index without holding the lock searches take, so
+they keep using the old one until the new one is swapped in.
+"""
+
+import threading
+import time as clock
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import TravelOption
+
+EARLIEST = 'earliest'
+CHEAPEST = 'cheapest'
+MODES = (EARLIEST, CHEAPEST)
+
+DEFAULT_LEG_MINUTES = {'Flight': 120, 'Train': 360, 'Bus': 480}
+MAX_LEGS_LIMIT = 4
+MAX_RESULTS = 10
+
+SEQUENCE_KEY = 'itinerary:changes'
+GENERATION_KEY = 'itinerary:generation'
+CHANGE_KEY = 'itinerary:change:{}'  # ring slot; holds (sequence, travel_id)
+
+INDEX_FIELDS = ('travel_id', 'type', 'source', 'destination', 'date_time', 'price', 'available_seats')
+
+# Leg tuple layout inside the index; PRICE is in cents.
+DEPARTS, ARRIVES, DESTINATION, PRICE, TRAVEL_ID, TYPE, SEATS = range(7)
+
+
+class ItineraryError(ValueError):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _leg_seconds():
+    minutes = {**DEFAULT_LEG_MINUTES, **_setting('ITINERARY_LEG_MINUTES', {})}
+    return {travel_type: m * 60 for travel_type, m in minutes.items()}
+
+
+def _to_datetime(ts):
+    return timezone.localtime(datetime.fromtimestamp(ts, tz=dt_timezone.utc))
+
+
+class ConnectionIndex:
+    """
+    Outgoing legs per city, sorted by departure. Each city maps to an
+    immutable ``(departure_times, legs)`` pair that updates replace whole, so
+    searches running in other threads always read a consistent snapshot.
+    """
+
+    def __init__(self, rows=()):
+        self._leg_seconds = _leg_seconds()
+        self._lock = threading.Lock()
+        self._cities = {}
+        self._sources = {}  # travel_id -> source city
+        by_city = {}
+        for row in rows:
+            leg = self._leg(row)
+            by_city.setdefault(row[2], []).append(leg)
+            self._sources[leg[TRAVEL_ID]] = row[2]
+        for city, legs in by_city.items():
+            legs.sort()
+            self._cities[city] = (tuple(leg[DEPARTS] for leg in legs), tuple(legs))
+
+    def _leg(self, row):
+        """Index leg for a row in INDEX_FIELDS order."""
+        travel_id, travel_type, source, destination, date_time, price, seats = row
+        departs = date_time.timestamp()
+        # Whole cents keep cost arithmetic in the search loop on ints.
+        cents = int(price * 100)
+        return (departs, departs + self._leg_seconds.get(travel_type, 0), destination, cents, travel_id, travel_type, seats)
+
+    def __len__(self):
+        return len(self._sources)
+
+    def departures(self, city, after, before):
+        """Legs leaving ``city`` at or after ``after`` and before ``before``, by departure."""
+        entry = self._cities.get(city)
+        if entry is None:
+            return ()
+        times, legs = entry
+        return legs[bisect_left(times, after):bisect_left(times, before)]
+
+    def apply(self, rows, travel_ids):
+        """
+        Replace the legs of ``travel_ids`` with ``rows`` (their current values;
+        ids without a row were deleted). Only the touched cities are rebuilt.
+        """
+        with self._lock:
+            removed = {}
+            for travel_id in travel_ids:
+                city = self._sources.pop(travel_id, None)
+                if city is not None:
+                    removed.setdefault(city, set()).add(travel_id)
+            added = {}
+            for row in rows:
+                added.setdefault(row[2], []).append(self._leg(row))
+                self._sources[row[0]] = row[2]
+
+            for city in removed.keys() | added.keys():
+                gone = removed.get(city, ())
+                _, legs = self._cities.get(city, ((), ()))
+                legs = [leg for leg in legs if leg[TRAVEL_ID] not in gone]
+                for leg in added.get(city, ()):
+                    legs.insert(bisect_right(legs, leg), leg)
+                if legs:
+                    self._cities[city] = (tuple(leg[DEPARTS] for leg in legs), tuple(legs))
+                else:
+                    self._cities.pop(city, None)
+
+    def search(self, source, destination, depart_after, mode=EARLIEST, max_legs=3,
+               min_transfer=2700, seats=1, window=172800, limit=5):
+        """
+        Itineraries from ``source`` to ``destination`` leaving at or after the
+        timestamp ``depart_after`` and arriving within ``window`` seconds of it,
+        with at most ``max_legs`` legs, ``min_transfer`` seconds between legs
+        and ``seats`` free seats on every leg. Returns up to ``limit``
+        itineraries, best first: by arrival then price for EARLIEST, by price
+        then arrival for CHEAPEST.
+
+        Labels are ``(arrival, cost, city, leg, previous_label)`` tuples.
+        """
+        deadline = depart_after + window
+        labels = {}  # city -> non-dominated (arrival, cost, legs) triples
+        found = []  # non-dominated labels at the destination
+        best_arrival = best_cost = None
+        frontier = [(depart_after - min_transfer, 0, source, None, None)]
+
+        for leg_number in range(1, max_legs + 1):
+            last = leg_number == max_legs
+            next_frontier = []
+            for label in frontier:
+                arrival, cost, city = label[0], label[1], label[2]
+                if label[3] is not None and (arrival, cost, leg_number - 1) not in labels[city]:
+                    continue  # beaten by a label found later in this round
+                for leg in self.departures(city, arrival + min_transfer, deadline):
+                    # Nothing departing after the best arrival so far can beat it.
+                    if mode == EARLIEST and best_arrival is not None and leg[DEPARTS] > best_arrival:
+                        break
+                    to = leg[DESTINATION]
+                    if last and to != destination:
+                        continue  # no legs left to get there from anywhere else
+                    leg_cost, leg_arrival = cost + leg[PRICE], leg[ARRIVES]
+                    if to == source or leg[SEATS] < seats or leg_arrival > deadline:
+                        continue
+                    if mode == CHEAPEST and best_cost is not None and leg_cost > best_cost:
+                        continue
+                    if not _insert_label(labels.setdefault(to, []), leg_arrival, leg_cost, leg_number):
+                        continue
+                    new = (leg_arrival, leg_cost, to, leg, label)
+                    if to == destination:
+                        found.append(new)
+                        if best_arrival is None or leg_arrival < best_arrival:
+                            best_arrival = leg_arrival
+                        if best_cost is None or leg_cost < best_cost:
+                            best_cost = leg_cost
+                    else:
+                        next_frontier.append(new)
+            frontier = next_frontier
+            if not frontier:
+                break
+
+        order = (lambda l: (l[0], l[1])) if mode == EARLIEST else (lambda l: (l[1], l[0]))
+        kept = [(l[0], l[1]) for l in found]
+        found = [l for l in found if not _dominated(kept, l[0], l[1])]
+        return [_itinerary(label) for label in sorted(found, key=order)[:limit]]
+
+
+def _dominated(labels, arrival, cost):
+    """Whether another label arrives no later and costs no more, and is strictly better in one."""
+    return any(a <= arrival and c <= cost and (a, c) != (arrival, cost) for a, c in labels)
+
+
+def _insert_label(labels, arrival, cost, legs):
+    """
+    Add a label reached in ``legs`` legs to a city's labels unless one already
+    matches or beats it. Labels are added in order of legs, so existing ones
+    never used more; only those from the same round can be displaced, as a
+    label with fewer legs still has more legs left to use.
+    """
+    for a, c, _ in labels:
+        if a <= arrival and c <= cost:
+            return False
+    labels[:] = [(a, c, n) for a, c, n in labels if n < legs or not (arrival <= a and cost <= c)]
+    labels.append((arrival, cost, legs))
+    return True
+
+
+def _money(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def _itinerary(label):
+    legs = []
+    while label[3] is not None:
+        legs.append(label)
+        label = label[4]
+    legs.reverse()
+    result = []
+    for arrival, _, city, leg, previous in legs:
+        result.append({
+            'travel_id': leg[TRAVEL_ID],
+            'type': leg[TYPE],
+            'source': previous[2],
+            'destination': city,
+            'departure': _to_datetime(leg[DEPARTS]),
+            'arrival': _to_datetime(arrival),
+            'price': _money(leg[PRICE]),
+            'available_seats': leg[SEATS],
+        })
+    return {
+        'departure': result[0]['departure'],
+        'arrival': result[-1]['arrival'],
+        'duration_minutes': round((legs[-1][0] - legs[0][3][DEPARTS]) / 60),
+        'transfers': len(result) - 1,
+        'total_price': _money(legs[-1][1]),
+        'legs': result,
+    }
+
+
+# Per-process index and the change-log position it has caught up to.
+_state = {'index': None, 'generation': None, 'sequence': 0, 'built': 0.0}
+_build_lock = threading.Lock()  # guards _state; held only briefly
+_rebuild_lock = threading.Lock()  # one full rebuild per process at a time
+
+
+def _indexed_departures(queryset=None):
+    # Departures from the start of today on; older ones cannot be booked.
+    if queryset is None:
+        start = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        queryset = TravelOption.objects.filter(date_time__gte=start)
+    return queryset.values_list(*INDEX_FIELDS).order_by().iterator(chunk_size=10000)
+
+
+def build_index():
+    """Load a fresh ConnectionIndex from the database."""
+    return ConnectionIndex(_indexed_departures())
+
+
+def get_index():
+    """
+    This process's ConnectionIndex, first replaying any departures changed
+    since it was built or last refreshed, or rebuilding it when the change log
+    has gaps, the generation moved, or it is older than ITINERARY_INDEX_MAX_AGE.
+    """
+    marks = cache.get_many([GENERATION_KEY, SEQUENCE_KEY])
+    generation, sequence = marks.get(GENERATION_KEY, 0), marks.get(SEQUENCE_KEY, 0)
+    with _build_lock:
+        index, built = _state['index'], _state['built']
+        expired = clock.monotonic() - built > _setting('ITINERARY_INDEX_MAX_AGE', 300)
+        if index is not None and not expired and generation == _state['generation']:
+            if sequence == _state['sequence']:
+                return index
+            if _replay(index, _state['sequence'], sequence):
+                _state['sequence'] = sequence
+                return index
+
+    # While another thread rebuilds, keep searching the old index if there is one.
+    if not _rebuild_lock.acquire(blocking=index is None):
+        return index
+    try:
+        if _state['built'] != built and _state['index'] is not None:
+            return _state['index']  # rebuilt by the thread this one waited for
+        fresh = build_index()
+        with _build_lock:
+            _state.update(index=fresh, generation=generation, sequence=sequence, built=clock.monotonic())
+        return fresh
+    finally:
+        _rebuild_lock.release()
+
+
+def forget_index():
+    """Drop this process's index; the next search rebuilds it."""
+    with _build_lock:
+        _state['index'] = None
+
+
+def _replay(index, applied, sequence):
+    """Apply change-log entries ``applied + 1``..``sequence``; False if any are missing."""
+    if sequence < applied or sequence - applied > _setting('ITINERARY_MAX_REPLAY', 5000):
+        return False
+    slots = _setting('ITINERARY_CHANGE_LOG_SIZE', 1000)
+    if sequence - applied > slots:
+        return False
+    keys = {n: CHANGE_KEY.format(n % slots) for n in range(applied + 1, sequence + 1)}
+    changes = cache.get_many(keys.values())
+    travel_ids = set()
+    for n, key in keys.items():
+        entry = changes.get(key)
+        if entry is None or entry[0] != n:
+            return False  # expired, or the slot has since been reused
+        travel_ids.add(entry[1])
+    index.apply(_indexed_departures(TravelOption.objects.filter(travel_id__in=travel_ids)), travel_ids)
+    return True
+
+
+def record_changes(travel_ids):
+    """Append changed departures to the change log. Call after the change commits."""
+    travel_ids = list(travel_ids)
+    if not travel_ids:
+        return
+    try:
+        last = cache.incr(SEQUENCE_KEY, len(travel_ids))
+    except ValueError:
+        cache.add(SEQUENCE_KEY, 0, timeout=None)
+        last = cache.incr(SEQUENCE_KEY, len(travel_ids))
+    slots = _setting('ITINERARY_CHANGE_LOG_SIZE', 1000)
+    first = last - len(travel_ids) + 1
+    cache.set_many(
+        {CHANGE_KEY.format(n % slots): (n, travel_id) for n, travel_id in enumerate(travel_ids, first)},
+        _setting('ITINERARY_CHANGE_LOG_TTL', 3600),
+    )
+
+
+def mark_stale():
+    """Make every process rebuild its index on its next search (e.g. after a bulk import)."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 1, timeout=None)
+
+
+def plan(source, destination, day, mode=EARLIEST, max_legs=None, min_transfer=None, seats=1, limit=5):
+    """Itineraries leaving on ``day`` (local date), searched on the shared index."""
+    if max_legs is None:
+        max_legs = _setting('ITINERARY_MAX_LEGS', 3)
+    if min_transfer is None:
+        min_transfer = _setting('ITINERARY_MIN_TRANSFER_MINUTES', 45)
+    start = timezone.make_aware(datetime.combine(day, time.min)).timestamp()
+    return get_index().search(
+        source, destination, start, mode=mode, max_legs=max_legs, min_transfer=min_transfer * 60,
+        seats=seats, window=_setting('ITINERARY_MAX_TRIP_HOURS', 48) * 3600, limit=limit,
+    )
+
+
+def _int_param(params, name, default, low, high):
+    value = params.get(name)
+    if not value:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ItineraryError(f"{name} must be a whole number")
+    if not low <= value <= high:
+        raise ItineraryError(f"{name} must be between {low} and {high}")
+    return value
+
+
+def parse_itinerary_params(params):
+    """Validate a QueryDict/dict of itinerary parameters into plan() keyword arguments."""
+    source = (params.get('source') or '').strip()
+    destination = (params.get('destination') or '').strip()
+    if not source or not destination:
+        raise ItineraryError("source and destination are required")
+    if source == destination:
+        raise ItineraryError("source and destination must differ")
+    try:
+        day = parse_date(params.get('date') or '')
+    except ValueError:  # well-formed but impossible, e.g. 2026-02-30
+        day = None
+    if day is None:
+        raise ItineraryError("date is required (YYYY-MM-DD)")
+    mode = params.get('mode') or EARLIEST
+    if mode not in MODES:
+        raise ItineraryError("mode must be one of: " + ", ".join(MODES))
+    return {
+        'source': source,
+        'destination': destination,
+        'day': day,
+        'mode': mode,
+        'max_legs': _int_param(params, 'max_legs', None, 1, MAX_LEGS_LIMIT),
+        'min_transfer': _int_param(params, 'min_transfer', None, 0, 24 * 60),
+        'seats': _int_param(params, 'seats', 1, 1, 50),
+        'limit': _int_param(params, 'limit', 5, 1, MAX_RESULTS),
+    }
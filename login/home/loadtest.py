@@ -0,0 +1,173 @@
+"""
+A small closed-loop HTTP load generator for benchmarking a running server.
+
+Each client thread keeps one keep-alive connection and fires its share of
+requests back to back, so the offered load is set by the concurrency.
+"""
+
+import http.client
+import re
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+CSRF_INPUT = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Session:
+    """One keep-alive connection plus the cookies the server has set on it."""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.timeout = timeout
+        self.cookies = {}
+        self.conn = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self.conn = cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, data=None, headers=None):
+        """Return (status, body). Redirects are not followed."""
+        headers = dict(headers or {})
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            if 'csrftoken' in self.cookies:
+                headers.setdefault('X-CSRFToken', self.cookies['csrftoken'])
+            headers.setdefault('Referer', f"http://{self.host}:{self.port}/")
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f"{k}={v}" for k, v in self.cookies.items())
+
+        for attempt in range(2):
+            if self.conn is None:
+                self._connect()
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                payload = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed the keep-alive connection; reconnect once.
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        if response.headers.get('Connection', '').lower() == 'close':
+            self.conn.close()
+            self.conn = None
+        return response.status, payload
+
+    def login(self, email, password, path='/login/'):
+        self.submit_form(path, {'email': email, 'password': password})
+
+    def submit_form(self, path, data):
+        """GET a form page, then POST ``data`` with its CSRF token; expects a redirect."""
+        status, body = self.request('GET', path)
+        match = CSRF_INPUT.search(body)
+        data = dict(data)
+        if match:
+            data['csrfmiddlewaretoken'] = match.group(1).decode()
+        status, _ = self.request('POST', path, data)
+        if status != 302:
+            raise RuntimeError(f"POST {path} failed with HTTP {status}")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+def run_load(base_url, requests, concurrency, make_request, setup=None, prepare=None):
+    """
+    Drive ``requests`` calls of ``make_request(session, i)`` over ``concurrency`` threads.
+
+    ``make_request`` returns the HTTP status; ``setup(session, worker)`` can
+    log the session in first, and ``prepare(session, i)`` runs before each
+    request, outside its latency (throughput still includes it). Returns a
+    dict of latency and throughput figures.
+    """
+    latencies = []
+    statuses = {}
+    errors = []
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker(number):
+        session = Session(base_url)
+        local_latencies, local_statuses = [], {}
+        try:
+            try:
+                if setup:
+                    setup(session, number)
+            finally:
+                ready.wait()
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    break
+                try:
+                    if prepare:
+                        prepare(session, i)
+                    started = time.perf_counter()
+                    status = make_request(session, i)
+                except Exception as e:
+                    with lock:
+                        errors.append(repr(e))
+                    continue
+                local_latencies.append(time.perf_counter() - started)
+                local_statuses[status] = local_statuses.get(status, 0) + 1
+        except Exception as e:
+            with lock:
+                errors.append(repr(e))
+        finally:
+            session.close()
+            with lock:
+                latencies.extend(local_latencies)
+                for status, count in local_statuses.items():
+                    statuses[status] = statuses.get(status, 0) + count
+
+    # The clock starts once every client has finished setup (e.g. logging in).
+    ready = threading.Barrier(concurrency + 1)
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_samples': errors[:5],
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'p50_ms': _ms(percentile(latencies, 50)),
+        'p95_ms': _ms(percentile(latencies, 95)),
+        'p99_ms': _ms(percentile(latencies, 99)),
+        'max_ms': _ms(latencies[-1] if latencies else None),
+    }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
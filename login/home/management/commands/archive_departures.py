@@ -0,0 +1,55 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from home.archive import archive_batch, default_cutoff
+from home.route_cache import invalidate_all_routes
+
+
+class Command(BaseCommand):
+    help = (
+        "Move departed TravelOptions and their bookings into the archive tables, "
+        "in bounded batches (one transaction each)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=None,
+            help="Archive departures before the start of the day this many days ago (default ARCHIVE_AFTER_DAYS)",
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help="TravelOptions moved per transaction")
+        parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches")
+        parser.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+        if options['older_than_days'] is None:
+            cutoff = default_cutoff()
+        elif options['older_than_days'] < 1:
+            raise CommandError("--older-than-days must be positive")
+        else:
+            day = timezone.localdate() - timedelta(days=options['older_than_days'])
+            cutoff = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+        moved = bookings = batches = 0
+        started = time.perf_counter()
+        while options['max_batches'] is None or batches < options['max_batches']:
+            batch, batch_bookings = archive_batch(cutoff, options['batch_size'])
+            moved += batch
+            bookings += batch_bookings
+            batches += 1
+            if options['verbosity'] >= 2:
+                self.stdout.write(f"{moved} departures, {bookings} bookings archived")
+            if batch < options['batch_size']:
+                break
+            # Lets other writers in between batches on a busy SQLite database.
+            time.sleep(options['pause'])
+        if moved:
+            invalidate_all_routes()
+
+        self.stdout.write(f"Departures archived: {moved} (before {cutoff:%Y-%m-%d})")
+        self.stdout.write(f"Bookings archived:   {bookings}")
+        self.stdout.write(f"Elapsed:             {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,119 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Sum
+from django.utils import timezone
+
+from home.booking import BookingError, book_seats
+from home.models import Booking, BookingEvent, Notification, Register, RouteDailyStats, TravelOption
+
+BENCH_EMAIL = 'bench-booking@example.com'
+BENCH_ROUTE = {'source': 'BENCH', 'destination': 'HOT'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent bookings at a single hot TravelOption and check that "
+        "seats are never oversold. Runs against the configured database and "
+        "removes its rows afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=2000, help="Booking attempts to make")
+        parser.add_argument('--threads', type=int, default=32, help="Concurrent worker threads")
+        parser.add_argument('--capacity', type=int, default=500, help="Seats on the hot travel option")
+        parser.add_argument('--seats', type=int, default=1, help="Seats per booking attempt")
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark rows afterwards")
+        parser.add_argument(
+            '--yes-destroy', action='store_true',
+            help="Run even with DEBUG off. The benchmark writes to and deletes from the configured database",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in (':memory:', ''):
+            raise CommandError("Concurrent benchmark needs a file or server database.")
+        if not settings.DEBUG and not options['yes_destroy']:
+            raise CommandError(
+                f"DEBUG is off, so {connection.settings_dict['NAME']} may be a real database. The benchmark "
+                "books and deletes rows in it; pass --yes-destroy if it is a scratch copy"
+            )
+
+        user, _ = Register.objects.get_or_create(
+            email=BENCH_EMAIL,
+            defaults={'username': 'bench-booking', 'password': '!'},
+        )
+        option = TravelOption.objects.create(
+            type='Flight', date_time=timezone.now() + timedelta(days=30),
+            price=100, available_seats=options['capacity'], **BENCH_ROUTE,
+        )
+        try:
+            self._run(user, option, options)
+        finally:
+            if not options['keep']:
+                self._cleanup()
+
+    def _cleanup(self):
+        """Delete the benchmark traveler and departure, and every row their bookings wrote."""
+        users = Register.objects.filter(email=BENCH_EMAIL)
+        options = TravelOption.objects.filter(**BENCH_ROUTE)
+        BookingEvent.objects.filter(travel_option_id__in=options.values('travel_id')).delete()
+        Notification.objects.filter(recipient=BENCH_EMAIL).delete()
+        users.delete()  # their bookings cascade
+        options.delete()
+        RouteDailyStats.objects.filter(**BENCH_ROUTE).delete()
+
+    def _run(self, user, option, options):
+        counts = {'booked': 0, 'rejected': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def worker(attempts):
+            # Each thread holds its own connection for the whole run.
+            local = {'booked': 0, 'rejected': 0, 'errors': 0}
+            for _ in range(attempts):
+                try:
+                    book_seats(user, option.travel_id, options['seats'])
+                    local['booked'] += 1
+                except BookingError:
+                    local['rejected'] += 1
+                except Exception:
+                    local['errors'] += 1
+            connections.close_all()
+            with lock:
+                for key, value in local.items():
+                    counts[key] += value
+
+        threads = options['threads']
+        shares = [options['bookings'] // threads + (i < options['bookings'] % threads) for i in range(threads)]
+        workers = [threading.Thread(target=worker, args=(share,)) for share in shares]
+
+        started = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        option.refresh_from_db()
+        booked_seats = Booking.objects.filter(
+            travel_option=option, status='Confirmed',
+        ).aggregate(total=Sum('number_of_seats'))['total'] or 0
+
+        self.stdout.write(f"Attempts:        {options['bookings']} on {options['threads']} threads")
+        self.stdout.write(f"Booked:          {counts['booked']}")
+        self.stdout.write(f"Sold out:        {counts['rejected']}")
+        self.stdout.write(f"Errors:          {counts['errors']}")
+        self.stdout.write(f"Seats left:      {option.available_seats}")
+        self.stdout.write(f"Elapsed:         {elapsed:.2f}s")
+        self.stdout.write(f"Bookings/sec:    {counts['booked'] / elapsed:.1f}")
+        self.stdout.write(f"Attempts/sec:    {options['bookings'] / elapsed:.1f}")
+
+        if booked_seats + option.available_seats != options['capacity']:
+            raise CommandError(
+                f"Inventory mismatch: {booked_seats} booked + {option.available_seats} left "
+                f"!= capacity {options['capacity']}"
+            )
+        self.stdout.write(self.style.SUCCESS("No overselling: booked + remaining == capacity"))
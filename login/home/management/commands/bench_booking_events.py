@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from home import booking, events
+from home.models import Booking, BookingEvent, EventCheckpoint, Register, TravelOption
+
+BENCH_CONSUMER = 'bench-{}'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the booking event log: what the outbox adds to a booking, raw "
+        "append rate, and consume rate at several batch sizes. Runs against the "
+        "configured database and removes its rows afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=500, help="Bookings made with and without the outbox")
+        parser.add_argument('--events', type=int, default=50000, help="Events appended for the consume test")
+        parser.add_argument('--append-batch', type=int, default=100, help="Events per transaction in the batched append")
+        parser.add_argument(
+            '--consume-batches', type=int, nargs='+', default=[100, 500, 2000],
+            help="Consumer batch sizes to time",
+        )
+
+    def handle(self, *args, **options):
+        if min(options['bookings'], options['events'], options['append_batch'], *options['consume_batches']) < 1:
+            raise CommandError("All counts must be positive")
+
+        user, _ = Register.objects.get_or_create(
+            email='bench-events@example.com', defaults={'username': 'bench-events', 'password': '!'},
+        )
+        option = TravelOption.objects.create(
+            type='Bus', source='BENCH', destination='EVENTS', date_time=timezone.now() + timedelta(days=30),
+            price=100, available_seats=2 * options['bookings'],
+        )
+        try:
+            self._bookings(user, option, options['bookings'])
+            self._appends(options['events'], options['append_batch'])
+            self._consumers(options['events'], options['consume_batches'])
+        finally:
+            BookingEvent.objects.filter(travel_option_id__in=[0, option.travel_id]).delete()
+            EventCheckpoint.objects.filter(consumer__startswith=BENCH_CONSUMER.format('')).delete()
+            option.delete()
+
+    def _bookings(self, user, option, count):
+        self.stdout.write(f"{'book_seats':<24} {'bookings':>9} {'ms/booking':>11}")
+        for label, patch in (('without outbox', mock.patch.object(booking, 'append_events')), ('with outbox', None)):
+            if patch:
+                patch.start()
+            try:
+                started = time.perf_counter()
+                for _ in range(count):
+                    booking.book_seats(user, option.travel_id, 1)
+                elapsed = time.perf_counter() - started
+            finally:
+                if patch:
+                    patch.stop()
+            self.stdout.write(f"{label:<24} {count:>9} {elapsed / count * 1000:>11.3f}")
+
+    def _appends(self, count, batch):
+        # Synthetic events on travel option 0, so cleanup can find them.
+        rows = [Booking(booking_id=n, user_id=0, travel_option_id=0, number_of_seats=1, total_price=Decimal('100'))
+                for n in range(count)]
+        self.stdout.write(f"\n{'append':<24} {'events':>9} {'events/s':>11}")
+        single = rows[:min(count, 2000)]  # one transaction per event is slow; sample it
+        for label, chunk, sample in (('1 per transaction', 1, single), (f"{batch} per transaction", batch, rows)):
+            started = time.perf_counter()
+            for start in range(0, len(sample), chunk):
+                with transaction.atomic():
+                    events.append(events.BOOKED, sample[start:start + chunk])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{label:<24} {len(sample):>9} {len(sample) / elapsed:>11.0f}")
+
+    def _consumers(self, count, batch_sizes):
+        first = BookingEvent.objects.filter(travel_option_id=0).order_by('event_id').values_list('event_id', flat=True).first()
+        self.stdout.write(f"\n{'consume':<24} {'events':>9} {'events/s':>11}")
+        for size in batch_sizes:
+            name = BENCH_CONSUMER.format(size)
+            seen = [0]
+            # Start just before the synthetic events, so only they are read.
+            EventCheckpoint.objects.update_or_create(consumer=name, defaults={'position': first - 1})
+            with mock.patch.dict(events.CONSUMERS, {name: lambda batch: seen.__setitem__(0, seen[0] + len(batch))}):
+                started = time.perf_counter()
+                handled = events.consume_all(name, size)
+                elapsed = time.perf_counter() - started
+            if seen[0] != handled or handled < count:
+                raise CommandError(f"Consumer saw {seen[0]} of {count} events")
+            self.stdout.write(f"{f'batch {size}':<24} {handled:>9} {handled / elapsed:>11.0f}")
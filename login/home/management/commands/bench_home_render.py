@@ -0,0 +1,52 @@
+import copy
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+
+from home.models import Register
+
+UNCACHED_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time rendering home.html per request: without the cached loader and "
+        "fragment caches (before), with the cached loader, and with both."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=500, help="Renders per mode")
+
+    def handle(self, *args, **options):
+        uncached = copy.deepcopy(settings.TEMPLATES)
+        uncached[0]['OPTIONS']['loaders'] = UNCACHED_LOADERS
+        modes = [
+            ('no cached loader, no fragments (before)', uncached, 0),
+            ('cached loader, no fragments', settings.TEMPLATES, 0),
+            ('cached loader + fragments (after)', settings.TEMPLATES, settings.TEMPLATE_FRAGMENT_TIMEOUT),
+        ]
+
+        user = Register(id=1, username='bench', email='bench@example.com')
+        self.stdout.write(f"{'mode':<42} {'ms/render':>10} {'renders/s':>10}")
+        for label, templates, fragment_timeout in modes:
+            # A zero timeout makes every {% cache %} block render afresh.
+            with override_settings(TEMPLATES=templates, TEMPLATE_FRAGMENT_TIMEOUT=fragment_timeout):
+                self._measure(label, user, options['renders'])
+
+    def _measure(self, label, user, renders):
+        cache.clear()
+        request = RequestFactory().get('/', HTTP_HOST=settings.ALLOWED_HOSTS[-1])
+        render_to_string('home.html', {'user': user}, request=request)  # warm up
+
+        started = time.perf_counter()
+        for _ in range(renders):
+            render_to_string('home.html', {'user': user}, request=request)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label:<42} {elapsed / renders * 1000:>10.3f} {renders / elapsed:>10.0f}")
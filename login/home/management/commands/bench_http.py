@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from home.loadtest import run_load
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput and latency of running servers on the same paths, "
+        "e.g. the WSGI and ASGI deployments side by side (see deployment_guide.md)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True, metavar='NAME=URL',
+                            help="Server to test, e.g. wsgi=http://127.0.0.1:8000 (repeatable)")
+        parser.add_argument('--path', action='append', metavar='PATH',
+                            help="Path to GET, cycled through in order (repeatable, default /api/travel-options/)")
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per target")
+        parser.add_argument('--concurrency', type=int, default=64, help="Concurrent client connections")
+        parser.add_argument('--login', metavar='EMAIL:PASSWORD', help="Log every client in before measuring")
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep:
+                raise CommandError(f"--target must look like NAME=URL, got {target!r}")
+            targets.append((name, url.rstrip('/')))
+        paths = options['path'] or ['/api/travel-options/']
+
+        setup = None
+        if options['login']:
+            email, _, password = options['login'].partition(':')
+            setup = lambda session, worker: session.login(email, password)
+
+        def make_request(session, i):
+            return session.request('GET', paths[i % len(paths)])[0]
+
+        self.stdout.write(
+            f"{'target':<10} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}  statuses"
+        )
+        for name, url in targets:
+            result = run_load(url, options['requests'], options['concurrency'], make_request, setup)
+            figures = [str(result[key]) for key in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'errors')]
+            self.stdout.write(
+                f"{name:<10} {figures[0]:>9} {figures[1]:>9} {figures[2]:>9} {figures[3]:>9} {figures[4]:>7}  "
+                f"{result['statuses']}"
+            )
+            for sample in result['error_samples']:
+                self.stderr.write(f"  {name}: {sample}")
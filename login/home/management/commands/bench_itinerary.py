@@ -0,0 +1,101 @@
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from home.itinerary import CHEAPEST, EARLIEST, ConnectionIndex
+from home.models import TravelOption
+
+TYPES = [choice for choice, _ in TravelOption.TRAVEL_TYPES]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the itinerary planner on a synthetic timetable built in memory: "
+        "index build, earliest-arrival and cheapest searches, and incremental updates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cities', type=int, default=2000)
+        parser.add_argument('--departures', type=int, default=300000)
+        parser.add_argument('--days', type=int, default=7, help="Days the departures are spread over")
+        parser.add_argument('--reach', type=int, default=25, help="Cities either side a departure may go to")
+        parser.add_argument('--hubs', type=int, default=20, help="Cities linked to every other city")
+        parser.add_argument('--queries', type=int, default=500, help="Searches per mode")
+        parser.add_argument('--max-legs', type=int, default=3)
+        parser.add_argument('--min-transfer', type=int, default=45, help="Minutes")
+        parser.add_argument('--updates', type=int, default=1000, help="Departures changed in the update test")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['cities'] <= options['hubs'] or options['departures'] < 1:
+            raise CommandError("--cities must exceed --hubs and --departures must be positive")
+        rng = random.Random(options['seed'])
+        start = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=1), datetime.min.time()))
+
+        started = time.perf_counter()
+        rows = self._timetable(rng, start, options)
+        self.stdout.write(f"Generated {len(rows)} departures between {options['cities']} cities "
+                          f"in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        index = ConnectionIndex(rows)
+        self.stdout.write(f"Index built in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        cities = options['cities']
+        pairs = [tuple(f"City {n}" for n in rng.sample(range(cities), 2)) for _ in range(options['queries'])]
+        self.stdout.write(f"{'mode':<10} {'found':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'avg legs':>9}")
+        for mode in (EARLIEST, CHEAPEST):
+            self._measure(index, mode, pairs, start.timestamp(), options)
+
+        changed = rng.sample(rows, min(options['updates'], len(rows)))
+        updated = [(r[0], r[1], r[2], r[3], r[4] + timedelta(minutes=5), r[5], r[6]) for r in changed]
+        started = time.perf_counter()
+        index.apply(updated, {r[0] for r in changed})
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Applied {len(updated)} changed departures in {elapsed * 1000:.0f} ms "
+                          f"({elapsed / len(updated) * 1e6:.0f} us each)")
+
+    def _timetable(self, rng, start, options):
+        cities, reach, hubs = options['cities'], options['reach'], options['hubs']
+        seconds = options['days'] * 86400
+        rows = []
+        for travel_id in range(1, options['departures'] + 1):
+            # Local hops between nearby cities, plus spokes into and out of hubs.
+            source, kind = rng.randrange(cities), rng.random()
+            if kind < 0.15:
+                destination = rng.randrange(hubs)
+            elif kind < 0.3:
+                source, destination = rng.randrange(hubs), rng.randrange(cities)
+            else:
+                destination = (source + rng.randint(1, reach) * rng.choice((-1, 1))) % cities
+            if destination == source:
+                destination = (source + 1) % cities
+            rows.append((
+                travel_id, rng.choice(TYPES), f"City {source}", f"City {destination}",
+                start + timedelta(seconds=rng.randrange(0, seconds, 300)),
+                Decimal(rng.randrange(300, 9000)), rng.randint(0, 200),
+            ))
+        return rows
+
+    def _measure(self, index, mode, pairs, depart_after, options):
+        timings, legs = [], []
+        for source, destination in pairs:
+            started = time.perf_counter()
+            found = index.search(
+                source, destination, depart_after, mode=mode, max_legs=options['max_legs'],
+                min_transfer=options['min_transfer'] * 60, limit=1,
+            )
+            timings.append((time.perf_counter() - started) * 1000)
+            if found:
+                legs.append(len(found[0]['legs']))
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{mode:<10} {len(legs):>6} {statistics.median(timings):>8.2f} {p95:>8.2f} "
+            f"{timings[-1]:>8.2f} {statistics.mean(legs) if legs else 0:>9.2f}"
+        )
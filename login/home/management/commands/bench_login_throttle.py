@@ -0,0 +1,93 @@
+import random
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from home import login_throttle, views
+from home.models import Register
+
+BENCH_DOMAIN = 'throttle-bench.example.com'
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a credential-stuffing burst against the login view and report "
+        "password hashes and CPU time with throttling off and on. Runs against "
+        "the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=500, help="Login attempts in the attack")
+        parser.add_argument('--ips', type=int, default=2, help="Client addresses the attack comes from")
+        parser.add_argument('--accounts', type=int, default=50, help="Existing accounts targeted")
+        parser.add_argument(
+            '--baseline-attempts', type=int, default=20,
+            help="Attempts replayed with throttling off; the full attack is extrapolated from them",
+        )
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if min(options['attempts'], options['ips'], options['accounts'], options['baseline_attempts']) < 1:
+            raise CommandError("All counts must be positive")
+        if hasattr(staticfiles_storage, 'manifest_name') and not staticfiles_storage.exists(staticfiles_storage.manifest_name):
+            # The login page links hashed assets, so it fails to render without a manifest.
+            raise CommandError("Run collectstatic first (set STATIC_ROOT to a writable directory if needed)")
+
+        emails = self._accounts(options['accounts'])
+        rng = random.Random(options['seed'])
+        # Known accounts mixed with addresses that do not exist.
+        attack = [
+            (rng.choice(emails) if rng.random() < 0.7 else f"ghost{n}@{BENCH_DOMAIN}", f"10.66.0.{n % options['ips'] + 1}")
+            for n in range(options['attempts'])
+        ]
+
+        self.stdout.write(f"{'throttling':<12} {'attempts':>8} {'hashed':>7} {'refused':>8} "
+                          f"{'cpu s':>8} {'cpu ms/attempt':>15}")
+        with override_settings(LOGIN_RATE_LIMITS=None):
+            off = self._replay(attack[:options['baseline_attempts']])
+        self._report('off', off)
+        scale = len(attack) / off['attempts']
+        self._report('off (proj.)', {key: value * scale for key, value in off.items()})
+        login_throttle.cache.clear()
+        self._report('on', self._replay(attack))
+
+    def _accounts(self, count):
+        existing = list(Register.objects.filter(email__endswith=f"@{BENCH_DOMAIN}").values_list('email', flat=True))
+        if len(existing) < count:
+            password = make_password('correct horse battery staple')  # hashed once, shared
+            Register.objects.bulk_create([
+                Register(username=f"throttle-bench-{n}", email=f"user{n}@{BENCH_DOMAIN}", password=password)
+                for n in range(len(existing), count)
+            ])
+        return [f"user{n}@{BENCH_DOMAIN}" for n in range(count)]
+
+    def _replay(self, attack):
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[-1])
+        counts = {'hashed': 0}
+
+        def counted_check(*args, **kwargs):
+            counts['hashed'] += 1
+            return check_password(*args, **kwargs)
+
+        refused = 0
+        started = time.process_time()
+        with mock.patch.object(views, 'check_password', counted_check):
+            for email, ip in attack:
+                response = client.post(reverse('login'), {'email': email, 'password': 'guess'}, REMOTE_ADDR=ip)
+                if response.status_code not in (200, 429):
+                    raise CommandError(f"Unexpected response {response.status_code} from the login view")
+                refused += response.status_code == 429
+        cpu = time.process_time() - started
+        return {'attempts': len(attack), 'hashed': counts['hashed'], 'refused': refused, 'cpu': cpu}
+
+    def _report(self, label, result):
+        self.stdout.write(
+            f"{label:<12} {result['attempts']:>8.0f} {result['hashed']:>7.0f} {result['refused']:>8.0f} "
+            f"{result['cpu']:>8.2f} {result['cpu'] / result['attempts'] * 1000:>15.2f}"
+        )
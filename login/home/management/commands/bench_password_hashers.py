@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password checks per second on one worker for each configured "
+        "hasher, optionally across several cost settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20, help="Password checks per configuration")
+        parser.add_argument('--budget-ms', type=float, default=250, help="Per-login hashing budget to flag against")
+        parser.add_argument('--pbkdf2-iterations', type=int, nargs='*', default=[], help="Extra PBKDF2 iteration counts to try")
+        parser.add_argument('--scrypt-work-factor', type=int, nargs='*', default=[], help="Extra scrypt N values to try")
+        parser.add_argument('--argon2-memory-cost', type=int, nargs='*', default=[], help="Extra Argon2 memory costs (KiB) to try")
+
+    def handle(self, *args, **options):
+        variants = {
+            'pbkdf2_sha256': ('iterations', options['pbkdf2_iterations']),
+            'scrypt': ('work_factor', options['scrypt_work_factor']),
+            'argon2': ('memory_cost', options['argon2_memory_cost']),
+        }
+
+        self.stdout.write(f"{'hasher':<44} {'ms/login':>10} {'logins/sec':>11}")
+        for path in settings.PASSWORD_HASHERS:
+            hasher_class = import_string(path)
+            configs = [hasher_class]
+            attr, values = variants.get(hasher_class.algorithm, (None, []))
+            for value in values:
+                configs.append(type(hasher_class.__name__, (hasher_class,), {attr: value}))
+            for config in configs:
+                self._measure(config, attr, options)
+
+    def _measure(self, hasher_class, attr, options):
+        hasher = hasher_class()
+        label = hasher.algorithm + (f" {attr}={getattr(hasher, attr)}" if attr else "")
+        try:
+            encoded = hasher.encode('correct horse battery staple', hasher.salt())
+        except ValueError as e:
+            # Optional backends such as argon2-cffi may not be installed.
+            self.stdout.write(f"{label:<44} skipped: {e}")
+            return
+
+        started = time.perf_counter()
+        for _ in range(options['logins']):
+            hasher.verify('correct horse battery staple', encoded)
+        per_login = (time.perf_counter() - started) / options['logins']
+
+        line = f"{label:<44} {per_login * 1000:>10.1f} {1 / per_login:>11.1f}"
+        if per_login * 1000 > options['budget_ms']:
+            line += "  (over budget)"
+        self.stdout.write(line)
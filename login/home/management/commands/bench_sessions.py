@@ -0,0 +1,70 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from home.middleware import forget_traveler
+from home.models import Register
+
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE')
+
+ENGINES = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Count database writes per request on the home page for the old "
+        "session setup (db + SESSION_SAVE_EVERY_REQUEST) and each session mode."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Home page requests per mode")
+
+    def handle(self, *args, **options):
+        password = 'bench-sessions'
+        user, _ = Register.objects.update_or_create(
+            email='bench-sessions@example.com',
+            defaults={'username': 'bench-sessions', 'password': make_password(password)},
+        )
+
+        modes = [('db + save every request (before)', ENGINES['db'], True)]
+        modes += [(f"{name} + sliding expiry", engine, False) for name, engine in ENGINES.items()]
+
+        self.stdout.write(f"{'mode':<36} {'writes/req':>10} {'queries/req':>12} {'ms/req':>8}")
+        try:
+            for label, engine, save_every_request in modes:
+                with override_settings(SESSION_ENGINE=engine, SESSION_SAVE_EVERY_REQUEST=save_every_request):
+                    self._measure(label, user, password, options['requests'])
+        finally:
+            user.delete()
+
+    def _measure(self, label, user, password, requests):
+        forget_traveler()
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[-1])
+        client.post(reverse('login'), {'email': user.email, 'password': password})
+        client.get(reverse('home'))  # settle the first sliding-expiry write
+
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(requests):
+                response = client.get(reverse('home'))
+        elapsed = time.perf_counter() - started
+
+        if response.status_code != 200:
+            self.stderr.write(f"{label}: home returned HTTP {response.status_code}")
+            return
+        writes = sum(1 for q in ctx.captured_queries if q['sql'].lstrip().upper().startswith(WRITE_PREFIXES))
+        self.stdout.write(
+            f"{label:<36} {writes / requests:>10.2f} {len(ctx.captured_queries) / requests:>12.2f} "
+            f"{elapsed / requests * 1000:>8.2f}"
+        )
@@ -0,0 +1,415 @@
+import json
+import platform
+import random
+import secrets
+import socket
+import subprocess
+import sys
+import time
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from home import route_stats
+from home.loadtest import Session, run_load
+from home.models import Booking, BookingEvent, Contact, Notification, Register, RouteDailyStats, TravelOption
+
+USER_EMAIL = 'bench-user-{}@example.com'
+REGISTER_EMAIL = 'bench-reg-{}@example.com'
+CONTACT_EMAIL = 'bench-contact@example.com'
+STAFF_USERNAME = 'bench-staff'
+# Seeded departures run between these cities, so they never mix with real routes.
+CITIES = ['Bench ' + city for city in (
+    'Delhi', 'Mumbai', 'Agra', 'Jaipur', 'Pune', 'Goa', 'Chennai', 'Kolkata', 'Lucknow', 'Varanasi',
+)]
+SEED_DAYS = 30
+
+
+class ClientSession(Session):
+    """A loadtest Session over django.test.Client, so scenarios can run in-process to count queries."""
+
+    def __init__(self):
+        self.client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[-1])
+
+    def request(self, method, path, data=None, headers=None):
+        if method == 'GET':
+            response = self.client.get(path)
+        else:
+            response = self.client.post(path, data or {})
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, body
+
+    def close(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset and load-test every home.urls route against a local "
+        "server, reporting latency percentiles, throughput and queries per request. "
+        "Results are saved as JSON; pass --compare to diff against an earlier run. "
+        "The dataset and benchmark accounts are removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help="Travelers to seed")
+        parser.add_argument('--options', type=int, default=2000, help="TravelOptions to seed")
+        parser.add_argument('--bookings', type=int, default=10000, help="Bookings to seed")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed for the dataset and request mix")
+        parser.add_argument(
+            '--yes-destroy', action='store_true',
+            help="Run even with DEBUG off. The suite writes to and deletes from the configured database",
+        )
+        parser.add_argument('--requests', type=int, default=500, help="Requests per scenario")
+        parser.add_argument('--concurrency', type=int, default=16, help="Concurrent client connections")
+        parser.add_argument('--query-samples', type=int, default=20,
+                            help="In-process requests per scenario used to count queries")
+        parser.add_argument('--scenario', action='append', metavar='NAME',
+                            help="Run only these scenarios (repeatable); default all")
+        parser.add_argument('--base-url', help="Benchmark this running server instead of starting runserver")
+        parser.add_argument('--port', type=int, default=8765, help="Port for the runserver started by default")
+        parser.add_argument('--output', help="Results file (default bench-results/<timestamp>-<commit>.json)")
+        parser.add_argument('--compare', metavar='FILE', help="Earlier results file to compare against")
+
+    def handle(self, *args, **options):
+        if hasattr(staticfiles_storage, 'manifest_name') and not staticfiles_storage.exists(staticfiles_storage.manifest_name):
+            # Pages link hashed assets, so they fail to render without a manifest.
+            raise CommandError("Run collectstatic first (set STATIC_ROOT to a writable directory if needed)")
+        if not settings.DEBUG and not options['yes_destroy']:
+            raise CommandError(
+                f"DEBUG is off, so {connection.settings_dict['NAME']} may be a real database. The suite "
+                "books, cancels and deletes rows in it; pass --yes-destroy if it is a scratch copy"
+            )
+        if options['users'] < 1 or options['options'] < 1:
+            raise CommandError("--users and --options must be positive")
+
+        rng = random.Random(options['seed'])
+        # A fresh password per run, so the accounts are useless even if cleanup never runs.
+        password = secrets.token_urlsafe(16)
+        try:
+            self._seed(rng, password, options['users'], options['options'], options['bookings'])
+            context = self._context(rng, password)
+            scenarios = self._scenarios(context)
+            selected = options['scenario'] or list(scenarios)
+            unknown = set(selected) - set(scenarios)
+            if unknown:
+                raise CommandError(
+                    f"Unknown scenario(s): {', '.join(sorted(unknown))}. Choose from {', '.join(scenarios)}"
+                )
+            results, server = self._run(context, scenarios, selected, options)
+        finally:
+            self._cleanup()
+
+        report = {'meta': self._meta(options, server), 'results': results}
+        output = Path(options['output'] or self._default_output(report['meta']))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(f"\nResults written to {output}")
+
+        if options['compare']:
+            self._compare(json.loads(Path(options['compare']).read_text()), report)
+
+    def _run(self, context, scenarios, selected, options):
+        """Load-test the ``selected`` scenarios. Returns the results and a label for the server."""
+        server = None
+        base_url = (options['base_url'] or '').rstrip('/')
+        if not base_url:
+            server = self._start_server(options['port'])
+            base_url = f"http://127.0.0.1:{options['port']}"
+
+        results = {}
+        self.stdout.write(
+            f"{'scenario':<16} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/req':>6} {'errors':>7}  statuses"
+        )
+        try:
+            for name in selected:
+                login, make_request, prepare = scenarios[name]
+                setup = self._setup(context, login)
+                result = run_load(
+                    base_url, options['requests'], options['concurrency'], make_request, setup, prepare,
+                )
+                result['queries_per_request'] = self._count_queries(
+                    options['query_samples'], make_request, setup, prepare,
+                )
+                results[name] = result
+                self._report(name, result)
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+        return results, 'runserver' if server else base_url
+
+    # Dataset
+
+    def _seed(self, rng, password, users, options, bookings):
+        started = time.perf_counter()
+        self._cleanup()  # leftovers of a run that was killed
+        User.objects.create_user(STAFF_USERNAME, password=password, is_staff=True)
+        password = make_password(password)
+
+        start = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        departures = set()
+        while len(departures) < options:
+            source, destination = rng.sample(CITIES, 2)
+            departures.add((
+                rng.choice(TravelOption.TRAVEL_TYPES)[0], source, destination,
+                start + timedelta(minutes=15 * rng.randrange(SEED_DAYS * 96)),
+            ))
+
+        with transaction.atomic():
+            travelers = Register.objects.bulk_create([
+                Register(username=f"bench-user-{n}", email=USER_EMAIL.format(n), password=password)
+                for n in range(users)
+            ], batch_size=1000)
+            travel_options = TravelOption.objects.bulk_create([
+                TravelOption(type=t, source=s, destination=d, date_time=dt,
+                             price=Decimal(rng.randrange(500, 5000)), available_seats=1000)
+                for t, s, d, dt in sorted(departures, key=lambda row: (row[3], row[:3]))
+            ], batch_size=1000)
+            rows = []
+            for _ in range(bookings):
+                option = rng.choice(travel_options)
+                seats = rng.randint(1, 3)
+                rows.append(Booking(
+                    user=rng.choice(travelers), travel_option=option, number_of_seats=seats,
+                    total_price=option.price * seats,
+                    status='Cancelled' if rng.random() < 0.1 else 'Confirmed',
+                ))
+            Booking.objects.bulk_create(rows, batch_size=1000)
+        route_stats.rebuild(timezone.localdate(start), timezone.localdate(start + timedelta(days=SEED_DAYS)))
+        self.stdout.write(
+            f"Seeded {users} users, {options} travel options and {bookings} bookings "
+            f"in {time.perf_counter() - started:.1f}s\n"
+        )
+
+    def _cleanup(self):
+        """Delete everything the suite created: dataset, sign-ups, staff account and the rows their requests wrote."""
+        travelers = _bench_travelers()
+        BookingEvent.objects.filter(user_id__in=travelers.values('id')).delete()
+        Notification.objects.filter(recipient__in=travelers.values('email')).delete()
+        travelers.delete()  # their bookings and holds cascade
+        TravelOption.objects.filter(source__in=CITIES).delete()
+        RouteDailyStats.objects.filter(source__in=CITIES).delete()
+        Contact.objects.filter(email=CONTACT_EMAIL).delete()
+        User.objects.filter(username=STAFF_USERNAME).delete()
+
+    def _context(self, rng, password):
+        users = list(Register.objects.filter(email__startswith='bench-user-').order_by('id').values_list('email', flat=True))
+        route = (
+            TravelOption.objects.filter(source__in=CITIES)
+            .values('source', 'destination', 'date_time').order_by('date_time').first()
+        )
+        confirmed = {}
+        for email, booking_id in (
+            Booking.objects.filter(user__email__in=users, status='Confirmed')
+            .values_list('user__email', 'booking_id').order_by('booking_id')
+        ):
+            confirmed.setdefault(email, []).append(booking_id)
+        option_ids = list(TravelOption.objects.filter(source__in=CITIES).values_list('travel_id', flat=True))
+        rng.shuffle(option_ids)
+        return {
+            'users': users,
+            'route': route and {
+                'source': route['source'], 'destination': route['destination'],
+                'day': timezone.localdate(route['date_time']),
+            },
+            'confirmed': confirmed,
+            'option_ids': option_ids,
+            'run_id': f"{int(time.time())}",
+            'password': password,
+        }
+
+    # Scenarios
+
+    def _scenarios(self, context):
+        """
+        name -> (login, make_request, prepare). ``login`` is 'traveler' or
+        'staff' to log each client in first, 'anonymous' to only fetch a CSRF
+        cookie, or None.
+        """
+        password = context['password']
+        route = context['route'] or {'source': '', 'destination': '', 'day': timezone.localdate()}
+        day = route['day'].isoformat()
+        users = context['users']
+        option_ids = context['option_ids'] or [0]
+
+        def get(path, query=None):
+            url = reverse(path) + ('?' + urlencode(query) if query else '')
+            return lambda session, i: session.request('GET', url)[0]
+
+        def login(session, i):
+            return session.request('POST', reverse('login'), {
+                'email': users[i % len(users)], 'password': password,
+            })[0]
+
+        def register(session, i):
+            name = f"{context['run_id']}-{i}-{id(session)}"
+            return session.request('POST', reverse('register'), {
+                'username': f"bench-reg-{name}", 'email': REGISTER_EMAIL.format(name),
+                'password': password, 'confirm_password': password,
+            })[0]
+
+        def book(session, i):
+            return session.request('POST', reverse('book'), {'travel_id': option_ids[i % len(option_ids)], 'seats': 1})[0]
+
+        def cancel(session, i):
+            booking_id = session.cancel_ids.pop() if session.cancel_ids else 0
+            return session.request('POST', reverse('cancel_booking', args=[booking_id]))[0]
+
+        def contact(session, i):
+            return session.request('POST', reverse('contact'), {
+                'full_name': 'Bench', 'email': CONTACT_EMAIL, 'message': f"Benchmark message {i}",
+            })[0]
+
+        def relogin(session, i):
+            session.login(users[i % len(users)], password)
+
+        route_query = {'source': route['source'], 'destination': route['destination']}
+        return {
+            'home': ('traveler', get('home'), None),
+            'search': (None, get('travel_search', route_query), None),
+            'search_api': (None, get('travel_search_api', route_query), None),
+            'route_summary': (None, get('route_summary_api', {**route_query, 'date': day}), None),
+            'route_stats': ('staff', get('route_stats_api', route_query), None),
+            'fare_calendar': (None, get('fare_calendar_api', {**route_query, 'from': day}), None),
+            'book_list': ('traveler', get('book', {
+                'from_station': route['source'], 'to_station': route['destination'], 'journey_date': day,
+            }), None),
+            'my_bookings': ('traveler', get('my_bookings'), None),
+            'export': ('traveler', get('export_bookings', {'format': 'csv'}), None),
+            'login': ('anonymous', login, None),
+            'register': ('anonymous', register, None),
+            'book': ('traveler', book, None),
+            'cancel': ('traveler', cancel, None),
+            'contact': ('anonymous', contact, None),
+            'logout': (None, get('logout'), relogin),
+        }
+
+    def _setup(self, context, login):
+        users = context['users']
+
+        def setup(session, worker):
+            email = users[worker % len(users)]
+            session.cancel_ids = list(context['confirmed'].get(email, []))
+            if login == 'traveler':
+                session.login(email, context['password'])
+            elif login == 'staff':
+                session.submit_form(reverse('admin:login'), {
+                    'username': STAFF_USERNAME, 'password': context['password'], 'next': reverse('admin:index'),
+                })
+            elif login == 'anonymous':
+                session.request('GET', reverse('login'))  # picks up the CSRF cookie
+        return setup
+
+    def _count_queries(self, samples, make_request, setup, prepare):
+        if samples < 1:
+            return None
+        session = ClientSession()
+        # A worker number far from the load run's, so cancels use other bookings.
+        setup(session, 10 ** 6 + 1)
+        total = 0
+        for i in range(samples):
+            if prepare:
+                prepare(session, i)
+            with CaptureQueriesContext(connection) as ctx:
+                make_request(session, i)
+            total += len(ctx.captured_queries)
+        return round(total / samples, 2)
+
+    # Server and reporting
+
+    def _start_server(self, port):
+        server = subprocess.Popen(
+            [sys.executable, 'manage.py', 'runserver', f"127.0.0.1:{port}", '--noreload'],
+            cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+                return server
+            except OSError:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    server.terminate()
+                    raise CommandError(f"runserver did not start on port {port}")
+                time.sleep(0.2)
+
+    def _report(self, name, result):
+        self.stdout.write(
+            f"{name:<16} {result['throughput_rps']!s:>8} {result['p50_ms']!s:>8} {result['p95_ms']!s:>8} "
+            f"{result['p99_ms']!s:>8} {result['queries_per_request']!s:>6} {result['errors']:>7}  {result['statuses']}"
+        )
+        for sample in result['error_samples']:
+            self.stderr.write(f"  {name}: {sample}")
+
+    def _meta(self, options, server):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'timestamp': timezone.now().isoformat(timespec='seconds'),
+            'server': server,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'settings': {
+                'DB_PROFILE': getattr(settings, 'DB_PROFILE', None),
+                'ASYNC_VIEWS': getattr(settings, 'ASYNC_VIEWS', False),
+                'PASSWORD_HASHER': getattr(settings, 'PASSWORD_HASHER', None),
+                'SESSION_ENGINE': settings.SESSION_ENGINE,
+                'CACHE_BACKEND': settings.CACHES['default']['BACKEND'],
+            },
+            'options': {key: options[key] for key in (
+                'users', 'options', 'bookings', 'seed', 'requests', 'concurrency', 'query_samples',
+            )},
+        }
+
+    def _default_output(self, meta):
+        stamp = meta['timestamp'].replace(':', '').replace('-', '')[:15]
+        return settings.BASE_DIR / 'bench-results' / f"{stamp}-{meta['commit'] or 'nogit'}.json"
+
+    def _compare(self, before, after):
+        self.stdout.write(
+            f"\nCompared with {before['meta'].get('commit')} ({before['meta'].get('timestamp')}):\n"
+            f"{'scenario':<16} {'req/s':>22} {'p95 ms':>24} {'q/req':>18}"
+        )
+        for name, new in after['results'].items():
+            old = before['results'].get(name)
+            if old is None:
+                continue
+            self.stdout.write(
+                f"{name:<16} {_change(old['throughput_rps'], new['throughput_rps']):>22} "
+                f"{_change(old['p95_ms'], new['p95_ms']):>24} "
+                f"{_change(old.get('queries_per_request'), new.get('queries_per_request')):>18}"
+            )
+
+
+def _bench_travelers():
+    """Travelers created by the suite: the seeded ones and those the register scenario signed up."""
+    return Register.objects.filter(
+        Q(email__startswith='bench-user-') | Q(email__startswith='bench-reg-'), email__endswith='@example.com',
+    )
+
+
+def _change(old, new):
+    if not old or new is None:
+        return f"{old} -> {new}"
+    return f"{old} -> {new} ({(new - old) / old:+.0%})"
@@ -0,0 +1,52 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from home import events
+
+
+class Command(BaseCommand):
+    help = (
+        "Feed new booking events to the registered consumers, in batches. "
+        "Run it from cron, or with --loop as a long-lived worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--consumer', action='append', dest='consumers',
+            help="Run only this consumer (repeatable; default: every registered consumer)",
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help="Events handled per transaction")
+        parser.add_argument('--loop', action='store_true', help="Keep consuming until interrupted")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between passes with --loop")
+        parser.add_argument(
+            '--prune', action='store_true',
+            help="Afterwards delete events older than BOOKING_EVENT_RETENTION_DAYS that every consumer has handled",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+        names = options['consumers'] or sorted(events.CONSUMERS)
+        unknown = set(names) - set(events.CONSUMERS)
+        if unknown:
+            raise CommandError(f"Unknown consumer(s): {', '.join(sorted(unknown))}")
+
+        while True:
+            for name in names:
+                handled = events.consume_all(name, options['batch_size'])
+                if handled or not options['loop']:
+                    self.stdout.write(f"{name}: handled {handled} event(s)")
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
+
+        if options['prune']:
+            retention = timedelta(days=getattr(settings, 'BOOKING_EVENT_RETENTION_DAYS', 7))
+            self.stdout.write(f"Pruned {events.prune(timezone.now() - retention)} event(s)")
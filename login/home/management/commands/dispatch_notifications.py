@@ -0,0 +1,47 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from home import events, notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue emails for new booking events, then send every due email from a "
+        "pool of worker threads. Run it from cron, or with --loop as a long-lived worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Threads sending in parallel")
+        parser.add_argument('--batch-size', type=int, default=50, help="Emails sent per mail server connection")
+        parser.add_argument('--loop', action='store_true', help="Keep dispatching until interrupted")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between passes with --loop")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--workers and --batch-size must be positive")
+
+        with ThreadPoolExecutor(options['workers']) as pool:
+            while True:
+                queued = events.consume_all(notifications.CONSUMER)
+                results = list(pool.map(self._drain, [options['batch_size']] * options['workers']))
+                sent, retried, failed = (sum(counts) for counts in zip(*results))
+                if queued or sent or retried or failed or not options['loop']:
+                    self.stdout.write(
+                        f"Events read: {queued}, emails sent: {sent}, to retry: {retried}, given up: {failed}"
+                    )
+                if not options['loop']:
+                    break
+                try:
+                    time.sleep(options['interval'])
+                except KeyboardInterrupt:
+                    break
+
+    def _drain(self, batch_size):
+        try:
+            return notifications.dispatch_all(batch_size)
+        finally:
+            # Each pool thread has its own database connection; don't leave it open between passes.
+            connection.close()
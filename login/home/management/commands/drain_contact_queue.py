@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.contact_queue import drain
+
+
+class Command(BaseCommand):
+    help = (
+        "Write spooled contact form submissions to the database in batches. "
+        "Run it from cron, or with --loop as a long-lived worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per bulk insert")
+        parser.add_argument('--loop', action='store_true', help="Keep draining until interrupted")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between drains with --loop")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        while True:
+            written = drain(options['batch_size'])
+            if written or not options['loop']:
+                self.stdout.write(f"Wrote {written} contact message(s)")
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,116 @@
+import itertools
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from home.itinerary import mark_stale as mark_itineraries_stale
+from home.models import TravelOption
+from home.route_cache import invalidate_all_routes, invalidate_route
+from home.route_stats import rebuild as rebuild_route_stats
+from home.timetable import RowError, clean_chunk, read_chunks
+
+UNIQUE_FIELDS = ['type', 'source', 'destination', 'date_time']
+# Past this many touched (route, day) pairs in a batch, drop the whole route
+# cache in one step instead of evicting keys one by one.
+MAX_ROUTE_EVICTIONS = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Upsert TravelOption departures from CSV or JSONL timetable files. "
+        "Rows are validated in chunks and written with one bulk upsert per batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help="Timetable files (.csv, .jsonl or .ndjson)")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per validation chunk and transaction")
+        parser.add_argument('--workers', type=int, default=1, help="Processes used to parse and validate rows")
+        parser.add_argument(
+            '--update-seats', action='store_true',
+            help="Overwrite available_seats on existing departures (by default only the price is updated, "
+                 "so seats already booked are not handed back)",
+        )
+        parser.add_argument('--max-errors', type=int, default=1000, help="Abort after this many invalid rows")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError("--batch-size and --workers must be positive")
+
+        update_fields = ['price', 'available_seats'] if options['update_seats'] else ['price']
+        chunks = itertools.chain.from_iterable(
+            read_chunks(path, options['batch_size']) for path in options['files']
+        )
+        if options['workers'] > 1:
+            results = self._clean_parallel(chunks, options['workers'])
+        else:
+            results = (clean_chunk(*chunk, settings.TIME_ZONE) for chunk in chunks)
+
+        written = invalid = 0
+        self.days = set()
+        started = time.perf_counter()
+        try:
+            for rows, errors in results:
+                for line_number, message in errors:
+                    self.stderr.write(f"line {line_number}: {message}")
+                invalid += len(errors)
+                if invalid > options['max_errors']:
+                    raise CommandError(f"Aborting: more than {options['max_errors']} invalid rows")
+                if rows:
+                    written += self._write(rows, update_fields)
+                if options['verbosity'] >= 2:
+                    self.stdout.write(f"{written} rows written, {invalid} invalid")
+        except (RowError, OSError) as e:
+            raise CommandError(str(e))
+        if self.days:
+            # bulk_create skips the per-departure stats refresh too.
+            rebuild_route_stats(min(self.days), max(self.days))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"Rows written:   {written}")
+        self.stdout.write(f"Rows rejected:  {invalid}")
+        self.stdout.write(f"Elapsed:        {elapsed:.2f}s")
+        self.stdout.write(f"Rows/sec:       {written / elapsed if elapsed else 0:.0f}")
+
+    def _clean_parallel(self, chunks, workers):
+        # Forked workers must not inherit open database connections.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Keep a bounded window in flight so huge files never sit in memory.
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(clean_chunk, *chunk, settings.TIME_ZONE))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _write(self, rows, update_fields):
+        # A departure repeated within one batch would hit the same conflict
+        # row twice in a single statement; the last occurrence wins.
+        unique_rows = {row[:4]: row for row in rows}.values()
+        objs = [
+            TravelOption(type=t, source=s, destination=d, date_time=dt, price=p, available_seats=n)
+            for t, s, d, dt, p, n in unique_rows
+        ]
+        routes = {(obj.source, obj.destination, timezone.localdate(obj.date_time)) for obj in objs}
+        self.days.update(day for _, _, day in routes)
+        with transaction.atomic():
+            TravelOption.objects.bulk_create(
+                objs, update_conflicts=True, unique_fields=UNIQUE_FIELDS, update_fields=update_fields,
+            )
+            # bulk_create skips post_save, so evict the touched routes ourselves.
+            transaction.on_commit(lambda: self._evict(routes))
+        return len(objs)
+
+    def _evict(self, routes):
+        mark_itineraries_stale()
+        if len(routes) > MAX_ROUTE_EVICTIONS:
+            invalidate_all_routes()
+        else:
+            for route in routes:
+                invalidate_route(*route)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from home.login_throttle import reset_stats, stats
+
+
+class Command(BaseCommand):
+    help = "Show login throttling counters (shared across processes with a shared cache backend)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing")
+
+    def handle(self, *args, **options):
+        for stat, value in stats().items():
+            self.stdout.write(f"{stat + ':':<15} {value}")
+        if options['reset']:
+            reset_stats()
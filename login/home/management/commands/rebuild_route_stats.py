@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from home.route_stats import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the RouteDailyStats summary table from bookings and departures, "
+        "for the whole timetable or a range of departure days."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='day_from', help="First departure day (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='day_to', help="Last departure day (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        days = {}
+        for name in ('day_from', 'day_to'):
+            if options[name]:
+                days[name] = parse_date(options[name])
+                if days[name] is None:
+                    raise CommandError(f"Invalid date: {options[name]}")
+
+        started = time.perf_counter()
+        written = rebuild(**days)
+        self.stdout.write(f"Rows written:   {written}")
+        self.stdout.write(f"Elapsed:        {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,26 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from home.route_cache import CACHE_ALIAS, cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show route cache hit/miss counters (shared across processes with a shared cache backend)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing")
+
+    def handle(self, *args, **options):
+        if isinstance(caches[CACHE_ALIAS], LocMemCache):
+            self.stderr.write(self.style.WARNING(
+                "The route cache is local memory, so this process only sees its own counters, "
+                "not the web workers'. Read them from /api/monitoring/route-cache/ instead."
+            ))
+        stats = cache_stats()
+        hit_rate = f"{stats['hit_rate']:.1%}" if stats['hit_rate'] is not None else "n/a"
+        self.stdout.write(f"Hits:      {stats['hits']}")
+        self.stdout.write(f"Misses:    {stats['misses']}")
+        self.stdout.write(f"Hit rate:  {hit_rate}")
+        if options['reset']:
+            reset_cache_stats()
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.holds import sweep_all_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Expire seat holds past their expiry and return their seats, in batches. "
+        "Run it from cron, or with --loop as a long-lived worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Holds expired per transaction")
+        parser.add_argument('--loop', action='store_true', help="Keep sweeping until interrupted")
+        parser.add_argument('--interval', type=float, default=15.0, help="Seconds between sweeps with --loop")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        while True:
+            expired = sweep_all_expired(options['batch_size'])
+            if expired or not options['loop']:
+                self.stdout.write(f"Expired {expired} seat hold(s)")
+            if not options['loop']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,420 @@
+"""
+Request middleware for the home app.
+"""
+
+import cProfile
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template as DjangoBackendTemplate
+from django.utils.functional import SimpleLazyObject
+
+from . import db_router
+from .models import Register
+
+# Fields the views and templates read off the logged-in traveler.
+TRAVELER_FIELDS = ('id', 'username', 'email')
+
+_travelers = OrderedDict()  # user_id -> (expires_at, Register or None)
+_travelers_lock = threading.Lock()
+
+
+def _ttl():
+    return getattr(settings, 'TRAVELER_CACHE_TTL', 30)
+
+
+def _max_entries():
+    return getattr(settings, 'TRAVELER_CACHE_MAX_ENTRIES', 10000)
+
+
+def _cached_traveler(user_id):
+    """Return (found, traveler) from the per-process cache."""
+    with _travelers_lock:
+        entry = _travelers.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            _travelers.move_to_end(user_id)
+            return True, entry[1]
+    return False, None
+
+
+def _remember_traveler(user_id, traveler):
+    with _travelers_lock:
+        _travelers[user_id] = (time.monotonic() + _ttl(), traveler)
+        _travelers.move_to_end(user_id)
+        while len(_travelers) > _max_entries():
+            _travelers.popitem(last=False)
+
+
+def get_traveler(user_id):
+    """Return the Register row for ``user_id``, from the per-process cache when fresh."""
+    found, traveler = _cached_traveler(user_id)
+    if not found:
+        traveler = Register.objects.only(*TRAVELER_FIELDS).filter(id=user_id).first()
+        _remember_traveler(user_id, traveler)
+    return traveler
+
+
+async def aget_traveler(user_id):
+    """Async counterpart of get_traveler()."""
+    found, traveler = _cached_traveler(user_id)
+    if not found:
+        traveler = await Register.objects.only(*TRAVELER_FIELDS).filter(id=user_id).afirst()
+        _remember_traveler(user_id, traveler)
+    return traveler
+
+
+def forget_traveler(user_id=None):
+    """Drop one cached traveler, or all of them when ``user_id`` is None."""
+    with _travelers_lock:
+        if user_id is None:
+            _travelers.clear()
+        else:
+            _travelers.pop(user_id, None)
+
+
+class TravelerMiddleware:
+    """
+    Attach the session's Register user as ``request.traveler``.
+
+    The lookup is lazy, so requests that never touch it cost nothing, and it
+    runs at most once per request. ``request.traveler`` is falsy when nobody
+    is logged in or the session points at a deleted user. Async views use
+    ``await request.atraveler()`` instead.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self._attach(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self._attach(request)
+        return await self.get_response(request)
+
+    def _attach(self, request):
+        request.traveler = SimpleLazyObject(lambda: self._resolve(request))
+        request.atraveler = partial(self._aresolve, request)
+
+    @staticmethod
+    def _resolve(request):
+        user_id = request.session.get('user_id')
+        return get_traveler(user_id) if user_id is not None else None
+
+    @staticmethod
+    async def _aresolve(request):
+        if not hasattr(request, '_atraveler'):
+            user_id = await request.session.aget('user_id')
+            request._atraveler = await aget_traveler(user_id) if user_id is not None else None
+        return request._atraveler
+
+
+class SlidingSessionMiddleware:
+    """
+    Extend session lifetime without rewriting the session on every request.
+
+    A session is re-saved (pushing its expiry forward) only once less than
+    SESSION_REFRESH_FRACTION of its lifetime remains, replacing
+    SESSION_SAVE_EVERY_REQUEST. Requests without a session cookie are not
+    touched, so anonymous traffic never loads a session.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    REFRESHED_KEY = '_refreshed_at'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self._applies(request):
+            self._refresh(request.session, request.session.get(self.REFRESHED_KEY), request.session.get_expiry_age())
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self._applies(request):
+            self._refresh(
+                request.session,
+                await request.session.aget(self.REFRESHED_KEY),
+                await request.session.aget_expiry_age(),
+            )
+        return response
+
+    @staticmethod
+    def _applies(request):
+        return (
+            not settings.SESSION_SAVE_EVERY_REQUEST
+            and settings.SESSION_COOKIE_NAME in request.COOKIES
+            and hasattr(request, 'session')
+        )
+
+    def _refresh(self, session, refreshed_at, age):
+        # Runs before SessionMiddleware.process_response, which saves modified sessions.
+        if session.is_empty():
+            return
+        now = int(time.time())
+        fraction = getattr(settings, 'SESSION_REFRESH_FRACTION', 0.5)
+        if refreshed_at is None or now - refreshed_at > age * (1 - fraction):
+            session[self.REFRESHED_KEY] = now
+
+
+# Per-request profiling
+
+profiling_logger = logging.getLogger('home.profiling')
+
+# The RequestProfile of the request running in this context, if profiling is on.
+# Context variables follow the request into sync_to_async threads.
+_current_profile = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """Timings collected while serving one request."""
+
+    def __init__(self, keep_slowest):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.queries = 0
+        self.template_time = 0.0
+        self.keep_slowest = keep_slowest
+        self.slowest = []  # min-heap of (duration, sequence, sql)
+
+    def add_query(self, sql, duration):
+        self.db_time += duration
+        self.queries += 1
+        entry = (duration, self.queries, sql)
+        if len(self.slowest) < self.keep_slowest:
+            heapq.heappush(self.slowest, entry)
+        elif self.slowest and duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        profile.add_query(sql, duration)
+        if duration * 1000 >= settings.PROFILING_SLOW_QUERY_MS:
+            profiling_logger.warning(json.dumps({
+                'event': 'slow_query', 'ms': round(duration * 1000, 2), 'sql': sql[:1000],
+            }))
+
+
+def _wrap_connection(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+_original_template_render = DjangoBackendTemplate.render
+
+
+def _timed_template_render(self, context=None, request=None):
+    profile = _current_profile.get()
+    if profile is None:
+        return _original_template_render(self, context, request)
+    started = time.perf_counter()
+    try:
+        return _original_template_render(self, context, request)
+    finally:
+        profile.template_time += time.perf_counter() - started
+
+
+def install_profiling_hooks():
+    """Time SQL on every connection and top-level template renders. Idempotent."""
+    connection_created.connect(_wrap_connection, dispatch_uid='home.profiling')
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection)
+    # Included templates render inside the backend Template, so they are not counted twice.
+    DjangoBackendTemplate.render = _timed_template_render
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in request instrumentation, enabled by PROFILING_ENABLED.
+
+    Every request gets wall, DB and template time, its query count and its
+    slowest statements, as a JSON line on the ``home.profiling`` logger and
+    as a Server-Timing header. One request in PROFILING_SAMPLE_RATE, or one
+    carrying ``X-Profile: <PROFILING_TRIGGER_TOKEN>``, also runs under
+    cProfile and is dumped to PROFILING_DIR for ``python -m pstats`` or
+    snakeviz. When disabled the middleware removes itself at startup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install_profiling_hooks()
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.counter = itertools.count(1)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile, token, profiler = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler:
+                profiler.disable()
+            _current_profile.reset(token)
+        return self._finish(request, response, profile, profiler)
+
+    async def __acall__(self, request):
+        profile, token, profiler = self._start(request)
+        try:
+            # Under ASGI the profiler also sees other coroutines sharing the loop.
+            response = await self.get_response(request)
+        finally:
+            if profiler:
+                profiler.disable()
+            _current_profile.reset(token)
+        return self._finish(request, response, profile, profiler)
+
+    def _sampled(self, request):
+        trigger = settings.PROFILING_TRIGGER_TOKEN
+        if trigger and request.headers.get('X-Profile') == trigger:
+            return True
+        return bool(self.sample_rate) and next(self.counter) % self.sample_rate == 0
+
+    def _start(self, request):
+        profile = RequestProfile(settings.PROFILING_SLOW_QUERIES)
+        token = _current_profile.set(profile)
+        profiler = None
+        if self._sampled(request):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profile, token, profiler
+
+    def _finish(self, request, response, profile, profiler):
+        wall_ms = (time.perf_counter() - profile.started) * 1000
+        db_ms = profile.db_time * 1000
+        template_ms = profile.template_time * 1000
+        match = request.resolver_match
+        record = {
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'wall_ms': round(wall_ms, 2),
+            'db_ms': round(db_ms, 2),
+            'queries': profile.queries,
+            'template_ms': round(template_ms, 2),
+            'slowest_sql': [
+                {'ms': round(duration * 1000, 2), 'sql': sql[:500]}
+                for duration, _, sql in sorted(profile.slowest, reverse=True)
+            ],
+        }
+        if profiler:
+            record['profile'] = str(self._dump(profiler, record))
+        profiling_logger.info(json.dumps(record))
+
+        if settings.PROFILING_SERVER_TIMING:
+            response.headers['Server-Timing'] = (
+                f'db;dur={db_ms:.2f};desc="{profile.queries} queries", '
+                f'tpl;dur={template_ms:.2f}, total;dur={wall_ms:.2f}'
+            )
+        return response
+
+    @staticmethod
+    def _dump(profiler, record):
+        directory = Path(settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = (record['view'] or 'unresolved').replace(':', '-')
+        path = directory / f"{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 10**9:09d}-{name}.prof"
+        profiler.dump_stats(path)
+        return path
+
+
+class ReplicaPinMiddleware:
+    """
+    Read-your-writes for the replica router (home/db_router.py).
+
+    Tracks each request so that its reads stick to the primary once it has
+    written. After such a request, a short-lived cookie keeps the same
+    browser on the primary for REPLICA_PIN_SECONDS, long enough for the
+    replicas to catch up. Removes itself when no replicas are configured.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    COOKIE_NAME = 'pin_primary'
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'DATABASE_REPLICAS', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = db_router.start_request(pinned=self._pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = db_router.end_request(token)
+        return self._finish(response, wrote)
+
+    async def __acall__(self, request):
+        token = db_router.start_request(pinned=self._pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = db_router.end_request(token)
+        return self._finish(response, wrote)
+
+    def _pinned(self, request):
+        # The cookie only ever sends reads to the primary, so it needs no signature.
+        try:
+            return int(request.COOKIES.get(self.COOKIE_NAME, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def _finish(self, response, wrote):
+        if wrote:
+            seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+            response.set_cookie(
+                self.COOKIE_NAME, int(time.time()) + seconds, max_age=seconds, httponly=True, samesite='Lax',
+            )
+        return response
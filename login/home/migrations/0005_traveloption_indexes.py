@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0004_contact_traveloption_remove_booking_booking_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(fields=['source', 'destination', 'date_time'], name='travel_route_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(fields=['source', 'destination', 'price'], name='travel_route_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(fields=['type', 'date_time'], name='travel_type_departure_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    The booking table still had the pre-TravelOption columns (transport_type,
+    from_station, ...) that no longer match the model, so it is rebuilt
+    against TravelOption. Old rows have no travel option to point at.
+    """
+
+    dependencies = [
+        ('home', '0005_traveloption_indexes'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='Booking',
+        ),
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('booking_id', models.AutoField(primary_key=True, serialize=False)),
+                ('number_of_seats', models.PositiveIntegerField()),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('booking_date', models.DateTimeField(auto_now_add=True)),
+                ('status', models.CharField(choices=[('Confirmed', 'Confirmed'), ('Cancelled', 'Cancelled')], default='Confirmed', max_length=10)),
+                ('travel_option', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='home.traveloption')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='home.register')),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0006_rebuild_booking'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-booking_id'], name='booking_user_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0007_booking_user_recent_idx'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='traveloption',
+            constraint=models.UniqueConstraint(fields=('type', 'source', 'destination', 'date_time'), name='travel_departure_unique'),
+        ),
+    ]
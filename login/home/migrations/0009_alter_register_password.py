@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0008_traveloption_departure_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='register',
+            name='password',
+            field=models.CharField(max_length=255),
+        ),
+    ]
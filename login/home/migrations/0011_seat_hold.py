@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0010_route_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatHold',
+            fields=[
+                ('hold_id', models.AutoField(primary_key=True, serialize=False)),
+                ('seats', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('Active', 'Active'), ('Confirmed', 'Confirmed'), ('Released', 'Released'), ('Expired', 'Expired')], default='Active', max_length=10)),
+                ('travel_option', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='home.traveloption')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='home.register')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'Active')), fields=['expires_at'], name='seat_hold_active_expiry_idx')],
+            },
+        ),
+    ]
@@ -6,7 +6,7 @@ from django.contrib.auth.models import User
 class Register(models.Model):
     username = models.CharField(max_length=100)
     email = models.EmailField(unique=True)
-    password = models.CharField(max_length=100)
+    password = models.CharField(max_length=255)  # room for scrypt/argon2 hashes
 
     def __str__(self):
         return self.username
@@ -24,6 +24,11 @@ class UserProfile(models.Model):
     phone = models.CharField(max_length=15, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
 
+# Ids and seat counts live in 32-bit integer columns. Larger values from a
+# request can match no row, and some overflow the database driver.
+MAX_INTEGER = 2**31 - 1
+
+
 class TravelOption(models.Model):
     TRAVEL_TYPES = [
         ('Flight', 'Flight'),
@@ -39,8 +44,22 @@ class TravelOption(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     available_seats = models.PositiveIntegerField()
 
+    class Meta:
+        # Route lookups filter on (source, destination) and page through
+        # departures or fares, so both orderings get their own index.
+        indexes = [
+            models.Index(fields=['source', 'destination', 'date_time'], name='travel_route_departure_idx'),
+            models.Index(fields=['source', 'destination', 'price'], name='travel_route_price_idx'),
+            models.Index(fields=['type', 'date_time'], name='travel_type_departure_idx'),
+        ]
+        # Natural key of a departure; timetable imports upsert against it.
+        constraints = [
+            models.UniqueConstraint(fields=['type', 'source', 'destination', 'date_time'], name='travel_departure_unique'),
+        ]
+
     def __str__(self):
         return f"{self.type} {self.source} → {self.destination} on {self.date_time}"
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('Confirmed', 'Confirmed'),
@@ -48,15 +67,220 @@ class Booking(models.Model):
     ]
 
     booking_id = models.AutoField(primary_key=True)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(Register, on_delete=models.CASCADE)
     travel_option = models.ForeignKey(TravelOption, on_delete=models.CASCADE)
     number_of_seats = models.PositiveIntegerField()
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     booking_date = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Confirmed')
 
+    class Meta:
+        # Booking history is paged newest-first per user.
+        indexes = [
+            models.Index(fields=['user', '-booking_id'], name='booking_user_recent_idx'),
+        ]
+
+    archived = False
+
+    def __str__(self):
+        # Only name the user if it is already loaded; never fetch it just for display.
+        if Booking.user.is_cached(self):
+            return f"Booking {self.booking_id} by {self.user.username}"
+        return f"Booking {self.booking_id} by user #{self.user_id}"
+
+
+class ArchivedTravelOption(models.Model):
+    """
+    A departed TravelOption moved out of the hot table by home/archive.py.
+    Keeps its original travel_id, so archived bookings still point at it.
+    """
+
+    travel_id = models.IntegerField(primary_key=True)
+    type = models.CharField(max_length=10, choices=TravelOption.TRAVEL_TYPES)
+    source = models.CharField(max_length=100)
+    destination = models.CharField(max_length=100)
+    date_time = models.DateTimeField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    available_seats = models.PositiveIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_time'], name='archived_travel_departure_idx'),
+        ]
+
     def __str__(self):
-        return f"Booking {self.booking_id} by {self.user.username}"
+        return f"{self.type} {self.source} → {self.destination} on {self.date_time} (archived)"
 
 
+class ArchivedBooking(models.Model):
+    """A Booking on an archived departure, with its original booking_id."""
+
+    booking_id = models.IntegerField(primary_key=True)
+    user = models.ForeignKey(Register, on_delete=models.CASCADE)
+    travel_option = models.ForeignKey(ArchivedTravelOption, on_delete=models.CASCADE)
+    number_of_seats = models.PositiveIntegerField()
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    booking_date = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=Booking.STATUS_CHOICES)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    # Archived trips have departed, so they can no longer be cancelled.
+    archived = True
+
+    class Meta:
+        # Booking history is paged newest-first per user, as on Booking.
+        indexes = [
+            models.Index(fields=['user', '-booking_id'], name='archived_booking_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived booking {self.booking_id} by user #{self.user_id}"
+
+
+class SeatHold(models.Model):
+    """
+    Seats set aside on a TravelOption during checkout. Placing a hold takes
+    the seats from ``available_seats`` straight away; confirming it turns it
+    into a Booking, and releasing or expiring it hands the seats back (see
+    home/holds.py).
+    """
+
+    STATUS_CHOICES = [
+        ('Active', 'Active'),
+        ('Confirmed', 'Confirmed'),
+        ('Released', 'Released'),
+        ('Expired', 'Expired'),
+    ]
+
+    hold_id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(Register, on_delete=models.CASCADE)
+    travel_option = models.ForeignKey(TravelOption, on_delete=models.CASCADE)
+    seats = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Active')
+
+    class Meta:
+        # The sweeper reads active holds by expiry. Only active rows are
+        # indexed, so the index stays small however much history piles up.
+        indexes = [
+            models.Index(fields=['expires_at'], condition=models.Q(status='Active'), name='seat_hold_active_expiry_idx'),
+        ]
 
+    def __str__(self):
+        return f"Hold {self.hold_id}: {self.seats} seat(s) on #{self.travel_option_id} until {self.expires_at}"
+
+
+class BookingEvent(models.Model):
+    """
+    One change to a Booking, appended in the same transaction as the change
+    itself. Rows are never updated; consumers read them in ``event_id``
+    order (see home/events.py).
+    """
+
+    BOOKED = 'booked'
+    CANCELLED = 'cancelled'
+    KIND_CHOICES = [
+        (BOOKED, 'Booked'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    event_id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Plain ids, not foreign keys: events outlive archived bookings.
+    booking_id = models.IntegerField()
+    user_id = models.IntegerField()
+    travel_option_id = models.IntegerField()
+    seats = models.PositiveIntegerField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Event {self.event_id}: booking {self.booking_id} {self.kind}"
+
+
+class EventCheckpoint(models.Model):
+    """The last BookingEvent a consumer has processed."""
+
+    consumer = models.CharField(max_length=50, primary_key=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.consumer} at event {self.position}"
+
+
+class Notification(models.Model):
+    """
+    An email queued for the notification dispatcher (see home/notifications.py).
+    ``key`` names what the email is about, so it can only be queued once.
+    """
+
+    PENDING = 'Pending'
+    SENDING = 'Sending'
+    SENT = 'Sent'
+    FAILED = 'Failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    key = models.CharField(max_length=100, unique=True)
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # When a pending email is due, or when a worker's claim on it runs out.
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # Workers read due emails by time; sent and failed ones stay out of the index.
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'], condition=models.Q(status__in=['Pending', 'Sending']),
+                name='notification_due_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.recipient} ({self.status})"
+
+
+class RouteDailyStats(models.Model):
+    """
+    Bookings, revenue and load for one route, travel type and departure day.
+
+    Maintained by home/route_stats.py; never edit rows by hand, rebuild them
+    with ``manage.py rebuild_route_stats`` instead.
+    """
+
+    type = models.CharField(max_length=10, choices=TravelOption.TRAVEL_TYPES)
+    source = models.CharField(max_length=100)
+    destination = models.CharField(max_length=100)
+    day = models.DateField()
+    departures = models.PositiveIntegerField(default=0)
+    capacity = models.PositiveIntegerField(default=0)  # seats offered: available + booked + held
+    bookings = models.IntegerField(default=0)  # confirmed
+    cancellations = models.IntegerField(default=0)
+    seats_booked = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        # Dashboards read a route over a range of days.
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'destination', 'day', 'type'], name='route_daily_stats_unique'),
+        ]
+
+    @property
+    def load_factor(self):
+        return self.seats_booked / self.capacity if self.capacity else None
+
+    def __str__(self):
+        return f"{self.type} {self.source} → {self.destination} on {self.day}"
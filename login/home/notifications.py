@@ -0,0 +1,199 @@
+"""
+Booking confirmation and cancellation emails.
+
+Nothing here runs during a request: booking views only write their
+BookingEvent (home/events.py), so notifications on or off, a booking costs
+the same. The ``notifications`` event consumer turns events into
+Notification rows, and ``manage.py dispatch_notifications`` sends them from
+a pool of worker threads.
+
+- Idempotent: a notification's key names the booking and the change, and
+  keys already queued are ignored, so replayed events queue nothing new.
+  Workers claim notifications for NOTIFICATION_LEASE_SECONDS, so two
+  workers never send the same one at once.
+- Batched: a worker claims a batch of due notifications and sends them
+  over a single connection to the mail server.
+- Retried: a failed send is tried again after NOTIFICATION_RETRY_BASE
+  seconds, doubling on every attempt up to NOTIFICATION_RETRY_MAX, and
+  given up after NOTIFICATION_MAX_ATTEMPTS.
+
+A worker that dies after the mail server took a message but before
+recording it sends that message again once its claim runs out. The resend
+carries the same Message-ID, so mail clients can drop the duplicate.
+"""
+
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.utils import DNS_NAME
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import events
+from .booking import retry_on_locked
+from .models import ArchivedTravelOption, Notification, Register, TravelOption
+
+CONSUMER = 'notifications'
+# event kind -> (subject, body template)
+MESSAGES = {
+    events.BOOKED: ("Booking confirmed: {route}", 'emails/booking_confirmed.txt'),
+    events.CANCELLED: ("Booking cancelled: {route}", 'emails/booking_cancelled.txt'),
+}
+OPTION_FIELDS = ('travel_id', 'type', 'source', 'destination', 'date_time')
+
+
+def render_booking_notifications(batch):
+    """Render the email for each booking event in ``batch``, unsaved."""
+    if not getattr(settings, 'NOTIFICATIONS_ENABLED', True):
+        return []  # the checkpoint still moves on, so turning them on sends nothing stale
+    users = {
+        user['id']: user
+        for user in Register.objects.filter(id__in={event.user_id for event in batch}).values('id', 'username', 'email')
+    }
+    option_ids = {event.travel_option_id for event in batch}
+    options = {option['travel_id']: option for option in TravelOption.objects.filter(travel_id__in=option_ids).values(*OPTION_FIELDS)}
+    if len(options) < len(option_ids):
+        options.update(
+            (option['travel_id'], option)
+            for option in ArchivedTravelOption.objects.filter(travel_id__in=option_ids - options.keys()).values(*OPTION_FIELDS)
+        )
+
+    queued = []
+    for event in batch:
+        user, option = users.get(event.user_id), options.get(event.travel_option_id)
+        if user is None or option is None:
+            continue  # the account or the trip has been deleted since
+        subject, template = MESSAGES[event.kind]
+        queued.append(Notification(
+            key=f"booking-{event.booking_id}-{event.kind}",
+            recipient=user['email'],
+            subject=subject.format(route=f"{option['source']} → {option['destination']}"),
+            body=render_to_string(template, {'event': event, 'user': user, 'option': option}),
+        ))
+    return queued
+
+
+@events.consumer(CONSUMER, prepare=render_booking_notifications)
+def queue_booking_notifications(batch, queued):
+    """Queue the emails rendered for ``batch``."""
+    Notification.objects.bulk_create(queued, ignore_conflicts=True)
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the ``attempts``-th failed send, with jitter."""
+    base = getattr(settings, 'NOTIFICATION_RETRY_BASE', 60)
+    delay = min(base * 2 ** (attempts - 1), getattr(settings, 'NOTIFICATION_RETRY_MAX', 3600))
+    return delay + random.uniform(0, delay / 2)
+
+
+@retry_on_locked
+def claim(batch_size, now=None):
+    """
+    Claim up to ``batch_size`` due notifications for this worker and return
+    them. Notifications whose worker's claim ran out are due again.
+    """
+    now = now or timezone.now()
+    due = Notification.objects.filter(status__in=[Notification.PENDING, Notification.SENDING], next_attempt_at__lte=now)
+    max_attempts = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 6)
+    with transaction.atomic():
+        # Counting claims, not failures, also gives up on an email that
+        # keeps killing its worker: its claim runs out with no attempts left.
+        due.filter(attempts__gte=max_attempts).update(status=Notification.FAILED)
+        ids = list(
+            due.select_for_update(skip_locked=True)
+            .filter(attempts__lt=max_attempts)
+            .order_by('next_attempt_at')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        Notification.objects.filter(pk__in=ids).update(
+            status=Notification.SENDING, attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=getattr(settings, 'NOTIFICATION_LEASE_SECONDS', 300)),
+        )
+        return list(Notification.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def _message(notification):
+    return EmailMessage(
+        notification.subject, notification.body, to=[notification.recipient],
+        headers={'Message-ID': f"<{notification.key}@{DNS_NAME}>"},
+    )
+
+
+def send(notifications):
+    """
+    Send claimed notifications over one mail connection. Returns the ids
+    sent and ``{id: error}`` for the rest.
+    """
+    sent, errors = [], {}
+    try:
+        with get_connection() as connection:
+            for notification in notifications:
+                try:
+                    connection.send_messages([_message(notification)])
+                except Exception as exc:
+                    errors[notification.pk] = exc
+                else:
+                    sent.append(notification.pk)
+    except Exception as exc:
+        # Connecting failed: nothing after the last success went out.
+        for notification in notifications:
+            if notification.pk not in sent:
+                errors.setdefault(notification.pk, exc)
+    return sent, errors
+
+
+@retry_on_locked
+def _record(notifications, sent, errors, now):
+    max_attempts = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 6)
+    sent_by_attempts = defaultdict(list)
+    for notification in notifications:
+        if notification.pk in sent:
+            sent_by_attempts[notification.attempts].append(notification.pk)
+    delivered = retried = failed = 0
+    with transaction.atomic():
+        # Only rows still under this claim: once it ran out, another worker
+        # may have claimed the row again, and that bumped its attempts.
+        claimed = Notification.objects.filter(status=Notification.SENDING)
+        for attempts, ids in sent_by_attempts.items():
+            delivered += claimed.filter(pk__in=ids, attempts=attempts).update(
+                status=Notification.SENT, sent_at=now, last_error='',
+            )
+        for notification in notifications:
+            if notification.pk not in errors:
+                continue
+            error = repr(errors[notification.pk])[:1000]
+            mine = claimed.filter(pk=notification.pk, attempts=notification.attempts)
+            if notification.attempts >= max_attempts:
+                failed += mine.update(status=Notification.FAILED, last_error=error)
+            else:
+                retried += mine.update(
+                    status=Notification.PENDING, last_error=error,
+                    next_attempt_at=now + timedelta(seconds=retry_delay(notification.attempts)),
+                )
+    return delivered, retried, failed
+
+
+def dispatch(batch_size=50):
+    """Claim, send and record one batch. Returns ``(sent, retried, failed)``."""
+    notifications = claim(batch_size)
+    if not notifications:
+        return 0, 0, 0
+    sent, errors = send(notifications)
+    return _record(notifications, sent, errors, timezone.now())
+
+
+def dispatch_all(batch_size=50):
+    """Dispatch batches until no notification is due. Returns the summed ``(sent, retried, failed)``."""
+    totals = [0, 0, 0]
+    while True:
+        counts = dispatch(batch_size)
+        totals = [total + count for total, count in zip(totals, counts)]
+        if sum(counts) < batch_size:
+            return tuple(totals)
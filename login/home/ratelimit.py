@@ -0,0 +1,147 @@
+"""
+Request rate limiting backed by the cache framework.
+
+``hit`` is a simple fixed-window counter. ``over_limit`` / ``record`` form a
+sliding-window limiter: each key keeps one counter per window, and the
+count "over the last window" is the current counter plus the previous one
+weighted by how much of it still overlaps. If the cache backend fails, the
+sliding-window counters fall back to a bounded per-process table, so
+limits keep working per worker.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+logger = logging.getLogger(__name__)
+
+# Counters get their own cache, so other entries never cull them (which would reset a limit).
+CACHE_ALIAS = 'counters'
+cache = ConnectionProxy(caches, CACHE_ALIAS)
+
+
+def client_ip(request):
+    """The client address, taken from REMOTE_ADDR unless a trusted proxy header is configured."""
+    header = getattr(settings, 'CLIENT_IP_HEADER', None)
+    if header and request.META.get(header):
+        # X-Forwarded-For style headers list the original client first.
+        return request.META[header].split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def hit(scope, key, limit, window):
+    """
+    Count one event for ``key`` and return True while it is within ``limit``
+    events per ``window`` seconds (fixed window).
+    """
+    bucket = int(time.time() // window)
+    cache_key = f"ratelimit:{scope}:{key}:{bucket}"
+    if cache.add(cache_key, 1, timeout=window):
+        return True
+    try:
+        return cache.incr(cache_key) <= limit
+    except ValueError:
+        # The window expired between add() and incr(); start a new one.
+        cache.add(cache_key, 1, timeout=window)
+        return True
+
+
+class LocalCounters:
+    """A bounded in-process stand-in for the cache, used while the cache is unreachable."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._counts = OrderedDict()  # key -> (expires_at, count)
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            return {key: entry[1] for key in keys if (entry := self._counts.get(key)) and entry[0] > now}
+
+    def incr(self, key, timeout):
+        now = time.monotonic()
+        with self._lock:
+            expires_at, count = self._counts.get(key, (0, 0))
+            if expires_at <= now:
+                expires_at, count = now + timeout, 0
+            self._counts[key] = (expires_at, count + 1)
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._counts.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+local_counters = LocalCounters()
+
+
+def _window_keys(scope, key, window, now):
+    # Emails and IPs are free text, so hash them to stay within memcached's key rules.
+    digest = hashlib.md5(str(key).encode()).hexdigest()
+    bucket = int(now // window)
+    return f"ratelimit:{scope}:{digest}:{bucket}", f"ratelimit:{scope}:{digest}:{bucket - 1}"
+
+
+def _get_many(keys):
+    try:
+        return cache.get_many(keys)
+    except Exception:
+        logger.warning("Rate limit cache unavailable, using in-process counters", exc_info=True)
+        return local_counters.get_many(keys)
+
+
+def over_limit(rules, now=None):
+    """
+    Return the scope of the first ``(scope, key, limit, window)`` rule whose
+    sliding-window count has reached its limit, or None. Reads every rule's
+    counters in one cache round trip and counts nothing.
+    """
+    now = time.time() if now is None else now
+    keys = [_window_keys(scope, key, window, now) for scope, key, _, window in rules]
+    counts = _get_many([k for pair in keys for k in pair])
+    for (scope, _, limit, window), (current, previous) in zip(rules, keys):
+        overlap = 1 - (now % window) / window
+        if counts.get(current, 0) + counts.get(previous, 0) * overlap >= limit:
+            return scope
+    return None
+
+
+def record(rules, now=None):
+    """Count one event against every ``(scope, key, limit, window)`` rule."""
+    now = time.time() if now is None else now
+    for scope, key, _, window in rules:
+        current, _ = _window_keys(scope, key, window, now)
+        try:
+            # Kept for two windows: the next window still weighs this one.
+            if not cache.add(current, 1, timeout=2 * window):
+                cache.incr(current)
+        except ValueError:
+            cache.add(current, 1, timeout=2 * window)
+        except Exception:
+            logger.warning("Rate limit cache unavailable, using in-process counters", exc_info=True)
+            local_counters.incr(current, 2 * window)
+
+
+def reset(rules, now=None):
+    """Forget the counts of every ``(scope, key, limit, window)`` rule."""
+    now = time.time() if now is None else now
+    keys = [k for scope, key, _, window in rules for k in _window_keys(scope, key, window, now)]
+    local_counters.delete_many(keys)
+    try:
+        cache.delete_many(keys)
+    except Exception:
+        logger.warning("Rate limit cache unavailable, using in-process counters", exc_info=True)
@@ -0,0 +1,198 @@
+"""
+Cached per-route lookups on TravelOption.
+
+Everything is keyed by (source, destination, travel date), so a change to one
+departure only evicts the keys of the route and day it belongs to; the fare
+calendar is cached per route and month, keyed by the first day of the month.
+Eviction is driven by the signal handlers in ``home.signals``.
+
+Entries are always computed from the primary database, never a read
+replica: the cache is shared by every request, and a lagging replica would
+refill an entry a booking just evicted with the seats it had before, for
+the whole ROUTE_CACHE_TIMEOUT.
+"""
+
+import hashlib
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.connection import ConnectionProxy
+
+from .models import TravelOption
+
+CACHE_ALIAS = 'routes'
+cache = ConnectionProxy(caches, CACHE_ALIAS)
+
+KINDS = ('options', 'availability', 'prices')
+MONTH_KINDS = ('fare-month',)
+STATS_KEYS = {'hits': 'route-cache:hits', 'misses': 'route-cache:misses'}
+# Bumped to invalidate every route at once (e.g. after a bulk import).
+GENERATION_KEY = 'route-cache:generation'
+
+
+def _timeout():
+    return getattr(settings, 'ROUTE_CACHE_TIMEOUT', 300)
+
+
+def route_key(kind, source, destination, day):
+    # City names are free text, so hash them to stay within memcached's key rules.
+    digest = hashlib.md5(f"{source}\x00{destination}".encode()).hexdigest()
+    return f"route:{kind}:{digest}:{day.isoformat()}"
+
+
+def _count(stat):
+    key = STATS_KEYS[stat]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def _generation():
+    return cache.get_or_set(GENERATION_KEY, 1, timeout=None)
+
+
+def _cached(kind, source, destination, day, compute):
+    key = route_key(kind, source, destination, day)
+    generation = _generation()
+    value = cache.get(key, version=generation)
+    if value is not None:
+        _count('hits')
+        return value
+    _count('misses')
+    value = compute()
+    cache.set(key, value, _timeout(), version=generation)
+    return value
+
+
+def _timetable():
+    return TravelOption.objects.using(DEFAULT_DB_ALIAS)
+
+
+def _route_queryset(source, destination, day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return _timetable().filter(
+        source=source, destination=destination,
+        date_time__gte=start, date_time__lt=start + timedelta(days=1),
+    )
+
+
+def route_options(source, destination, day):
+    """The departures on a route for one day that have not left yet, as dicts ordered by departure."""
+    options = _cached('options', source, destination, day, lambda: list(
+        _route_queryset(source, destination, day)
+        .order_by('date_time', 'travel_id')
+        .values('travel_id', 'type', 'source', 'destination', 'date_time', 'price', 'available_seats')
+    ))
+    # Filtered on every call: a cached list outlives the departures in it.
+    now = timezone.now()
+    return [option for option in options if option['date_time'] > now]
+
+
+def route_availability(source, destination, day):
+    """Departure count and total free seats on a route for one day."""
+    return _cached('availability', source, destination, day, lambda: _route_queryset(
+        source, destination, day,
+    ).aggregate(departures=Count('travel_id'), seats=Sum('available_seats')))
+
+
+def route_price_range(source, destination, day):
+    """Cheapest and dearest fare on a route for one day."""
+    return _cached('prices', source, destination, day, lambda: _route_queryset(
+        source, destination, day,
+    ).aggregate(min_price=Min('price'), max_price=Max('price')))
+
+
+def _month_range(month):
+    """Aware datetimes bounding the calendar month that starts on ``month``."""
+    start = timezone.make_aware(datetime.combine(month, time.min))
+    next_month = (month + timedelta(days=32)).replace(day=1)
+    return start, timezone.make_aware(datetime.combine(next_month, time.min))
+
+
+def fare_month(source, destination, month):
+    """
+    Cheapest fare, free seats and departures per day and travel type for a
+    route over the calendar month starting on ``month``, from one grouped query.
+    """
+    def compute():
+        start, end = _month_range(month)
+        return list(
+            _timetable().filter(
+                source=source, destination=destination, date_time__gte=start, date_time__lt=end,
+            )
+            .annotate(day=TruncDate('date_time'))
+            .values('day', 'type')
+            .annotate(min_price=Min('price'), seats=Sum('available_seats'), departures=Count('travel_id'))
+            .order_by('day', 'type')
+        )
+    return _cached('fare-month', source, destination, month, compute)
+
+
+def fare_calendar(source, destination, day_from, day_to, travel_type=None):
+    """
+    One entry per day from ``day_from`` to ``day_to``: the cheapest fare
+    (None when nothing departs), free seats and departures, optionally for
+    one travel type only. Served from the per-month cache.
+    """
+    days = {}
+    month = day_from.replace(day=1)
+    while month <= day_to:
+        for row in fare_month(source, destination, month):
+            if travel_type and row['type'] != travel_type:
+                continue
+            day = days.setdefault(row['day'], {'min_price': None, 'seats': 0, 'departures': 0})
+            if day['min_price'] is None or row['min_price'] < day['min_price']:
+                day['min_price'] = row['min_price']
+            day['seats'] += row['seats']
+            day['departures'] += row['departures']
+        month = (month + timedelta(days=32)).replace(day=1)
+
+    empty = {'min_price': None, 'seats': 0, 'departures': 0}
+    return [
+        {'date': day_from + timedelta(days=n), **days.get(day_from + timedelta(days=n), empty)}
+        for n in range((day_to - day_from).days + 1)
+    ]
+
+
+def invalidate_route(source, destination, day):
+    keys = [route_key(kind, source, destination, day) for kind in KINDS]
+    keys += [route_key(kind, source, destination, day.replace(day=1)) for kind in MONTH_KINDS]
+    cache.delete_many(keys, version=_generation())
+
+
+def invalidate_all_routes():
+    # Entries under the old generation are never read again and age out.
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 2, timeout=None)
+
+
+def invalidate_travel_option(travel_id):
+    route = TravelOption.objects.filter(travel_id=travel_id).values_list(
+        'source', 'destination', 'date_time',
+    ).first()
+    if route:
+        invalidate_route(route[0], route[1], timezone.localdate(route[2]))
+
+
+def cache_stats():
+    hits = cache.get(STATS_KEYS['hits'], 0)
+    misses = cache.get(STATS_KEYS['misses'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else None,
+    }
+
+
+def reset_cache_stats():
+    cache.delete_many(list(STATS_KEYS.values()))
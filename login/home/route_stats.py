@@ -0,0 +1,187 @@
+"""
+Per-route, per-day booking analytics kept in the RouteDailyStats table.
+
+Bookings and cancellations adjust their route/day row in place, inside the
+same transaction as the seat change (see booking.py), so the table never
+drifts from the bookings it summarises. Departure edits recompute the
+affected rows (see signals.py), and ``rebuild()`` recomputes any range of
+days from scratch (``manage.py rebuild_route_stats``). Reading a route over a
+date range touches one row per day, however many bookings there are.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ArchivedTravelOption, Booking, RouteDailyStats, SeatHold, TravelOption
+
+KEY_FIELDS = ('type', 'source', 'destination', 'day')
+# Days aggregated per query and transaction by rebuild().
+REBUILD_WINDOW_DAYS = 31
+
+
+def stats_key(type, source, destination, date_time):
+    """The RouteDailyStats key of a departure."""
+    return {'type': type, 'source': source, 'destination': destination, 'day': timezone.localdate(date_time)}
+
+
+def _departing(day_from, day_to, prefix=''):
+    """Filter kwargs for departures on local days ``day_from``..``day_to``, as an index-friendly range."""
+    start = timezone.make_aware(datetime.combine(day_from, time.min))
+    end = timezone.make_aware(datetime.combine(day_to + timedelta(days=1), time.min))
+    return {f'{prefix}date_time__gte': start, f'{prefix}date_time__lt': end}
+
+
+def _bump(key, **deltas):
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if RouteDailyStats.objects.filter(**key).update(**updates):
+        return
+    try:
+        # Savepoint, so losing the race to create the row leaves the outer
+        # transaction usable for the update below.
+        with transaction.atomic():
+            RouteDailyStats.objects.create(**key, **deltas)
+    except IntegrityError:
+        RouteDailyStats.objects.filter(**key).update(**updates)
+
+
+def record_booking(key, seats, total_price, bookings=1):
+    # Seats move from available (or an active hold) to booked, so capacity is unchanged.
+    _bump(key, bookings=bookings, seats_booked=seats, revenue=total_price)
+
+
+def record_cancellation(key, seats, total_price):
+    _bump(key, bookings=-1, cancellations=1, seats_booked=-seats, revenue=-total_price)
+
+
+def _by_key(queryset):
+    """``queryset`` (of a model with a travel_option) grouped by the RouteDailyStats key of its departure."""
+    return queryset.annotate(day=TruncDate('travel_option__date_time')).values(
+        'day', type=F('travel_option__type'),
+        source=F('travel_option__source'), destination=F('travel_option__destination'),
+    )
+
+
+def _compute(options, bookings, holds):
+    """
+    Aggregate the given TravelOption, Booking and active SeatHold querysets
+    into unsaved RouteDailyStats rows. Capacity counts seats however they
+    are held (free, booked or held during checkout), so placing, confirming,
+    releasing or expiring a hold never changes it.
+    """
+    rows = {}
+    departures = (
+        options.annotate(day=TruncDate('date_time'))
+        .values('type', 'source', 'destination', 'day')
+        .annotate(departures=Count('travel_id'), available=Sum('available_seats'))
+        .order_by()
+    )
+    for row in departures:
+        rows[tuple(row[f] for f in KEY_FIELDS)] = RouteDailyStats(
+            **{f: row[f] for f in KEY_FIELDS}, departures=row['departures'], capacity=row['available'],
+        )
+
+    confirmed = Q(status='Confirmed')
+    booked = (
+        _by_key(bookings)
+        .annotate(
+            bookings=Count('booking_id', filter=confirmed),
+            cancellations=Count('booking_id', filter=~confirmed),
+            seats_booked=Sum('number_of_seats', filter=confirmed, default=0),
+            revenue=Sum('total_price', filter=confirmed, default=0),
+        )
+        .order_by()
+    )
+    for row in booked:
+        stats = rows[tuple(row[f] for f in KEY_FIELDS)]
+        stats.bookings = row['bookings']
+        stats.cancellations = row['cancellations']
+        stats.seats_booked = row['seats_booked']
+        stats.revenue = row['revenue']
+        stats.capacity += row['seats_booked']
+
+    for row in _by_key(holds).annotate(held=Sum('seats')).order_by():
+        rows[tuple(row[f] for f in KEY_FIELDS)].capacity += row['held']
+    return list(rows.values())
+
+
+def refresh(keys):
+    """Recompute the RouteDailyStats rows for the given keys."""
+    for key in keys:
+        options = TravelOption.objects.filter(
+            type=key['type'], source=key['source'], destination=key['destination'],
+            **_departing(key['day'], key['day']),
+        )
+        bookings = Booking.objects.filter(travel_option__in=options)
+        holds = SeatHold.objects.filter(travel_option__in=options, status='Active')
+        with transaction.atomic():
+            RouteDailyStats.objects.filter(**key).delete()
+            RouteDailyStats.objects.bulk_create(_compute(options, bookings, holds))
+
+
+def rebuild(day_from=None, day_to=None):
+    """
+    Recompute every RouteDailyStats row for departures from ``day_from`` to
+    ``day_to`` inclusive (default: the whole timetable), skipping archived
+    days. Returns the number of rows written.
+    """
+    # Archived days have no departures left to count; their rows are final.
+    archived = ArchivedTravelOption.objects.aggregate(last=Max('date_time'))['last']
+    kept = RouteDailyStats.objects.all()
+    if archived is not None:
+        archived_through = timezone.localdate(archived)
+        kept = kept.filter(day__gt=archived_through)
+
+    whole_timetable = day_from is None and day_to is None
+    if day_from is None or day_to is None:
+        bounds = TravelOption.objects.aggregate(first=Min('date_time'), last=Max('date_time'))
+        if bounds['first'] is None:
+            if whole_timetable:
+                kept.delete()
+            return 0
+        day_from = day_from or timezone.localdate(bounds['first'])
+        day_to = day_to or timezone.localdate(bounds['last'])
+    if archived is not None:
+        day_from = max(day_from, archived_through + timedelta(days=1))
+    if whole_timetable:
+        # Days outside the timetable no longer have any departures.
+        kept.exclude(day__range=(day_from, day_to)).delete()
+
+    written = 0
+    start = day_from
+    while start <= day_to:
+        end = min(start + timedelta(days=REBUILD_WINDOW_DAYS - 1), day_to)
+        options = TravelOption.objects.filter(**_departing(start, end))
+        bookings = Booking.objects.filter(**_departing(start, end, prefix='travel_option__'))
+        holds = SeatHold.objects.filter(status='Active', **_departing(start, end, prefix='travel_option__'))
+        with transaction.atomic():
+            RouteDailyStats.objects.filter(day__range=(start, end)).delete()
+            written += len(RouteDailyStats.objects.bulk_create(_compute(options, bookings, holds)))
+        start = end + timedelta(days=1)
+    return written
+
+
+REPORT_FIELDS = (
+    'day', 'type', 'departures', 'capacity', 'bookings', 'cancellations', 'seats_booked', 'revenue',
+)
+TOTAL_FIELDS = ('departures', 'capacity', 'bookings', 'cancellations', 'seats_booked', 'revenue')
+
+
+def _load_factor(row):
+    return round(row['seats_booked'] / row['capacity'], 4) if row['capacity'] else None
+
+
+def route_report(source, destination, day_from, day_to, travel_type=None):
+    """Daily rows and totals for a route, read from RouteDailyStats only."""
+    rows = RouteDailyStats.objects.filter(source=source, destination=destination, day__range=(day_from, day_to))
+    if travel_type:
+        rows = rows.filter(type=travel_type)
+    days = list(rows.order_by('day', 'type').values(*REPORT_FIELDS))
+
+    totals = {field: sum(row[field] for row in days) for field in TOTAL_FIELDS}
+    for row in days + [totals]:
+        row['load_factor'] = _load_factor(row)
+    return {'days': days, 'totals': totals}
@@ -0,0 +1,157 @@
+"""
+Travel option search with keyset pagination.
+
+Every query is shaped to be answered from one of the composite indexes on
+TravelOption: equality on (source, destination) or type, then a range/order
+on date_time or price, with travel_id as the tie-breaker.
+"""
+
+import base64
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import MAX_INTEGER, TravelOption
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# sort name -> model field used for ordering and the keyset comparison
+SORT_FIELDS = {
+    'departure': 'date_time',
+    'price': 'price',
+}
+
+RESULT_FIELDS = ('travel_id', 'type', 'source', 'destination', 'date_time', 'price', 'available_seats')
+
+
+class SearchError(ValueError):
+    pass
+
+
+def encode_cursor(sort, row):
+    value = row[SORT_FIELDS[sort]]
+    value = value.isoformat() if isinstance(value, datetime) else str(value)
+    raw = json.dumps([value, row['travel_id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(sort, cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, travel_id = json.loads(base64.urlsafe_b64decode(padded))
+        if sort == 'price':
+            value = Decimal(value)
+            if not value.is_finite():
+                raise ValueError(cursor)
+        else:
+            value = parse_datetime(value)
+            if value is None:
+                raise ValueError(cursor)
+        travel_id = int(travel_id)
+        if not 0 <= travel_id <= MAX_INTEGER:
+            raise ValueError(cursor)
+        return value, travel_id
+    except (ValueError, TypeError, InvalidOperation):
+        raise SearchError("Invalid cursor")
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _parse_day(params, name):
+    try:
+        # Well-formed but impossible dates (2026-02-30) raise instead of returning None.
+        day = parse_date(params[name])
+    except ValueError:
+        day = None
+    if day is None:
+        raise SearchError(f"Invalid {name}")
+    return day
+
+
+def parse_search_params(params):
+    """Validate a QueryDict/dict of search parameters into keyword arguments."""
+    sort = params.get('sort') or 'departure'
+    if sort not in SORT_FIELDS:
+        raise SearchError("sort must be one of: " + ", ".join(SORT_FIELDS))
+
+    travel_type = params.get('type') or None
+    if travel_type and travel_type not in dict(TravelOption.TRAVEL_TYPES):
+        raise SearchError("Unknown travel type")
+
+    date_from = date_to = None
+    if params.get('date_from'):
+        date_from = _parse_day(params, 'date_from')
+    if params.get('date_to'):
+        date_to = _parse_day(params, 'date_to')
+
+    try:
+        limit = int(params.get('limit') or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        raise SearchError("limit must be an integer")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    return {
+        'source': (params.get('source') or '').strip() or None,
+        'destination': (params.get('destination') or '').strip() or None,
+        'travel_type': travel_type,
+        'date_from': date_from,
+        'date_to': date_to,
+        'sort': sort,
+        'cursor': params.get('cursor') or None,
+        'limit': limit,
+    }
+
+
+def _search_queryset(source, destination, travel_type, date_from, date_to, sort, cursor):
+    qs = TravelOption.objects.all()
+    if source:
+        qs = qs.filter(source=source)
+    if destination:
+        qs = qs.filter(destination=destination)
+    if travel_type:
+        qs = qs.filter(type=travel_type)
+    if date_from:
+        qs = qs.filter(date_time__gte=_day_start(date_from))
+    if date_to:
+        qs = qs.filter(date_time__lt=_day_start(date_to + timedelta(days=1)))
+
+    field = SORT_FIELDS[sort]
+    if cursor:
+        value, travel_id = decode_cursor(sort, cursor)
+        qs = qs.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'travel_id__gt': travel_id}))
+    return qs.order_by(field, 'travel_id').values(*RESULT_FIELDS)
+
+
+def _page(rows, sort, limit):
+    # One extra row was fetched to learn whether another page exists.
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(sort, rows[-1])
+    return rows, None
+
+
+def search_travel_options(source=None, destination=None, travel_type=None,
+                          date_from=None, date_to=None, sort='departure',
+                          cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return (rows, next_cursor) for one page of matching travel options.
+
+    Rows are plain dicts from ``.values()``; next_cursor is None on the last page.
+    """
+    qs = _search_queryset(source, destination, travel_type, date_from, date_to, sort, cursor)
+    return _page(list(qs[:limit + 1]), sort, limit)
+
+
+async def asearch_travel_options(source=None, destination=None, travel_type=None,
+                                 date_from=None, date_to=None, sort='departure',
+                                 cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Async counterpart of search_travel_options()."""
+    qs = _search_queryset(source, destination, travel_type, date_from, date_to, sort, cursor)
+    return _page([row async for row in qs[:limit + 1]], sort, limit)
@@ -0,0 +1,86 @@
+"""
+Signal handlers that keep derived data in step with TravelOption and Booking.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .itinerary import record_changes as record_itinerary_changes
+from .middleware import forget_traveler
+from .models import Booking, Register, TravelOption
+from .route_cache import invalidate_route, invalidate_travel_option
+from .route_stats import refresh as refresh_route_stats, stats_key
+
+
+def _route_of(instance):
+    # Read straight from __dict__ so deferred fields never trigger a query.
+    fields = instance.__dict__
+    if fields.get('date_time') is None or 'source' not in fields or 'destination' not in fields:
+        return None
+    return fields['source'], fields['destination'], timezone.localdate(fields['date_time'])
+
+
+def _stats_key_of(instance):
+    fields = instance.__dict__
+    if fields.get('date_time') is None or any(f not in fields for f in ('type', 'source', 'destination')):
+        return None
+    return stats_key(fields['type'], fields['source'], fields['destination'], fields['date_time'])
+
+
+@receiver(pre_save, sender=TravelOption)
+def remember_route(sender, instance, **kwargs):
+    # Edits are rare next to reads, so look the stored route up here rather
+    # than tracking it on every instance load.
+    instance._loaded_route = instance._loaded_stats_key = None
+    if not instance._state.adding and instance.pk is not None:
+        stored = TravelOption.objects.filter(pk=instance.pk).values('type', 'source', 'destination', 'date_time').first()
+        if stored:
+            instance._loaded_route = _route_of(TravelOption(**stored))
+            instance._loaded_stats_key = _stats_key_of(TravelOption(**stored))
+
+
+@receiver(post_save, sender=TravelOption)
+@receiver(post_delete, sender=TravelOption)
+def evict_travel_option_route(sender, instance, **kwargs):
+    # A save may have moved the departure to another route/day: evict both.
+    routes = {_route_of(instance), getattr(instance, '_loaded_route', None)} - {None}
+
+    def evict():
+        for route in routes:
+            invalidate_route(*route)
+    transaction.on_commit(evict, robust=True)
+
+
+@receiver(post_save, sender=TravelOption)
+@receiver(post_delete, sender=TravelOption)
+def refresh_travel_option_stats(sender, instance, **kwargs):
+    # Departures are edited rarely, so recompute their day rather than
+    # working out deltas. Runs inside the saving transaction.
+    keys = [_stats_key_of(instance), getattr(instance, '_loaded_stats_key', None)]
+    keys = [key for i, key in enumerate(keys) if key is not None and key not in keys[:i]]
+    refresh_route_stats(keys)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def evict_booking_route(sender, instance, **kwargs):
+    travel_id = instance.travel_option_id
+    transaction.on_commit(lambda: invalidate_travel_option(travel_id), robust=True)
+
+
+@receiver(post_save, sender=TravelOption)
+@receiver(post_delete, sender=TravelOption)
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def log_itinerary_change(sender, instance, **kwargs):
+    # Bookings change a departure's free seats, which the planner filters on.
+    travel_id = instance.pk if sender is TravelOption else instance.travel_option_id
+    transaction.on_commit(lambda: record_itinerary_changes([travel_id]), robust=True)
+
+
+@receiver(post_save, sender=Register)
+@receiver(post_delete, sender=Register)
+def evict_cached_traveler(sender, instance, **kwargs):
+    forget_traveler(instance.id)
@@ -0,0 +1,4 @@
+function setOption(type) {
+  document.getElementById("transport_type").value = type;
+  alert("You selected: " + type);
+}
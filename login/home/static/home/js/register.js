@@ -0,0 +1,29 @@
+function validateForm() {
+  const password = document.getElementById('password').value;
+  const confirmPassword = document.getElementById('confirm_password').value;
+  const username = document.getElementById('username').value;
+  const email = document.getElementById('email').value;
+
+  if (password !== confirmPassword) {
+    alert("Passwords do not match!");
+    return false;
+  }
+
+  if (password.length < 8) {
+    alert("Password must be at least 8 characters long!");
+    return false;
+  }
+
+  if (username.length < 3) {
+    alert("Username must be at least 3 characters long!");
+    return false;
+  }
+
+  const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
+  if (!emailRegex.test(email)) {
+    alert("Please enter a valid email address!");
+    return false;
+  }
+
+  return true;
+}
@@ -1,3 +1,1484 @@
-from django.test import TestCase
+import base64
+import gzip
+import json
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import StringIO
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.core.cache import caches
+from django.db import connection
+from django.db.utils import ConnectionDoesNotExist
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+
+from . import archive, asgi_static, async_views, contact_queue, context_processors, events, hashers, holds, itinerary, login_throttle, notifications, ratelimit, route_cache, route_stats, search, urls as home_urls
+from .booking import BookingError, GroupBookingError, NotEnoughSeats, book_group, book_seats, cancel_booking
+from .db_router import ReplicaRouter
+from .middleware import ReplicaPinMiddleware, SlidingSessionMiddleware, forget_traveler
+from .models import ArchivedBooking, ArchivedTravelOption, Booking, BookingEvent, Contact, EventCheckpoint, Notification, Register, RouteDailyStats, SeatHold, TravelOption
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+
+
+class QueryBudgetMixin:
+    """assertMaxQueries: fail when a block runs more than ``limit`` queries."""
+
+    @contextmanager
+    def assertMaxQueries(self, limit):
+        with CaptureQueriesContext(connection) as ctx:
+            yield ctx
+        executed = len(ctx.captured_queries)
+        if executed > limit:
+            sql = "\n".join(f"{i}. {q['sql']}" for i, q in enumerate(ctx.captured_queries, 1))
+            self.fail(f"{executed} queries executed, budget is {limit}:\n{sql}")
+
+
+class ViewQueryCountTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Register.objects.create(
+            username='traveler', email='traveler@example.com', password=make_password('secret'),
+        )
+        cls.departure = timezone.now() + timedelta(days=3)
+        cls.options = TravelOption.objects.bulk_create([
+            TravelOption(type='Train', source='Delhi', destination='Agra',
+                         date_time=cls.departure + timedelta(hours=i), price=500 + i, available_seats=50)
+            for i in range(5)
+        ])
+        Booking.objects.bulk_create([
+            Booking(user=cls.user, travel_option=option, number_of_seats=2, total_price=option.price * 2)
+            for option in cls.options for _ in range(4)
+        ])
+        # bulk_create skips the stats bookkeeping, as timetable imports do.
+        route_stats.rebuild()
+
+    def setUp(self):
+        forget_traveler()
+        session = self.client.session
+        session['user_id'] = self.user.id
+        # Steady state: the sliding expiry was refreshed recently, so the
+        # session is served from the cache and not rewritten.
+        session[SlidingSessionMiddleware.REFRESHED_KEY] = int(time.time())
+        session.save()
+
+    def test_home(self):
+        with self.assertMaxQueries(1):
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_home_fragments_keep_messages_per_request(self):
+        clear_caches()
+        self.client.get(reverse('home'))  # fills the fragment caches
+        self.client.post(reverse('contact'), {'full_name': 'Asha'})
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'TRAVELSBUDDY')
+        self.assertContains(response, 'Please fill in your name')
+
+    def test_fragment_version_is_worked_out_once_without_debug(self):
+        context_processors._startup_version.cache_clear()
+        request = RequestFactory().get('/')
+        with mock.patch.object(context_processors.os, 'stat', wraps=os.stat) as stat:
+            def home_stats():
+                return sum(str(call.args[0]).endswith('home.html') for call in stat.call_args_list)
+
+            versions = {context_processors.template_fragments(request)['fragment_version'] for _ in range(3)}
+            self.assertEqual(home_stats(), 1)
+            with self.settings(DEBUG=True):
+                self.assertEqual(context_processors.template_fragments(request)['fragment_version'], versions.pop())
+            self.assertEqual(home_stats(), 2)
+
+    def test_my_bookings_does_not_grow_with_bookings(self):
+        # Session user, then one page each from the live and archived bookings.
+        with self.assertMaxQueries(3):
+            response = self.client.get(reverse('my_bookings'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Delhi → Agra', count=20)
+
+    def test_book_route_listing(self):
+        url = reverse('book') + f"?from_station=Delhi&to_station=Agra&journey_date={self.departure.date()}"
+        with self.assertMaxQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_book_route_listing_rejects_impossible_date(self):
+        params = {'from_station': 'Delhi', 'to_station': 'Agra', 'journey_date': '2026-02-30'}
+        self.assertContains(self.client.get(reverse('book'), params), 'Invalid journey date')
+
+    # Booking writes include the BookingEvent insert.
+    def test_book_post(self):
+        with self.assertMaxQueries(8):
+            response = self.client.post(reverse('book'), {'travel_id': self.options[0].travel_id, 'seats': 1})
+        self.assertContains(response, 'confirmed')
+
+    def test_bulk_booking_costs_the_same_as_one_booking(self):
+        items = [{'travel_id': option.travel_id, 'seats': 1} for option in self.options for _ in range(10)]
+        with self.assertMaxQueries(8):
+            response = self.client.post(
+                reverse('bulk_booking_api'), json.dumps({'bookings': items}), content_type='application/json',
+            )
+        self.assertEqual(response.json()['booked'], 50)
+
+    def test_cancel_booking(self):
+        booking = Booking.objects.filter(user=self.user).first()
+        with self.assertMaxQueries(8):
+            response = self.client.post(reverse('cancel_booking', args=[booking.booking_id]))
+        self.assertEqual(response.status_code, 302)
+
+    def test_cancel_booking_refuses_get(self):
+        booking = Booking.objects.filter(user=self.user, status='Confirmed').first()
+        response = self.client.get(reverse('cancel_booking', args=[booking.booking_id]))
+        self.assertEqual(response.status_code, 405)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'Confirmed')
+
+    def test_traveler_cached_between_requests(self):
+        self.client.get(reverse('home'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('home'))
+        self.assertFalse(any('home_register' in q['sql'] for q in ctx.captured_queries))
+
+    def test_session_not_rewritten_until_expiry_is_near(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('home'))
+        self.assertFalse(any('django_session' in q['sql'] for q in ctx.captured_queries))
+
+        session = self.client.session
+        session[SlidingSessionMiddleware.REFRESHED_KEY] = int(time.time()) - 10 * 24 * 3600
+        session.save()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('home'))
+        self.assertTrue(any(q['sql'].startswith('UPDATE "django_session"') for q in ctx.captured_queries))
+
+    def test_travel_search_api(self):
+        with self.assertMaxQueries(1):
+            response = self.client.get(reverse('travel_search_api'), {'source': 'Delhi', 'destination': 'Agra'})
+        self.assertEqual(len(response.json()['results']), 5)
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        departure = timezone.now().replace(microsecond=0) + timedelta(days=3)
+        # Same departure time and same fares across destinations, so pages split inside ties.
+        TravelOption.objects.bulk_create([
+            TravelOption(type='Bus', source='Surat', destination=f"Stop {n}",
+                         date_time=departure + timedelta(hours=n // 3), price=100 + 50 * (n % 2), available_seats=5)
+            for n in range(7)
+        ])
+
+    def pages(self, sort):
+        seen, cursor = [], None
+        while True:
+            params = {'source': 'Surat', 'sort': sort, 'limit': 2, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get(reverse('travel_search_api'), params).json()
+            seen += [(row['date_time'] if sort == 'departure' else Decimal(row['price']), row['travel_id'])
+                     for row in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                return seen
+
+    def test_cursor_pages_cover_ties_in_order(self):
+        for sort in ('departure', 'price'):
+            with self.subTest(sort=sort):
+                seen = self.pages(sort)
+                self.assertEqual(len(seen), 7)
+                self.assertEqual(seen, sorted(set(seen)))
+
+    def test_bad_input_is_a_400(self):
+        row = TravelOption.objects.values(*search.RESULT_FIELDS).first()
+        bad = {
+            'garbage cursor': {'cursor': 'not-a-cursor'},
+            'NaN price': {'sort': 'price', 'cursor': self.cursor('NaN', 1)},
+            'infinite price': {'sort': 'price', 'cursor': self.cursor('Infinity', 1)},
+            'huge travel id': {'cursor': self.cursor(row['date_time'].isoformat(), 10**30)},
+            'impossible cursor date': {'cursor': self.cursor('2026-02-30T10:00:00+00:00', 1)},
+            'impossible date_from': {'date_from': '2026-02-30'},
+            'impossible date_to': {'date_to': '2026-13-01'},
+        }
+        for name, params in bad.items():
+            with self.subTest(name):
+                response = self.client.get(reverse('travel_search_api'), params)
+                self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('travel_search'), {'date_from': '2026-02-30'})
+        self.assertContains(response, 'Invalid date_from')
+
+    @staticmethod
+    def cursor(value, travel_id):
+        return base64.urlsafe_b64encode(json.dumps([value, travel_id]).encode()).decode()
+
+
+class BookingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Register.objects.create(username='rider', email='rider@example.com', password='!')
+        cls.option = TravelOption.objects.create(
+            type='Bus', source='Goa', destination='Pune', date_time=timezone.now() + timedelta(days=2),
+            price=500, available_seats=3,
+        )
+
+    def seats_left(self):
+        return TravelOption.objects.get(pk=self.option.pk).available_seats
+
+    def test_oversell_is_refused(self):
+        book_seats(self.user, self.option.travel_id, 2)
+        with self.assertRaisesMessage(NotEnoughSeats, "Not enough seats available"):
+            book_seats(self.user, self.option.travel_id, 2)
+        self.assertEqual(self.seats_left(), 1)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_cancel_releases_seats_once(self):
+        booking = book_seats(self.user, self.option.travel_id, 2)
+        self.assertTrue(cancel_booking(booking))
+        self.assertFalse(cancel_booking(Booking.objects.get(pk=booking.pk)))
+        self.assertEqual(self.seats_left(), 3)
+        self.assertEqual(Booking.objects.get(pk=booking.pk).status, 'Cancelled')
+
+    def test_departed_trips_cannot_be_booked(self):
+        TravelOption.objects.filter(pk=self.option.pk).update(date_time=timezone.now() - timedelta(minutes=1))
+        with self.assertRaisesMessage(BookingError, "This trip has already departed"):
+            book_seats(self.user, self.option.travel_id, 1)
+        with self.assertRaises(GroupBookingError) as refused:
+            book_group(self.user, [(self.option.travel_id, 1)])
+        self.assertEqual(refused.exception.results[0]['error'], "This trip has already departed")
+        self.assertEqual(self.seats_left(), 3)
+
+    def test_out_of_range_numbers_are_a_400(self):
+        forget_traveler()
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+        for data in ({'travel_id': 10 ** 30, 'seats': 1}, {'travel_id': self.option.travel_id, 'seats': 10 ** 30}):
+            response = self.client.post(reverse('book'), data)
+            self.assertContains(response, 'Invalid booking request', status_code=400)
+        self.assertEqual(self.seats_left(), 3)
+
+    def test_admin_cancels_through_booking_module(self):
+        booking = book_seats(self.user, self.option.travel_id, 2)
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        change_url = reverse('admin:home_booking_change', args=[booking.pk])
+        self.assertNotContains(self.client.get(change_url), 'name="number_of_seats"')
+        self.assertEqual(self.client.post(change_url, {'status': 'Cancelled'}).status_code, 403)
+        self.assertEqual(self.client.get(reverse('admin:home_booking_add')).status_code, 403)
+
+        self.client.post(reverse('admin:home_booking_changelist'), {
+            'action': 'cancel_bookings', admin.helpers.ACTION_CHECKBOX_NAME: [booking.pk],
+        })
+        self.assertEqual(Booking.objects.get(pk=booking.pk).status, 'Cancelled')
+        self.assertEqual(self.seats_left(), 3)
+        self.assertEqual(BookingEvent.objects.filter(kind=BookingEvent.CANCELLED).count(), 1)
+
+
+# Real concurrent transactions, which TestCase's wrapping transaction would serialise.
+class ConcurrentBookingTests(TransactionTestCase):
+
+    def test_racing_bookings_never_oversell(self):
+        user = Register.objects.create(username='rider', email='rider@example.com', password='!')
+        option = TravelOption.objects.create(
+            type='Bus', source='Goa', destination='Pune', date_time=timezone.now() + timedelta(days=2),
+            price=500, available_seats=5,
+        )
+
+        def book(_):
+            try:
+                book_seats(user, option.travel_id, 1)
+                return 'booked'
+            except NotEnoughSeats:
+                return 'sold out'
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(8) as pool:
+            outcomes = list(pool.map(book, range(12)))
+        self.assertEqual(outcomes.count('booked'), 5)
+        self.assertEqual(outcomes.count('sold out'), 7)
+        self.assertEqual(TravelOption.objects.get(pk=option.pk).available_seats, 0)
+        self.assertEqual(Booking.objects.count(), 5)
+
+
+class BulkBookingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Register.objects.create(username='agent', email='agent@example.com', password='!')
+        departure = timezone.now() + timedelta(days=5)
+        cls.first, cls.second = TravelOption.objects.bulk_create([
+            TravelOption(type='Bus', source='Goa', destination='Pune', date_time=departure, price=500, available_seats=4),
+            TravelOption(type='Bus', source='Pune', destination='Nagpur', date_time=departure + timedelta(hours=8),
+                         price=700, available_seats=2),
+        ])
+
+    def setUp(self):
+        forget_traveler()
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+
+    def book(self, partial=False):
+        items = [
+            {'travel_id': self.first.travel_id, 'seats': 3},
+            {'travel_id': self.second.travel_id, 'seats': 2},
+            {'travel_id': self.second.travel_id, 'seats': 1},  # one seat more than is left
+        ]
+        return self.client.post(
+            reverse('bulk_booking_api'), json.dumps({'bookings': items, 'partial': partial}),
+            content_type='application/json',
+        )
+
+    def test_atomic_group_books_nothing_when_one_item_fails(self):
+        response = self.book()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([r['status'] for r in response.json()['results']], ['skipped', 'skipped', 'rejected'])
+        self.assertEqual(response.json()['results'][2]['error'], "Not enough seats available")
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(TravelOption.objects.get(pk=self.first.pk).available_seats, 4)
+
+    def test_out_of_range_ids_are_refused_before_querying(self):
+        response = self.client.post(
+            reverse('bulk_booking_api'), json.dumps({'bookings': [{'travel_id': 10 ** 30, 'seats': 1}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        results = book_group(self.user, [(self.first.travel_id, 1), (10 ** 30, 1)], partial=True)
+        self.assertEqual([r['status'] for r in results], ['booked', 'rejected'])
+        self.assertEqual(results[1]['error'], "Travel option not found")
+
+    def test_partial_group_keeps_the_bookable_items(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.book(partial=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['status'] for r in response.json()['results']], ['booked', 'booked', 'rejected'])
+        self.assertEqual(
+            list(TravelOption.objects.order_by('travel_id').values_list('available_seats', flat=True)), [1, 0],
+        )
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 2)
+        stats = RouteDailyStats.objects.get(source='Goa')
+        self.assertEqual((stats.bookings, stats.seats_booked, stats.revenue), (1, 3, 1500))
+
+
+class SeatHoldTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Register.objects.create(username='holder', email='holder@example.com', password='!')
+        cls.option = TravelOption.objects.create(
+            type='Train', source='Delhi', destination='Jaipur',
+            date_time=timezone.now() + timedelta(days=2), price=400, available_seats=5,
+        )
+
+    def seats_left(self):
+        return TravelOption.objects.get(pk=self.option.pk).available_seats
+
+    def test_hold_counts_against_seats_until_confirmed(self):
+        hold = holds.place_hold(self.user, self.option.travel_id, 3)
+        self.assertEqual(self.seats_left(), 2)
+        with self.assertRaises(holds.NotEnoughSeats):
+            holds.place_hold(self.user, self.option.travel_id, 3)
+
+        booking = holds.confirm_hold(hold)
+        self.assertEqual((booking.number_of_seats, booking.total_price), (3, 1200))
+        self.assertEqual(self.seats_left(), 2)
+        self.assertFalse(holds.release_hold(hold))
+        self.assertEqual(self.seats_left(), 2)
+
+    def test_departed_trip_cannot_be_confirmed(self):
+        hold = holds.place_hold(self.user, self.option.travel_id, 2)
+        TravelOption.objects.filter(pk=self.option.pk).update(date_time=timezone.now() - timedelta(minutes=1))
+        with self.assertRaisesMessage(holds.HoldExpired, "This trip has already departed"):
+            holds.confirm_hold(hold)
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(SeatHold.objects.get(pk=hold.pk).status, 'Expired')
+        self.assertEqual(self.seats_left(), 5)
+
+    def test_sweeper_returns_expired_seats_in_batches(self):
+        for _ in range(4):
+            holds.place_hold(self.user, self.option.travel_id, 1, ttl=-1)
+        live = holds.place_hold(self.user, self.option.travel_id, 1)
+        self.assertEqual(self.seats_left(), 0)
+
+        self.assertEqual(holds.sweep_all_expired(batch_size=2), 4)
+        self.assertEqual(self.seats_left(), 4)
+        self.assertEqual(SeatHold.objects.get(status='Active'), live)
+        with self.assertRaises(holds.HoldExpired):
+            holds.confirm_hold(SeatHold.objects.filter(status='Expired').first())
+
+
+class BookingEventTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Register.objects.create(username='outbox', email='outbox@example.com', password='!')
+        cls.option = TravelOption.objects.create(
+            type='Bus', source='Pune', destination='Goa',
+            date_time=timezone.now() + timedelta(days=3), price=300, available_seats=10,
+        )
+
+    def log(self):
+        return list(BookingEvent.objects.order_by('event_id').values_list('kind', 'booking_id', 'seats'))
+
+    def test_every_booking_change_is_logged_with_it(self):
+        first = book_seats(self.user, self.option.travel_id, 2)
+        group = book_group(self.user, [(self.option.travel_id, 1), (self.option.travel_id, 3)])
+        held = holds.confirm_hold(holds.place_hold(self.user, self.option.travel_id, 1))
+        cancel_booking(first)
+        cancel_booking(first)  # already cancelled: no second event
+        with self.assertRaises(GroupBookingError):
+            book_group(self.user, [(self.option.travel_id, 1), (self.option.travel_id, 99)])
+
+        self.assertEqual(self.log(), [
+            ('booked', first.booking_id, 2),
+            ('booked', group[0]['booking_id'], 1),
+            ('booked', group[1]['booking_id'], 3),
+            ('booked', held.booking_id, 1),
+            ('cancelled', first.booking_id, 2),
+        ])
+
+    def test_consumers_resume_from_their_checkpoint(self):
+        seen = []
+        for _ in range(5):
+            book_seats(self.user, self.option.travel_id, 1)
+        with mock.patch.dict(events.CONSUMERS, {'test': lambda batch: seen.extend(e.event_id for e in batch)}):
+            self.assertEqual(events.consume('test', batch_size=2), 2)
+            self.assertEqual(events.consume_all('test', batch_size=2), 3)
+            self.assertEqual(events.consume('test'), 0)
+        ids = list(BookingEvent.objects.order_by('event_id').values_list('event_id', flat=True))
+        self.assertEqual(seen, ids)
+        self.assertEqual(EventCheckpoint.objects.get(consumer='test').position, ids[-1])
+
+    def test_failed_batch_is_handed_over_again(self):
+        book_seats(self.user, self.option.travel_id, 1)
+
+        def broken(batch):
+            raise RuntimeError("downstream unavailable")
+        with mock.patch.dict(events.CONSUMERS, {'test': broken}), self.assertRaises(RuntimeError):
+            events.consume('test')
+        seen = []
+        with mock.patch.dict(events.CONSUMERS, {'test': seen.extend}):
+            self.assertEqual(events.consume('test'), 1)
+        self.assertEqual(len(seen), 1)
+
+    def test_prepare_runs_before_the_write_transaction(self):
+        book_seats(self.user, self.option.travel_id, 1)
+        seen = []
+
+        def prepare(batch):
+            seen.append(('prepare', connection.in_atomic_block))
+            return len(batch)
+
+        def handler(batch, prepared):
+            seen.append(('handle', prepared))
+        with mock.patch.dict(events.CONSUMERS, {'test': handler}), mock.patch.dict(events.PREPARERS, {'test': prepare}):
+            # TestCase wraps each test in a transaction, so compare with the depth outside consume.
+            outer = connection.in_atomic_block
+            self.assertEqual(events.consume('test'), 1)
+        self.assertEqual(seen, [('prepare', outer), ('handle', 1)])
+
+    def test_batch_taken_by_another_worker_is_not_handled_twice(self):
+        book_seats(self.user, self.option.travel_id, 1)
+        seen = []
+
+        def prepare(batch):
+            # Another worker of the same consumer finishes the batch meanwhile.
+            EventCheckpoint.objects.update_or_create(consumer='test', defaults={'position': batch[-1].event_id})
+        with mock.patch.dict(events.CONSUMERS, {'test': lambda batch, prepared: seen.extend(batch)}), \
+                mock.patch.dict(events.PREPARERS, {'test': prepare}):
+            self.assertEqual(events.consume('test'), 0)
+        self.assertEqual(seen, [])
+
+    def test_prune_keeps_events_a_consumer_still_needs(self):
+        for _ in range(3):
+            book_seats(self.user, self.option.travel_id, 1)
+        later = timezone.now() + timedelta(seconds=1)
+        with mock.patch.dict(events.CONSUMERS, {'test': lambda batch: None, 'slow': lambda batch: None}, clear=True):
+            events.consume('test', batch_size=2)
+            self.assertEqual(events.prune(later), 0)  # 'slow' has never run
+            events.consume('slow', batch_size=1)
+            self.assertEqual(events.prune(later), 1)
+        self.assertEqual(BookingEvent.objects.count(), 2)
+
+
+class NotificationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Register.objects.create(username='mailme', email='mailme@example.com', password='!')
+        cls.option = TravelOption.objects.create(
+            type='Train', source='Delhi', destination='Agra',
+            date_time=timezone.now() + timedelta(days=4), price=450, available_seats=10,
+        )
+
+    def setUp(self):
+        forget_traveler()
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+
+    def queue(self):
+        return events.consume_all(notifications.CONSUMER)
+
+    def test_booking_request_only_logs_the_event(self):
+        response = self.client.post(reverse('book'), {'travel_id': self.option.travel_id, 'seats': 2})
+        self.assertContains(response, 'confirmed')
+        self.assertEqual(mail.outbox, [])
+        self.assertFalse(Notification.objects.exists())
+
+        self.queue()
+        self.assertEqual(notifications.dispatch_all(), (1, 0, 0))
+        message, = mail.outbox
+        self.assertEqual(message.to, ['mailme@example.com'])
+        self.assertEqual(message.subject, "Booking confirmed: Delhi → Agra")
+        self.assertIn("Seats:   2", message.body)
+        self.assertEqual(Notification.objects.get().status, Notification.SENT)
+
+    def test_replayed_events_send_once(self):
+        booking = book_seats(self.user, self.option.travel_id, 1)
+        cancel_booking(booking)
+        self.queue()
+        EventCheckpoint.objects.filter(consumer=notifications.CONSUMER).update(position=0)
+        self.assertEqual(self.queue(), 2)
+        notifications.dispatch_all()
+        notifications.dispatch_all()
+        self.assertEqual(sorted(m.subject.split(':')[0] for m in mail.outbox), ["Booking cancelled", "Booking confirmed"])
+
+    @override_settings(NOTIFICATION_MAX_ATTEMPTS=2, NOTIFICATION_RETRY_BASE=60)
+    def test_failed_sends_back_off_then_give_up(self):
+        book_seats(self.user, self.option.travel_id, 1)
+        self.queue()
+        down = mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError("refused"))
+        with down:
+            self.assertEqual(notifications.dispatch_all(), (0, 1, 0))
+        notification = Notification.objects.get()
+        self.assertEqual((notification.status, notification.attempts), (Notification.PENDING, 1))
+        self.assertGreaterEqual(notification.next_attempt_at, timezone.now() + timedelta(seconds=55))
+        self.assertEqual(notifications.dispatch_all(), (0, 0, 0))  # not due yet
+
+        Notification.objects.update(next_attempt_at=timezone.now())
+        with down:
+            self.assertEqual(notifications.dispatch_all(), (0, 0, 1))
+        self.assertEqual(Notification.objects.get().status, Notification.FAILED)
+        self.assertEqual(mail.outbox, [])
+
+    def test_late_worker_does_not_overwrite_the_reclaiming_worker(self):
+        book_seats(self.user, self.option.travel_id, 1)
+        self.queue()
+        slow, = notifications.claim(10)
+        later = timezone.now() + timedelta(hours=1)  # the slow worker's claim has run out
+        fast, = notifications.claim(10, now=later)
+        self.assertEqual(notifications._record([fast], [fast.pk], {}, later), (1, 0, 0))
+        self.assertEqual(notifications._record([slow], [], {slow.pk: OSError("refused")}, later), (0, 0, 0))
+        self.assertEqual(Notification.objects.get().status, Notification.SENT)
+
+    @override_settings(NOTIFICATION_MAX_ATTEMPTS=1)
+    def test_claim_that_ran_out_on_the_last_attempt_gives_up(self):
+        book_seats(self.user, self.option.travel_id, 1)
+        self.queue()
+        self.assertEqual(len(notifications.claim(10)), 1)  # the worker dies holding it
+        self.assertEqual(notifications.claim(10, now=timezone.now() + timedelta(hours=1)), [])
+        notification = Notification.objects.get()
+        self.assertEqual((notification.status, notification.attempts), (Notification.FAILED, 1))
+
+    def test_batch_shares_one_connection(self):
+        for _ in range(3):
+            book_seats(self.user, self.option.travel_id, 1)
+        self.queue()
+        with mock.patch.object(notifications, 'get_connection', wraps=notifications.get_connection) as connect:
+            self.assertEqual(notifications.dispatch_all(batch_size=10), (3, 0, 0))
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+    @override_settings(NOTIFICATIONS_ENABLED=False)
+    def test_disabled_queues_nothing(self):
+        book_seats(self.user, self.option.travel_id, 1)
+        self.assertEqual(self.queue(), 1)
+        self.assertFalse(Notification.objects.exists())
+
+
+class BookingHistoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Register.objects.create(username='heavy', email='heavy@example.com', password='!')
+        option = TravelOption.objects.create(
+            type='Bus', source='Pune', destination='Goa',
+            date_time=timezone.now() + timedelta(days=1), price=300, available_seats=10,
+        )
+        Booking.objects.bulk_create([
+            Booking(user=cls.user, travel_option=option, number_of_seats=1, total_price=300)
+            for _ in range(60)
+        ])
+
+    def setUp(self):
+        forget_traveler()
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+
+    def test_pages_cover_every_booking_once(self):
+        seen = []
+        url = reverse('my_bookings')
+        while url:
+            response = self.client.get(url)
+            seen += [b.booking_id for b in response.context['bookings']]
+            next_before = response.context['next_before']
+            url = f"{reverse('my_bookings')}?before={next_before}" if next_before else None
+        self.assertEqual(len(seen), 60)
+        self.assertEqual(seen, sorted(set(seen), reverse=True))
+
+    def test_unusable_cursor_shows_the_first_page(self):
+        first = [b.booking_id for b in self.client.get(reverse('my_bookings')).context['bookings']]
+        for before in ('²', '١٢', 'abc', '9' * 30):
+            response = self.client.get(reverse('my_bookings'), {'before': before})
+            self.assertEqual([b.booking_id for b in response.context['bookings']], first)
+
+    def test_export_csv_streams_all_rows(self):
+        response = self.client.get(reverse('export_bookings'), {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'booking_id')
+        self.assertEqual(len(lines), 61)
+
+    def test_export_ndjson(self):
+        response = self.client.get(reverse('export_bookings'), {'format': 'ndjson'})
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(records), 60)
+        self.assertEqual(records[0]['source'], 'Pune')
+
+
+class ArchiveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Register.objects.create(username='archivist', email='archivist@example.com', password='!')
+        cls.old = TravelOption.objects.create(
+            type='Train', source='Delhi', destination='Agra',
+            date_time=timezone.now() - timedelta(days=40), price=200, available_seats=20,
+        )
+        cls.upcoming = TravelOption.objects.create(
+            type='Train', source='Delhi', destination='Agra',
+            date_time=timezone.now() + timedelta(days=2), price=200, available_seats=20,
+        )
+        # Booked before the trip departed.
+        with mock.patch.object(timezone, 'now', return_value=cls.old.date_time - timedelta(days=1)):
+            cls.old_bookings = [book_seats(cls.user, cls.old.travel_id, 1) for _ in range(3)]
+        cls.new_booking = book_seats(cls.user, cls.upcoming.travel_id, 2)
+
+    def setUp(self):
+        forget_traveler()
+        session = self.client.session
+        session['user_id'] = self.user.id
+        session.save()
+
+    def test_moves_departed_trips_and_keeps_ids(self):
+        stats = self.stats_rows()
+        self.assertEqual(archive.archive_batch(archive.default_cutoff()), (1, 3))
+        self.assertEqual(list(TravelOption.objects.values_list('travel_id', flat=True)), [self.upcoming.travel_id])
+        self.assertEqual(list(Booking.objects.values_list('booking_id', flat=True)), [self.new_booking.booking_id])
+        self.assertEqual(ArchivedTravelOption.objects.get().travel_id, self.old.travel_id)
+        self.assertEqual(
+            sorted(ArchivedBooking.objects.values_list('booking_id', flat=True)),
+            [b.booking_id for b in self.old_bookings],
+        )
+        # Archiving is not cancelling: the departed day's stats stay, and survive a rebuild.
+        self.assertEqual(self.stats_rows(), stats)
+        route_stats.rebuild()
+        self.assertEqual(self.stats_rows(), stats)
+        self.assertEqual(archive.archive_batch(archive.default_cutoff()), (0, 0))
+
+    def test_batches_archive_the_oldest_departures_first(self):
+        later = TravelOption.objects.create(
+            type='Bus', source='Delhi', destination='Agra',
+            date_time=self.old.date_time + timedelta(days=5), price=200, available_seats=20,
+        )
+        self.assertEqual(archive.archive_batch(archive.default_cutoff(), batch_size=1), (1, 3))
+        self.assertEqual(ArchivedTravelOption.objects.get().travel_id, self.old.travel_id)
+        self.assertEqual(archive.archive_batch(archive.default_cutoff(), batch_size=1), (1, 0))
+        self.assertTrue(ArchivedTravelOption.objects.filter(travel_id=later.travel_id).exists())
+
+    def test_history_merges_live_and_archived(self):
+        archive.archive_batch(archive.default_cutoff())
+        response = self.client.get(reverse('my_bookings'))
+        bookings = response.context['bookings']
+        self.assertEqual([b.archived for b in bookings], [False, True, True, True])
+        self.assertContains(response, 'Departed')
+
+        lines = b''.join(self.client.get(reverse('export_bookings'), {'format': 'csv'}).streaming_content).decode()
+        ids = [int(line.split(',')[0]) for line in lines.splitlines()[1:]]
+        self.assertEqual(ids, sorted([b.booking_id for b in self.old_bookings] + [self.new_booking.booking_id], reverse=True))
+
+    def stats_rows(self):
+        return list(RouteDailyStats.objects.order_by('day').values(*route_stats.REPORT_FIELDS))
+
+
+class PasswordRehashTests(TestCase):
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+        'home.hashers.TunedPBKDF2PasswordHasher',
+    ])
+    def test_login_upgrades_outdated_hash(self):
+        user = Register.objects.create(
+            username='old', email='old@example.com',
+            password=make_password('secret', hasher='pbkdf2_sha256'),
+        )
+        response = self.client.post(reverse('login'), {'email': 'old@example.com', 'password': 'secret'})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('md5$'))
+
+    @override_settings(PASSWORD_HASHERS=['home.hashers.TunedPBKDF2PasswordHasher'])
+    def test_login_upgrades_hash_after_iterations_are_raised(self):
+        # PBKDF2_ITERATIONS is read once, when the hasher class is defined.
+        with mock.patch.object(hashers.TunedPBKDF2PasswordHasher, 'iterations', 1000):
+            user = Register.objects.create(username='old', email='old@example.com', password=make_password('secret'))
+        with mock.patch.object(hashers.TunedPBKDF2PasswordHasher, 'iterations', 2000):
+            self.client.post(reverse('login'), {'email': 'old@example.com', 'password': 'secret'})
+        user.refresh_from_db()
+        self.assertEqual(user.password.split('$')[:2], ['pbkdf2_sha256', '2000'])
+        self.assertTrue(check_password('secret', user.password))
+
+
+@override_settings(
+    LOGIN_RATE_LIMITS={'ip': (10, 300), 'email': (3, 300)},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class LoginThrottleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Register.objects.create(username='target', email='target@example.com', password=make_password('secret'))
+
+    def setUp(self):
+        clear_caches()
+        ratelimit.local_counters.clear()
+
+    def login(self, email='target@example.com', password='wrong', ip='10.0.0.1'):
+        return self.client.post(reverse('login'), {'email': email, 'password': password}, REMOTE_ADDR=ip)
+
+    def test_email_locked_out_before_any_lookup(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 200)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.login(password='secret', ip='10.0.0.2')
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(any('home_register' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(login_throttle.stats()['blocked_email'], 1)
+
+    def test_ip_limit_covers_many_emails_and_success_clears_email(self):
+        self.login()
+        self.assertEqual(self.login(password='secret').status_code, 302)
+        for n in range(9):
+            self.login(email=f"nobody{n}@example.com")
+        self.assertEqual(self.login(email='other@example.com').status_code, 429)
+        self.assertEqual(self.login(password='secret', ip='10.0.0.9').status_code, 302)
+
+    def test_falls_back_to_process_counters_when_cache_is_down(self):
+        with mock.patch.object(ratelimit.cache, 'get_many', side_effect=ConnectionError), \
+                mock.patch.object(ratelimit.cache, 'add', side_effect=ConnectionError), \
+                self.assertLogs('home.ratelimit', 'WARNING'):
+            for _ in range(3):
+                self.login()
+            self.assertEqual(self.login(password='secret').status_code, 429)
+
+
+class TimetableImportTests(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def feed(self, name, text):
+        path = Path(self.dir.name) / name
+        path.write_text(text)
+        return str(path)
+
+    def run_import(self, *paths, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_travel_options', *paths, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue().splitlines()
+
+    def test_csv_rows_with_multiline_fields(self):
+        feed = self.feed('feed.csv', (
+            'type,source,destination,date_time,price,available_seats\n'
+            'Train,Chennai,Madurai,2030-01-05T08:00,350,40\n'
+            'Bus,"Chennai\nKoyambedu",Pondicherry,2030-01-05T09:00,150,30\n'
+            'Boat,Chennai,Madurai,2030-01-05T10:00,350,40\n'
+            'Train,Chennai,Madurai,2030-01-05T11:00,-1,40\n'
+        ))
+        # Small batches, so the quoted line break falls across a chunk boundary.
+        out, errors = self.run_import(feed, batch_size=1)
+
+        self.assertIn('Rows written:   2', out)
+        self.assertEqual(TravelOption.objects.get(type='Bus').source, 'Chennai\nKoyambedu')
+        self.assertEqual([error.split(':')[0] for error in errors], ['line 5', 'line 6'])
+
+    def test_jsonl_lines_that_are_not_objects_are_row_errors(self):
+        row = {'type': 'Flight', 'source': 'Delhi', 'destination': 'Goa', 'date_time': '2030-01-05T08:00',
+               'price': '4999.50', 'available_seats': 120}
+        feed = self.feed('feed.jsonl', '\n'.join([json.dumps(row), '[1, 2]', '"Goa"', '{"type": ', '', '42']))
+        out, errors = self.run_import(feed)
+
+        self.assertIn('Rows written:   1', out)
+        self.assertEqual(TravelOption.objects.get().price, Decimal('4999.50'))
+        self.assertEqual([error.split(':')[0] for error in errors], ['line 2', 'line 3', 'line 4', 'line 6'])
+        self.assertIn('expected an object, got list', errors[0])
+
+    def test_reimport_updates_in_place(self):
+        header = 'type,source,destination,date_time,price,available_seats\n'
+        self.run_import(self.feed('v1.csv', header + 'Train,Chennai,Madurai,2030-01-05T08:00,350,40\n'))
+        option = TravelOption.objects.get()
+        TravelOption.objects.filter(pk=option.pk).update(available_seats=35)  # five seats booked since
+
+        self.run_import(self.feed('v2.csv', header + 'Train,Chennai,Madurai,2030-01-05T08:00,375,40\n'))
+        option = TravelOption.objects.get()
+        self.assertEqual((option.price, option.available_seats), (Decimal('375.00'), 35))
+
+        self.run_import(self.feed('v2.csv', header + 'Train,Chennai,Madurai,2030-01-05T08:00,375,40\n'), update_seats=True)
+        self.assertEqual(TravelOption.objects.get(pk=option.pk).available_seats, 40)
+
+
+class RouteCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = timezone.localdate() + timedelta(days=6)
+        noon = timezone.make_aware(datetime.combine(cls.day, datetime.min.time())) + timedelta(hours=12)
+        cls.option = TravelOption.objects.create(
+            type='Train', source='Chennai', destination='Madurai', date_time=noon, price=350, available_seats=30,
+        )
+        cls.next_day = TravelOption.objects.create(
+            type='Train', source='Chennai', destination='Madurai', date_time=noon + timedelta(days=1),
+            price=350, available_seats=30,
+        )
+        cls.user = Register.objects.create(username='pilgrim', email='pilgrim@example.com', password='!')
+
+    def setUp(self):
+        clear_caches()
+
+    def summary(self, day=None):
+        return self.client.get(reverse('route_summary_api'), {
+            'source': 'Chennai', 'destination': 'Madurai', 'date': day or self.day,
+        })
+
+    def seats(self, day=None):
+        return self.summary(day).json()['availability']['seats']
+
+    def assertCached(self, day=None):
+        with self.assertNumQueries(0):
+            self.summary(day)
+
+    def test_summary_rejects_impossible_date(self):
+        self.assertEqual(self.summary('2026-02-30').status_code, 400)
+
+    def test_second_request_is_a_hit(self):
+        with self.assertNumQueries(2):  # availability and prices
+            self.summary()
+        self.assertCached()
+        self.assertEqual(route_cache.cache_stats(), {'hits': 2, 'misses': 2, 'hit_rate': 0.5})
+
+    def test_departed_options_drop_out_of_the_cached_list(self):
+        self.assertEqual(len(route_cache.route_options('Chennai', 'Madurai', self.day)), 1)
+        with mock.patch.object(timezone, 'now', return_value=self.option.date_time + timedelta(minutes=1)):
+            self.assertEqual(route_cache.route_options('Chennai', 'Madurai', self.day), [])
+
+    def test_stats_are_served_to_staff(self):
+        self.summary()
+        self.assertEqual(self.client.get(reverse('route_cache_stats_api')).status_code, 403)
+        self.client.force_login(User.objects.create_user('ops', password='x', is_staff=True))
+        self.assertEqual(self.client.get(reverse('route_cache_stats_api')).json()['misses'], 2)
+
+        err = StringIO()
+        call_command('route_cache_stats', stdout=StringIO(), stderr=err)
+        self.assertIn('local memory', err.getvalue())
+
+    @override_settings(CACHES={
+        alias: {**config, 'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 1}}
+        for alias, config in settings.CACHES.items()
+    })
+    def test_other_cache_entries_do_not_cull_routes(self):
+        self.seats()
+        for n in range(50):
+            caches['default'].set(f"filler-{n}", n)
+        self.assertCached()
+
+    def test_booking_and_cancel_evict_only_their_day(self):
+        self.assertEqual((self.seats(), self.seats(self.day + timedelta(days=1))), (30, 30))
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = book_seats(self.user, self.option.travel_id, 4)
+        self.assertCached(self.day + timedelta(days=1))
+        self.assertEqual(self.seats(), 26)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_booking(booking)
+        self.assertCached(self.day + timedelta(days=1))
+        self.assertEqual(self.seats(), 30)
+
+    def test_moving_a_departure_evicts_both_days(self):
+        self.assertEqual((self.seats(), self.seats(self.day + timedelta(days=1))), (30, 30))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.option.date_time += timedelta(days=1, hours=2)
+            self.option.save()
+        self.assertEqual((self.seats(), self.seats(self.day + timedelta(days=1))), (None, 60))
+
+    def test_invalidate_all_routes_bumps_the_generation(self):
+        self.seats()
+        TravelOption.objects.filter(pk=self.option.pk).update(available_seats=10)  # skips the signals
+        self.assertEqual(self.seats(), 30)
+        route_cache.invalidate_all_routes()
+        self.assertEqual(self.seats(), 10)
+
+
+class FareCalendarTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = timezone.localdate() + timedelta(days=40)
+        noon = timezone.make_aware(datetime.combine(cls.day, datetime.min.time())) + timedelta(hours=12)
+        TravelOption.objects.bulk_create([
+            TravelOption(type='Flight', source='Goa', destination='Pune', date_time=noon, price=3000, available_seats=10),
+            TravelOption(type='Bus', source='Goa', destination='Pune', date_time=noon, price=800, available_seats=30),
+            TravelOption(type='Bus', source='Goa', destination='Pune', date_time=noon + timedelta(days=1),
+                         price=700, available_seats=20),
+        ])
+
+    def setUp(self):
+        clear_caches()
+
+    def calendar(self, **params):
+        return self.client.get(reverse('fare_calendar_api'), {
+            'source': 'Goa', 'destination': 'Pune', 'from': self.day, 'to': self.day + timedelta(days=2), **params,
+        })
+
+    def test_days_from_one_grouped_query_per_month(self):
+        months = len({(self.day + timedelta(days=n)).replace(day=1) for n in range(3)})
+        with self.assertNumQueries(months):
+            days = self.calendar().json()['days']
+        self.assertEqual(
+            [(d['min_price'] and Decimal(d['min_price']), d['seats']) for d in days],
+            [(800, 40), (700, 20), (None, 0)],
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(Decimal(self.calendar(type='Flight').json()['days'][0]['min_price']), 3000)
+
+    def test_travel_option_change_evicts_its_month(self):
+        self.calendar()
+        with self.captureOnCommitCallbacks(execute=True):
+            TravelOption.objects.filter(type='Bus', price=800).get().delete()
+        self.assertEqual(Decimal(self.calendar().json()['days'][0]['min_price']), 3000)
+
+    def test_bad_dates_are_a_400(self):
+        for params in ({'from': '2026-02-30'}, {'to': '2026-04-31'}, {'from': 'soon'}):
+            with self.subTest(**params):
+                self.assertEqual(self.calendar(**params).status_code, 400)
+
+
+class ItineraryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = timezone.localdate() + timedelta(days=10)
+        at = lambda hour, minute=0: timezone.make_aware(datetime.combine(cls.day, datetime.min.time())) + timedelta(hours=hour, minutes=minute)
+        TravelOption.objects.bulk_create([
+            TravelOption(type='Flight', source='Goa', destination='Pune', date_time=at(9), price=5000, available_seats=5),
+            TravelOption(type='Bus', source='Goa', destination='Mumbai', date_time=at(6), price=500, available_seats=5),
+            TravelOption(type='Train', source='Goa', destination='Mumbai', date_time=at(7), price=900, available_seats=5),
+            # Bus arrives 14:00, so this one is a 30 minute transfer.
+            TravelOption(type='Bus', source='Mumbai', destination='Pune', date_time=at(14, 30), price=400, available_seats=5),
+            TravelOption(type='Bus', source='Mumbai', destination='Pune', date_time=at(15), price=600, available_seats=2),
+        ])
+        cls.user = Register.objects.create(username='planner', email='planner@example.com', password='!')
+
+    def setUp(self):
+        clear_caches()
+        itinerary.forget_index()
+
+    def plan(self, **params):
+        response = self.client.get(reverse('itinerary_api'), {
+            'source': 'Goa', 'destination': 'Pune', 'date': self.day, **params,
+        })
+        return [
+            ([leg['type'] for leg in i['legs']], Decimal(i['total_price']))
+            for i in response.json()['itineraries']
+        ]
+
+    def test_earliest_and_cheapest_respect_min_transfer(self):
+        self.assertEqual(self.plan()[0], (['Flight'], 5000))
+        self.assertEqual(self.plan(mode='cheapest')[0], (['Bus', 'Bus'], 1100))
+        self.assertEqual(self.plan(mode='cheapest', min_transfer=15)[0], (['Bus', 'Bus'], 900))
+        self.assertEqual(self.plan(mode='cheapest', max_legs=1), [(['Flight'], 5000)])
+        self.assertEqual(self.client.get(reverse('itinerary_api'), {'source': 'Goa'}).status_code, 400)
+        response = self.client.get(reverse('itinerary_api'), {'source': 'Goa', 'destination': 'Pune', 'date': '2026-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_booking_refreshes_index_incrementally(self):
+        self.plan()
+        sold_out = TravelOption.objects.get(source='Mumbai', price=600)
+        with self.captureOnCommitCallbacks(execute=True):
+            book_seats(self.user, sold_out.travel_id, 2)
+        # Only the booked departure is reloaded.
+        with self.assertNumQueries(1):
+            cheapest = self.plan(mode='cheapest')
+        self.assertEqual(cheapest[0], (['Train', 'Bus'], 1300))
+
+    @override_settings(ITINERARY_CHANGE_LOG_SIZE=4)
+    def test_change_log_is_bounded(self):
+        index = itinerary.get_index()
+        travel_ids = list(TravelOption.objects.values_list('travel_id', flat=True))
+        itinerary.record_changes(travel_ids[:3])
+        self.assertIs(itinerary.get_index(), index)  # replayed
+
+        itinerary.record_changes(travel_ids * 2)  # laps the ring
+        keys = [itinerary.CHANGE_KEY.format(n) for n in range(20)]
+        self.assertEqual(len(caches['default'].get_many(keys)), 4)
+        self.assertIsNot(itinerary.get_index(), index)  # fell behind: rebuilt
+
+    def test_searches_use_the_old_index_during_a_rebuild(self):
+        old = itinerary.get_index()
+        itinerary.mark_stale()
+        started, finish = threading.Event(), threading.Event()
+
+        def slow_build():
+            started.set()
+            finish.wait(5)
+            return itinerary.ConnectionIndex()
+
+        with mock.patch.object(itinerary, 'build_index', side_effect=slow_build) as build:
+            with ThreadPoolExecutor(1) as pool:
+                rebuilding = pool.submit(itinerary.get_index)
+                self.assertTrue(started.wait(5))
+                self.assertIs(itinerary.get_index(), old)
+                finish.set()
+                fresh = rebuilding.result(5)
+        self.assertIsNot(fresh, old)
+        self.assertIs(itinerary.get_index(), fresh)
+        build.assert_called_once()
+
+
+class RouteStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Register.objects.create(username='stats', email='stats@example.com', password='x')
+        cls.departure = timezone.now() + timedelta(days=5)
+        cls.train = TravelOption.objects.create(
+            type='Train', source='Delhi', destination='Jaipur',
+            date_time=cls.departure, price=250, available_seats=40,
+        )
+        cls.staff = User.objects.create_user('analyst', password='x', is_staff=True)
+
+    def stats(self):
+        return list(RouteDailyStats.objects.order_by('day', 'type').values(*route_stats.REPORT_FIELDS))
+
+    def test_incremental_updates_match_rebuild(self):
+        first = book_seats(self.user, self.train.travel_id, 3)
+        book_seats(self.user, self.train.travel_id, 1)
+        cancel_booking(first)
+        row = RouteDailyStats.objects.get()
+        self.assertEqual((row.bookings, row.cancellations, row.seats_booked, row.capacity), (1, 1, 1, 40))
+        self.assertEqual(row.revenue, 250)
+
+        incremental = self.stats()
+        route_stats.rebuild()
+        self.assertEqual(self.stats(), incremental)
+
+    def test_rebuild_matches_incremental_while_seats_are_held(self):
+        hold = holds.place_hold(self.user, self.train.travel_id, 5)
+        incremental = self.stats()
+        route_stats.rebuild()
+        self.assertEqual(self.stats(), incremental)
+        self.assertEqual(incremental[0]['capacity'], 40)
+
+        holds.confirm_hold(hold)
+        holds.release_hold(holds.place_hold(self.user, self.train.travel_id, 2))
+        incremental = self.stats()
+        self.assertEqual((incremental[0]['capacity'], incremental[0]['seats_booked']), (40, 5))
+        route_stats.rebuild()
+        self.assertEqual(self.stats(), incremental)
+
+    def test_api_is_staff_only(self):
+        response = self.client.get(reverse('route_stats_api'), {'source': 'Delhi', 'destination': 'Jaipur'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_api_rejects_bad_dates(self):
+        self.client.force_login(self.staff)
+        for params in ({'from': '2026-02-30'}, {'to': '2026-13-01'}):
+            with self.subTest(**params):
+                response = self.client.get(reverse('route_stats_api'), {'source': 'Delhi', 'destination': 'Jaipur', **params})
+                self.assertEqual(response.status_code, 400)
+
+    def test_api_reads_summary_rows(self):
+        book_seats(self.user, self.train.travel_id, 10)
+        self.client.force_login(self.staff)
+        day = timezone.localdate(self.departure)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('route_stats_api'), {
+                'source': 'Delhi', 'destination': 'Jaipur', 'from': day - timedelta(days=365), 'to': day,
+            })
+        # A year of data is one read of the summary table, never the bookings.
+        app_queries = [q['sql'] for q in ctx.captured_queries if 'home_' in q['sql']]
+        self.assertEqual(len(app_queries), 1)
+        self.assertIn('home_routedailystats', app_queries[0])
+        data = response.json()
+        self.assertEqual(len(data['days']), 1)
+        self.assertEqual(data['totals']['seats_booked'], 10)
+        self.assertEqual(data['totals']['load_factor'], 0.25)
+
+
+# TestCase would wrap every test in a transaction, which pins reads to the primary.
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(TransactionTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def serve(self, view, **cookies):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies)
+        return ReplicaPinMiddleware(view)(request)
+
+    def test_reads_go_to_replica_until_the_request_writes(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(TravelOption))
+            seen.append(self.router.db_for_read(Register))
+            self.router.db_for_write(TravelOption)
+            seen.append(self.router.db_for_read(TravelOption))
+            return HttpResponse()
+
+        response = self.serve(view)
+        self.assertEqual(seen, ['replica1', 'default', 'default'])
+        self.assertIn(ReplicaPinMiddleware.COOKIE_NAME, response.cookies)
+        # Outside a request nothing is pinned.
+        self.assertEqual(self.router.db_for_read(TravelOption), 'replica1')
+
+    def test_pin_cookie_and_transactions_use_the_primary(self):
+        def view(request):
+            return HttpResponse(self.router.db_for_read(Booking))
+
+        pinned = str(int(time.time()) + 5)
+        self.assertEqual(self.serve(view, pin_primary=pinned).content, b'default')
+        response = self.serve(view, pin_primary=str(int(time.time()) - 1))
+        self.assertEqual(response.content, b'replica1')
+        self.assertNotIn(ReplicaPinMiddleware.COOKIE_NAME, response.cookies)
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Booking), 'default')
+
+    @override_settings(DATABASE_ROUTERS=['home.db_router.ReplicaRouter'])
+    def test_route_cache_is_filled_from_the_primary(self):
+        day = timezone.localdate() + timedelta(days=3)
+        TravelOption.objects.create(
+            type='Bus', source='Agra', destination='Delhi', price=300, available_seats=9,
+            date_time=timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=9),
+        )
+        clear_caches()
+        # 'replica1' is not a real database here, so any read routed to it fails.
+        with self.assertRaises(ConnectionDoesNotExist):
+            TravelOption.objects.count()
+        self.assertEqual(route_cache.route_availability('Agra', 'Delhi', day), {'departures': 1, 'seats': 9})
+        self.assertEqual(len(route_cache.route_options('Agra', 'Delhi', day)), 1)
+        self.assertEqual(route_cache.fare_month('Agra', 'Delhi', day.replace(day=1))[0]['seats'], 9)
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        TravelOption.objects.create(
+            type='Bus', source='Pune', destination='Goa',
+            date_time=timezone.now() + timedelta(days=1), price=900, available_seats=30,
+        )
+
+    def setUp(self):
+        profiles = tempfile.TemporaryDirectory()
+        self.addCleanup(profiles.cleanup)
+        self.profile_dir = Path(profiles.name)
+        overrides = override_settings(
+            PROFILING_ENABLED=True, PROFILING_TRIGGER_TOKEN='let-me-profile', PROFILING_DIR=self.profile_dir,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_timings_logged_and_sent_as_server_timing(self):
+        with self.assertLogs('home.profiling', 'INFO') as logs:
+            response = self.client.get(reverse('travel_search_api'), {'source': 'Pune'})
+        self.assertIn('desc="1 queries"', response.headers['Server-Timing'])
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((record['view'], record['queries']), ('travel_search_api', 1))
+        self.assertEqual(len(record['slowest_sql']), 1)
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
+
+    def test_trigger_header_dumps_a_profile(self):
+        with self.assertLogs('home.profiling', 'INFO') as logs:
+            self.client.get(reverse('travel_search'), {'source': 'Pune'}, headers={'X-Profile': 'let-me-profile'})
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertGreater(record['template_ms'], 0)
+        self.assertTrue(Path(record['profile']).is_file())
+        pstats.Stats(record['profile'])  # loads as a cProfile dump
+
+
+class ContactQueueTests(TestCase):
+
+    def setUp(self):
+        self.spool = tempfile.TemporaryDirectory()
+        self.addCleanup(self.spool.cleanup)
+        overrides = override_settings(CONTACT_SPOOL_DIR=Path(self.spool.name), CONTACT_RATE_LIMIT=(3, 60))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        clear_caches()
+
+    def post(self, message):
+        return self.client.post(reverse('contact'), {
+            'full_name': 'Asha', 'email': 'asha@example.com', 'message': message,
+        })
+
+    @skipUnless(contact_queue.fcntl, "the drain lock needs fcntl")
+    def test_one_drain_at_a_time(self):
+        self.post("Hello")
+        with contact_queue._drain_lock() as locked:
+            self.assertTrue(locked)
+            self.assertEqual(contact_queue.drain(), 0)  # as if another drain held it
+            self.assertFalse(Contact.objects.exists())
+        self.assertEqual(contact_queue.drain(), 1)
+
+    def test_submissions_are_spooled_then_drained(self):
+        with self.assertNumQueries(0):
+            response = self.post('Hello')
+        self.assertRedirects(response, reverse('home') + '#contact', fetch_redirect_response=False)
+        self.assertFalse(Contact.objects.exists())
+
+        self.assertEqual(contact_queue.drain(), 1)
+        self.assertEqual(Contact.objects.get().fullname, 'Asha')
+        self.assertEqual(contact_queue.drain(), 0)
+
+    def test_duplicates_and_floods_are_dropped(self):
+        self.post('Hello')
+        self.post('Hello')
+        self.post('Second')
+        self.post('Third')
+        self.assertEqual(contact_queue.drain(), 2)
+
+    def test_fields_are_checked_before_spooling(self):
+        response = self.client.post(reverse('contact'), {
+            'full_name': 'A' * 200, 'email': 'asha@example.com', 'message': 'Hello',
+        })
+        self.assertRedirects(response, reverse('home') + '#contact', fetch_redirect_response=False)
+        self.assertEqual(
+            contact_queue.submit('10.0.0.9', 'Asha', 'a' * 250 + '@example.com', 'Hello'), contact_queue.INVALID,
+        )
+        self.assertEqual(contact_queue.submit('10.0.0.9', 'Asha', 'not-an-email', 'Hello'), contact_queue.INVALID)
+        self.assertEqual(contact_queue.drain(), 1)
+        self.assertEqual(Contact.objects.get().fullname, 'A' * 150)
+
+    def test_bad_lines_are_set_aside(self):
+        contact_queue.append({'fullname': 'Asha', 'email': 'asha@example.com', 'message': 'Hello', 'date': ''})
+        spool = Path(self.spool.name)
+        with open(spool / contact_queue.CURRENT, 'ab') as f:
+            f.write(b'{"fullname": "truncated\n')
+            f.write(b'["not", "an", "object"]\n')
+            f.write(json.dumps({'fullname': 'Ravi', 'email': 'r' * 250 + '@example.com', 'message': 'Hi'}).encode() + b'\n')
+        contact_queue.append({'fullname': 'Ravi', 'email': 'ravi@example.com', 'message': 'Hi', 'date': ''})
+
+        with self.assertLogs('home.contact_queue', 'WARNING'):
+            self.assertEqual(contact_queue.drain(), 2)
+        self.assertEqual(sorted(Contact.objects.values_list('fullname', flat=True)), ['Asha', 'Ravi'])
+        self.assertEqual(list(spool.glob('batch-*')), [])
+        self.assertEqual(len((spool / contact_queue.REJECTED).read_bytes().splitlines()), 3)
+        self.assertEqual(contact_queue.drain(), 0)
+
+
+# The project's URLconf with every view that has an async version swapped for
+# it, as login/asgi.py does; used by AsyncViewTests.
+urlpatterns = [
+    path(str(p.pattern), getattr(async_views, p.callback.__name__, p.callback), name=p.name)
+    for p in home_urls.urlpatterns
+]
+
+
+@override_settings(
+    ROOT_URLCONF='home.tests',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class AsyncViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Register.objects.create(
+            username='async', email='async@example.com',
+            password=make_password('secret'),
+        )
+        cls.option = TravelOption.objects.create(
+            type='Flight', source='Mumbai', destination='Delhi',
+            date_time=timezone.now() + timedelta(days=2), price=4000, available_seats=5,
+        )
+
+    def setUp(self):
+        forget_traveler()
+
+    async def test_login_then_book(self):
+        response = await self.async_client.post(reverse('login'), {'email': 'async@example.com', 'password': 'secret'})
+        self.assertEqual(response.status_code, 302)
+
+        response = await self.async_client.get(reverse('home'))
+        self.assertContains(response, 'TRAVELSBUDDY')
+
+        response = await self.async_client.post(reverse('book'), {'travel_id': self.option.travel_id, 'seats': 2})
+        self.assertContains(response, 'confirmed')
+        await self.option.arefresh_from_db()
+        self.assertEqual(self.option.available_seats, 3)
+
+        response = await self.async_client.get(reverse('my_bookings'))
+        self.assertContains(response, 'Mumbai → Delhi')
+
+    async def test_register_hashes_on_the_pool(self):
+        with mock.patch.object(hashers, 'make_password', wraps=make_password) as hashed:
+            response = await self.async_client.post(reverse('register'), {
+                'username': 'newcomer', 'email': 'newcomer@example.com',
+                'password': 'secret', 'confirm_password': 'secret',
+            })
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        user = await Register.objects.aget(email='newcomer@example.com')
+        self.assertTrue(check_password('secret', user.password))
+        hashed.assert_called_once_with('secret')
+
+    async def test_my_bookings_ignores_unusable_cursor(self):
+        session = await self.async_client.asession()
+        await session.aset('user_id', self.user.id)
+        await session.asave()
+        self.async_client.cookies['sessionid'] = session.session_key
+        response = await self.async_client.get(reverse('my_bookings'), {'before': '²'})
+        self.assertEqual(response.status_code, 200)
+
+    async def test_wrong_password(self):
+        response = await self.async_client.post(reverse('login'), {'email': 'async@example.com', 'password': 'nope'})
+        self.assertContains(response, 'Invalid credentials')
+
+    async def test_anonymous_home_redirects(self):
+        response = await self.async_client.get(reverse('home'))
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+
+    async def test_book_listing_rejects_impossible_date(self):
+        session = await self.async_client.asession()
+        await session.aset('user_id', self.user.id)
+        await session.asave()
+        self.async_client.cookies['sessionid'] = session.session_key
+        params = {'from_station': 'Mumbai', 'to_station': 'Delhi', 'journey_date': '2026-02-30'}
+        self.assertContains(await self.async_client.get(reverse('book'), params), 'Invalid journey date')
+
+    async def test_export_streams_asynchronously(self):
+        booked = [(await sync_to_async(book_seats)(self.user, self.option.travel_id, 1)).booking_id for _ in range(3)]
+        await Booking.objects.filter(booking_id=booked[1]).adelete()  # its id goes to an archived booking
+        departed = await ArchivedTravelOption.objects.acreate(
+            travel_id=0, type='Bus', source='Pune', destination='Goa',
+            date_time=timezone.now() - timedelta(days=60), price=300, available_seats=10,
+        )
+        await ArchivedBooking.objects.acreate(
+            booking_id=booked[1], user=self.user, travel_option=departed, number_of_seats=1,
+            total_price=300, booking_date=timezone.now() - timedelta(days=61), status='Confirmed',
+        )
+        session = await self.async_client.asession()
+        await session.aset('user_id', self.user.id)
+        await session.asave()
+        self.async_client.cookies['sessionid'] = session.session_key
+
+        response = await self.async_client.get(reverse('export_bookings'), {'format': 'csv'})
+        self.assertTrue(response.is_async)  # a sync iterator would be buffered whole under ASGI
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'booking_id')
+        self.assertEqual([int(line.split(',')[0]) for line in lines[1:]], booked[::-1])
+
+    async def test_search_api(self):
+        response = await self.async_client.get(reverse('travel_search_api'), {'source': 'Mumbai'})
+        self.assertEqual(response.json()['results'][0]['travel_id'], self.option.travel_id)
+
+
+MANIFEST_STORAGE = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
+
+class StaticFilesTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.TemporaryDirectory()
+        cls.enterClassContext(cls.root)
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.root.name, STORAGES=MANIFEST_STORAGE))
+        call_command('collectstatic', interactive=False, verbosity=0, ignore_patterns=['admin'])
+        manifest = json.loads((Path(cls.root.name) / 'staticfiles.json').read_text())
+        cls.hashed = manifest['paths']['home/css/home.css']
+
+    def test_collectstatic_writes_hashed_and_compressed_copies(self):
+        self.assertRegex(self.hashed, r'^home/css/home\.[0-9a-f]{12}\.css$')
+        path = Path(self.root.name) / self.hashed
+        for suffix in ('.gz', '.br'):
+            self.assertTrue(path.with_name(path.name + suffix).exists(), suffix)
+        self.assertEqual(gzip.decompress(path.with_name(path.name + '.gz').read_bytes()), path.read_bytes())
+
+    def test_wsgi_serves_precompressed_immutable_files(self):
+        response = self.client.get(f"/static/{self.hashed}", HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_asgi_app_serves_static_files_without_django(self):
+        app = asgi_static.StaticFilesApp(mock.AsyncMock())
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+        scope = {'type': 'http', 'method': 'GET', 'path': f"/static/{self.hashed}", 'headers': [(b'accept-encoding', b'gzip')]}
+        async_to_sync(app)(scope, None, send)
+        headers = dict(sent[0]['headers'])
+        self.assertEqual((sent[0]['status'], headers[b'content-encoding']), (200, b'gzip'))
+        self.assertIn(b'immutable', headers[b'cache-control'])
+        body = b''.join(message['body'] for message in sent[1:])
+        self.assertEqual(body, (Path(self.root.name) / f"{self.hashed}.gz").read_bytes())
+        app.application.assert_not_called()
+
+        async_to_sync(app)({'type': 'http', 'method': 'GET', 'path': '/', 'headers': []}, None, send)
+        app.application.assert_awaited_once()
+
+    def test_asgi_middleware_chain_stays_async(self):
+        # Loads login/asgi.py in a fresh interpreter, as an ASGI server would.
+        code = (
+            "from asgiref.sync import SyncToAsync, iscoroutinefunction\n"
+            "from login.asgi import application\n"
+            "chain = application.application._middleware_chain\n"
+            "print(iscoroutinefunction(chain) and not isinstance(chain, SyncToAsync))\n"
+        )
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'login.settings'}
+        env.pop('DJANGO_ASGI', None)
+        result = subprocess.run(
+            [sys.executable, '-W', 'ignore', '-c', code], cwd=Path(__file__).resolve().parent.parent,
+            env=env, capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), 'True')
@@ -0,0 +1,107 @@
+"""
+Parsing and validation of timetable feeds (CSV or JSON Lines).
+
+This module deliberately avoids the ORM so that chunks can be validated in
+worker processes; rows come back as plain tuples in ROW_FIELDS order.
+"""
+
+import csv
+import itertools
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from zoneinfo import ZoneInfo
+
+ROW_FIELDS = ('type', 'source', 'destination', 'date_time', 'price', 'available_seats')
+TRAVEL_TYPES = {'Flight', 'Train', 'Bus'}
+
+
+class RowError(ValueError):
+    pass
+
+
+def clean_row(record, tz):
+    """Validate one mapping from the feed and return it as a ROW_FIELDS tuple."""
+    if not isinstance(record, dict):
+        raise RowError(f"expected an object, got {type(record).__name__}")
+    try:
+        travel_type = (record.get('type') or '').strip().title()
+        if travel_type not in TRAVEL_TYPES:
+            raise RowError(f"unknown type {record.get('type')!r}")
+
+        source = (record.get('source') or '').strip()
+        destination = (record.get('destination') or '').strip()
+        if not source or not destination:
+            raise RowError("source and destination are required")
+        if len(source) > 100 or len(destination) > 100:
+            raise RowError("source/destination longer than 100 characters")
+
+        date_time = datetime.fromisoformat(str(record.get('date_time') or '').strip())
+        if date_time.tzinfo is None:
+            date_time = date_time.replace(tzinfo=tz)
+
+        price = Decimal(str(record.get('price')).strip()).quantize(Decimal('0.01'))
+        if price < 0 or price >= Decimal('1e8'):
+            raise RowError(f"price out of range: {price}")
+
+        seats = int(record.get('available_seats'))
+        if seats < 0:
+            raise RowError("available_seats must not be negative")
+    except (TypeError, ValueError, InvalidOperation) as e:
+        if isinstance(e, RowError):
+            raise
+        raise RowError(str(e))
+    return travel_type, source, destination, date_time, price, seats
+
+
+def clean_chunk(fmt, records, tz_name):
+    """
+    Validate a chunk of ``(line_number, record)`` pairs from read_chunks.
+
+    Returns ``(rows, errors)`` where errors is a list of ``(line_number, message)``.
+    """
+    tz = ZoneInfo(tz_name)
+    rows, errors = [], []
+    for line_number, record in records:
+        try:
+            if fmt == 'jsonl':
+                record = json.loads(record)
+            rows.append(clean_row(record, tz))
+        except (RowError, json.JSONDecodeError) as e:
+            errors.append((line_number, str(e)))
+    return rows, errors
+
+
+def _csv_records(f, path):
+    rows = csv.reader(f)
+    header = [name.strip() for name in next(rows, [])]
+    missing = set(ROW_FIELDS) - set(header)
+    if missing:
+        raise RowError(f"{path}: missing CSV columns {', '.join(sorted(missing))}")
+    # A quoted field may span lines, so a record starts after the last one ended.
+    line_number = rows.line_num + 1
+    for values in rows:
+        if values:
+            yield line_number, dict(zip(header, values))
+        line_number = rows.line_num + 1
+
+
+def _jsonl_records(f):
+    for line_number, line in enumerate(f, 1):
+        if line.strip():
+            yield line_number, line
+
+
+def read_chunks(path, chunk_size):
+    """
+    Stream a feed file as ``(fmt, records)`` chunks of up to ``chunk_size``
+    ``(line_number, record)`` pairs: a dict per CSV row, or a raw line of JSON
+    Lines left for clean_chunk to decode.
+
+    The format comes from the extension: ``.csv`` or ``.jsonl``/``.ndjson``.
+    """
+    fmt = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+    with open(path, newline='', encoding='utf-8') as f:
+        records = _csv_records(f, path) if fmt == 'csv' else _jsonl_records(f)
+        while chunk := list(itertools.islice(records, chunk_size)):
+            yield fmt, chunk
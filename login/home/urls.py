@@ -1,15 +1,32 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI (see login/asgi.py) the hot paths are served by their async versions.
+hot = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-  path("", views.home_view, name="home"),
-  path("login/", views.Login_view, name="login"),
-  path("register/", views.Register_view, name="register"),
+  path("", hot.home_view, name="home"),
+  path("login/", hot.Login_view, name="login"),
+  path("register/", hot.Register_view, name="register"),
   path("logout/", views.logout_view, name="logout"),
-  path('book/', views.book_view, name='book'), 
-  path("my-bookings/", views.my_bookings_view, name="my_bookings"),
+  path('book/', hot.book_view, name='book'), 
+  path("api/bookings/bulk/", views.bulk_booking_api, name="bulk_booking_api"),
+  path("api/holds/", views.hold_seats_api, name="hold_seats_api"),
+  path("api/holds/<int:hold_id>/confirm/", views.seat_hold_api, {"action": "confirm"}, name="confirm_hold"),
+  path("api/holds/<int:hold_id>/release/", views.seat_hold_api, {"action": "release"}, name="release_hold"),
+  path("my-bookings/", hot.my_bookings_view, name="my_bookings"),
+  path("my-bookings/export/", hot.export_bookings_view, name="export_bookings"),
   path("cancel-booking/<int:booking_id>/", views.cancel_booking, name="cancel_booking"),
-  path("contact/", views.contact_view, name="contact"),
+  path("contact/", hot.contact_view, name="contact"),
+  path("search/", hot.travel_search_view, name="travel_search"),
+  path("api/travel-options/", hot.travel_search_api, name="travel_search_api"),
+  path("api/routes/summary/", views.route_summary_api, name="route_summary_api"),
+  path("api/routes/stats/", views.route_stats_api, name="route_stats_api"),
+  path("api/monitoring/login-throttle/", views.login_throttle_stats_api, name="login_throttle_stats_api"),
+  path("api/monitoring/route-cache/", views.route_cache_stats_api, name="route_cache_stats_api"),
+  path("api/fare-calendar/", views.fare_calendar_api, name="fare_calendar_api"),
+  path("api/itineraries/", views.itinerary_api, name="itinerary_api"),
 
 
 
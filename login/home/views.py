@@ -1,10 +1,83 @@
+import csv
+import itertools
+import json
+from datetime import timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.hashers import make_password, check_password
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_POST
 from .models import Register
-from .models import Register, Booking, Contact
+from .models import MAX_INTEGER, Register, Booking, SeatHold, TravelOption
 from django.utils import timezone
 from django.contrib import messages
+from .search import SearchError, parse_search_params, search_travel_options
+from .route_cache import cache_stats as route_cache_stats, fare_calendar, route_availability, route_options, route_price_range
+from .booking import BookingError, GroupBookingError, book_group, book_seats, cancel_booking as cancel_reservation
+from .holds import confirm_hold, place_hold, release_hold
+from .route_stats import route_report
+from .archive import booking_history_page, booking_history_rows
+from .itinerary import ItineraryError, parse_itinerary_params, plan as plan_itineraries
+from . import contact_queue, login_throttle
+from .ratelimit import client_ip
+
+# Columns my_bookings.html actually renders
+MY_BOOKINGS_FIELDS = (
+    'booking_id', 'number_of_seats', 'total_price', 'booking_date', 'status',
+    'travel_option__type', 'travel_option__source', 'travel_option__destination',
+    'travel_option__date_time',
+)
+MY_BOOKINGS_PAGE_SIZE = 25
+
+# Booking history export: one flat row per booking, streamed in chunks
+EXPORT_FIELDS = (
+    'booking_id', 'booking_date', 'status', 'number_of_seats', 'total_price',
+    'travel_option__type', 'travel_option__source', 'travel_option__destination',
+    'travel_option__date_time',
+)
+EXPORT_HEADER = (
+    'booking_id', 'booking_date', 'status', 'seats', 'total_price',
+    'type', 'source', 'destination', 'departure',
+)
+EXPORT_CHUNK_SIZE = 2000
+
+# Most bookings one bulk booking request may carry
+BULK_BOOKING_MAX_ITEMS = 200
+
+
+def parse_int(value):
+    """``int(value)``, raising ValueError if it does not fit an integer column (models.MAX_INTEGER)."""
+    number = int(value)
+    if not -MAX_INTEGER <= number <= MAX_INTEGER:
+        raise ValueError(f"{value!r} is out of range")
+    return number
+
+
+def parse_cursor(value):
+    """A ``?before=`` booking id, or None (the first page) if it is missing or not a usable id."""
+    # isdigit() alone accepts '²', which int() rejects, and int() accepts '١٢'.
+    if value and value.isascii() and value.isdigit() and int(value) <= MAX_INTEGER:
+        return int(value)
+    return None
+
+
+def parse_day(value):
+    """A YYYY-MM-DD query value as a date, or None if it is missing, malformed or impossible (2026-02-30)."""
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+class Echo:
+    """File-like object whose write() hands the line back, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
 
 # Register
 def Register_view(request):
@@ -18,13 +91,13 @@ def Register_view(request):
         if password != confirm_password:
             return render(request, 'register.html', {'error': "Passwords do not match"})
         
-        hashed_password = make_password(password)
-
         if Register.objects.filter(username=username).exists():
             return render(request, 'register.html', {'error': "Username already exists"})
         if Register.objects.filter(email=email).exists():
             return render(request, 'register.html', {'error': "Email already exists"})
-        
+
+        # Hash only once the cheap checks have passed.
+        hashed_password = make_password(password)
         Register.objects.create(
             username=username,
             email=email,
@@ -35,17 +108,28 @@ def Register_view(request):
     return render(request, "register.html")  # GET request → show form
 
 
+LOGIN_THROTTLED_MESSAGE = "Too many failed attempts, please try again in a few minutes"
+
+
 # Login
 def Login_view(request):
     if request.method == "POST":
         email = request.POST.get('email')
         password = request.POST.get('password')
         remember_me = request.POST.get('remember_me') == 'on'
-        
+
+        # Refuse throttled attempts before any lookup or hashing.
+        if login_throttle.blocked(request, email):
+            return render(request, 'login.html', {'error': LOGIN_THROTTLED_MESSAGE}, status=429)
+
         try:
             user = Register.objects.get(email=email)
-            # Check hashed password
-            if check_password(password, user.password):
+            # Check hashed password, upgrading it if the hasher settings changed
+            def rehash(raw_password):
+                Register.objects.filter(pk=user.pk).update(password=make_password(raw_password))
+
+            if check_password(password, user.password, setter=rehash):
+                login_throttle.succeeded(request, email)
                 request.session['user_id'] = user.id
                 
                 # Session expiry
@@ -56,8 +140,10 @@ def Login_view(request):
                     
                 return redirect('home')
             else:
+                login_throttle.failed(request, email)
                 return render(request, 'login.html', {'error': "Invalid credentials"})
         except Register.DoesNotExist:
+            login_throttle.failed(request, email)
             return render(request, 'login.html', {'error': "Invalid credentials"})
     
     return render(request, 'login.html')  # GET request → show login page
@@ -68,12 +154,10 @@ def home_view(request):
     if 'user_id' not in request.session:
         return redirect('login')   # ✅ Fix: redirect to login if not logged in
 
-    try:
-        user = Register.objects.get(id=request.session['user_id'])
-        return render(request, 'home.html', {'user': user})
-    except Register.DoesNotExist:
+    if not request.traveler:
         request.session.flush()  # clear session safely
         return redirect('login')
+    return render(request, 'home.html', {'user': request.traveler})
 
 
 # Logout
@@ -84,60 +168,311 @@ from django.shortcuts import render
 
 
 def book_view(request):
-    if 'user_id' not in request.session:
+    if not request.traveler:
         return redirect('login')  
 
-    user = Register.objects.get(id=request.session['user_id'])
+    user = request.traveler
 
     if request.method == "POST":
-        transport_type = request.POST.get("transport_type")  # Bus/Train/Flight
-        from_station = request.POST.get("from_station")
-        to_station = request.POST.get("to_station")
-        journey_date = parse_date(request.POST.get("journey_date"))
-        seats = int(request.POST.get("seats", 1))
-        status = request.POST.get("status", "confirmed")  # ✅ Allow confirmed/cancelled
+        try:
+            travel_id = parse_int(request.POST.get("travel_id"))
+            seats = parse_int(request.POST.get("seats", 1))
+        except (TypeError, ValueError):
+            return render(request, "book.html", {"error": "❌ Invalid booking request"}, status=400)
+
+        try:
+            booking = book_seats(user, travel_id, seats)
+        except BookingError as e:
+            return render(request, "book.html", {"error": f"❌ {e}"})
+        return render(request, "book.html", {"success": f"✅ Booking #{booking.booking_id} confirmed for {seats} seat(s)!"})
 
+    # GET with a route → list the departures that can be booked
+    context = {"params": request.GET}
+    if request.GET.get("from_station") and request.GET.get("to_station"):
+        journey_date = parse_day(request.GET.get("journey_date"))
+        transport_type = request.GET.get("transport_type")
         if not journey_date:
-            return render(request, "book.html", {"error": "❌ Invalid journey date"})
-
-        Booking.objects.create(
-            user=user,
-            transport_type=transport_type,
-            from_station=from_station,
-            to_station=to_station,
-            journey_date=journey_date,
-            seats=seats,
-            status=status
-        )
-        return render(request, "book.html", {"success": f"✅ {transport_type} ticket booked successfully!"})
+            context["error"] = "❌ Invalid journey date"
+        else:
+            context["options"] = [
+                option for option in route_options(
+                    request.GET["from_station"].strip(), request.GET["to_station"].strip(), journey_date,
+                )
+                if not transport_type or option["type"] == transport_type
+            ]
+    return render(request, "book.html", context)
+def bulk_booking_api(request):
+    """
+    Book a group in one request. POST a JSON body
+    ``{"bookings": [{"travel_id": 1, "seats": 2}, ...], "partial": false}``.
+    All bookings succeed or none do unless ``partial`` is true.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': "POST required"}, status=405)
+    if not request.traveler:
+        return JsonResponse({'error': "Login required"}, status=401)
+    try:
+        payload = json.loads(request.body)
+        items = [(parse_int(item['travel_id']), parse_int(item['seats'])) for item in payload['bookings']]
+        partial = bool(payload.get('partial', False))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return JsonResponse({'error': "Expected {\"bookings\": [{\"travel_id\": ..., \"seats\": ...}, ...]}"}, status=400)
+    if not 1 <= len(items) <= BULK_BOOKING_MAX_ITEMS:
+        return JsonResponse({'error': f"Send between 1 and {BULK_BOOKING_MAX_ITEMS} bookings"}, status=400)
+
+    try:
+        results = book_group(request.traveler, items, partial=partial)
+    except GroupBookingError as e:
+        return JsonResponse({'error': str(e), 'results': e.results}, status=409)
+    except BookingError as e:
+        return JsonResponse({'error': str(e)}, status=409)
+    booked = sum(result['status'] == 'booked' for result in results)
+    return JsonResponse({'booked': booked, 'rejected': len(results) - booked, 'results': results})
+
+
+def _hold_json(hold):
+    return {'hold_id': hold.hold_id, 'travel_id': hold.travel_option_id, 'seats': hold.seats,
+            'status': hold.status, 'expires_at': hold.expires_at}
+
+
+def hold_seats_api(request):
+    """POST travel_id and seats to hold them for SEAT_HOLD_TTL seconds during checkout."""
+    if request.method != 'POST':
+        return JsonResponse({'error': "POST required"}, status=405)
+    if not request.traveler:
+        return JsonResponse({'error': "Login required"}, status=401)
+    try:
+        travel_id = parse_int(request.POST.get('travel_id'))
+        seats = parse_int(request.POST.get('seats', 1))
+    except (TypeError, ValueError):
+        return JsonResponse({'error': "travel_id and seats must be numbers"}, status=400)
+    try:
+        hold = place_hold(request.traveler, travel_id, seats)
+    except BookingError as e:
+        return JsonResponse({'error': str(e)}, status=409)
+    return JsonResponse(_hold_json(hold), status=201)
+
+
+def seat_hold_api(request, hold_id, action):
+    """POST to confirm a hold into a booking, or to release it."""
+    if request.method != 'POST':
+        return JsonResponse({'error': "POST required"}, status=405)
+    if not request.traveler:
+        return JsonResponse({'error': "Login required"}, status=401)
+    hold = get_object_or_404(SeatHold, hold_id=hold_id, user_id=request.traveler.id)
+    if action == 'confirm':
+        try:
+            booking = confirm_hold(hold)
+        except BookingError as e:
+            return JsonResponse({'error': str(e)}, status=409)
+        return JsonResponse({**_hold_json(hold), 'booking_id': booking.booking_id, 'total_price': booking.total_price})
+    if not release_hold(hold):
+        hold.refresh_from_db(fields=['status'])
+    return JsonResponse(_hold_json(hold))
+
 
-    return render(request, "book.html")
 def my_bookings_view(request):
-    if 'user_id' not in request.session:
+    if not request.traveler:
         return redirect('login')
 
-    user = Register.objects.get(id=request.session['user_id'])
-    bookings = Booking.objects.filter(user=user).order_by('-journey_date')
+    user = request.traveler
+    # Keyset pagination: ?before=<booking_id> continues below the last row shown.
+    # Live and archived bookings are merged into one history.
+    bookings, next_before = booking_history_page(
+        user.id, MY_BOOKINGS_FIELDS, MY_BOOKINGS_PAGE_SIZE, parse_cursor(request.GET.get('before')),
+    )
+
+    return render(request, "my_bookings.html", {"bookings": bookings, "user": user, "next_before": next_before})
+
+
+def export_encoder(export_format):
+    """``(content type, header lines, row -> line)`` for an export format."""
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        return 'text/csv', [writer.writerow(EXPORT_HEADER)], writer.writerow
+    return (
+        'application/x-ndjson', [],
+        lambda row: json.dumps(dict(zip(EXPORT_HEADER, row)), cls=DjangoJSONEncoder) + '\n',
+    )
+
+
+def export_bookings_view(request):
+    if not request.traveler:
+        return redirect('login')
 
-    return render(request, "my_bookings.html", {"bookings": bookings, "user": user})
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return JsonResponse({'error': "format must be csv or ndjson"}, status=400)
 
+    rows = booking_history_rows(request.traveler.id, EXPORT_FIELDS, chunk_size=EXPORT_CHUNK_SIZE)
+    content_type, header, encode = export_encoder(export_format)
+    response = StreamingHttpResponse(itertools.chain(header, map(encode, rows)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="bookings.{export_format}"'
+    return response
 
 
+@require_POST
 def cancel_booking(request, booking_id):
-    booking = get_object_or_404(Booking, id=booking_id, user=request.user)
-    booking.status = "Cancelled"
-    booking.save()
+    if not request.traveler:
+        return redirect('login')
+
+    booking = get_object_or_404(
+        # user is loaded too: the cancellation event records it.
+        Booking.objects.select_related('travel_option').only(*MY_BOOKINGS_FIELDS, 'user'),
+        booking_id=booking_id, user_id=request.traveler.id,
+    )
+    cancel_reservation(booking)  # returns the seats to the travel option
     return redirect("my_bookings")
 def contact_view(request):
     if request.method == "POST":
-        fullname = request.POST.get("fullname")
-        email = request.POST.get("email")
-        message = request.POST.get("message")
+        submit_contact_form(request)
+
+    # The contact form lives on the home page
+    return redirect(reverse("home") + "#contact")
+
 
-        # Save to database
-        Contact.objects.create(fullname=fullname, email=email, message=message)
+def submit_contact_form(request):
+    # Submissions are spooled and written in batches by drain_contact_queue,
+    # so this never touches the database.
+    fullname = request.POST.get("fullname") or request.POST.get("full_name")  # home.html uses full_name
+    email = request.POST.get("email")
+    message = request.POST.get("message")
+    if not (fullname and email and message):
+        messages.error(request, "❌ Please fill in your name, email and message.")
+        return
 
+    outcome = contact_queue.submit(client_ip(request), fullname, email, message)
+    if outcome == contact_queue.RATE_LIMITED:
+        messages.error(request, "❌ Too many messages, please try again in a minute.")
+    elif outcome == contact_queue.INVALID:
+        messages.error(request, "❌ Please fill in your name, a valid email and your message.")
+    else:
+        # A duplicate within the dedupe window is acknowledged like a new message.
         messages.success(request, "✅ Your message has been sent successfully!")
-        return redirect("contact")  # redirect to same page
 
-    return render(request, "contact.html")
+
+# Travel search
+def travel_search_view(request):
+    context = {'params': request.GET}
+    if request.GET:
+        try:
+            options, next_cursor = search_travel_options(**parse_search_params(request.GET))
+            context['options'] = options
+            if next_cursor:
+                query = request.GET.copy()
+                query['cursor'] = next_cursor
+                context['next_query'] = query.urlencode()
+        except SearchError as e:
+            context['error'] = str(e)
+    return render(request, "search.html", context)
+
+
+def travel_search_api(request):
+    try:
+        options, next_cursor = search_travel_options(**parse_search_params(request.GET))
+    except SearchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'results': options, 'next_cursor': next_cursor})
+
+
+def route_summary_api(request):
+    source = (request.GET.get('source') or '').strip()
+    destination = (request.GET.get('destination') or '').strip()
+    day = parse_day(request.GET.get('date'))
+    if not source or not destination or not day:
+        return JsonResponse({'error': "source, destination and date are required"}, status=400)
+    return JsonResponse({
+        'source': source,
+        'destination': destination,
+        'date': day,
+        'availability': route_availability(source, destination, day),
+        'prices': route_price_range(source, destination, day),
+    })
+
+
+def itinerary_api(request):
+    try:
+        params = parse_itinerary_params(request.GET)
+    except ItineraryError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'source': params['source'],
+        'destination': params['destination'],
+        'date': params['day'],
+        'mode': params['mode'],
+        'itineraries': plan_itineraries(**params),
+    })
+
+
+# Longest range the fare calendar returns in one response.
+FARE_CALENDAR_MAX_DAYS = 92
+
+
+def fare_calendar_api(request):
+    source = (request.GET.get('source') or '').strip()
+    destination = (request.GET.get('destination') or '').strip()
+    if not source or not destination:
+        return JsonResponse({'error': "source and destination are required"}, status=400)
+    travel_type = request.GET.get('type') or None
+    if travel_type and travel_type not in dict(TravelOption.TRAVEL_TYPES):
+        return JsonResponse({'error': "type must be Flight, Train or Bus"}, status=400)
+    day_from, day_to = parse_day(request.GET.get('from')), parse_day(request.GET.get('to'))
+    if (request.GET.get('from') and not day_from) or (request.GET.get('to') and not day_to):
+        return JsonResponse({'error': "from and to must be dates (YYYY-MM-DD)"}, status=400)
+    day_from = day_from or timezone.localdate()
+    day_to = day_to or day_from + timedelta(days=29)
+    if day_from > day_to or (day_to - day_from).days >= FARE_CALENDAR_MAX_DAYS:
+        return JsonResponse({'error': f"from must not be after to, and at most {FARE_CALENDAR_MAX_DAYS} days apart"}, status=400)
+
+    return JsonResponse({
+        'source': source,
+        'destination': destination,
+        'type': travel_type,
+        'days': fare_calendar(source, destination, day_from, day_to, travel_type),
+    })
+
+
+def login_throttle_stats_api(request):
+    if not (request.user.is_active and request.user.is_staff):
+        return JsonResponse({'error': "Staff only"}, status=403)
+    return JsonResponse(login_throttle.stats())
+
+
+def route_cache_stats_api(request):
+    # The counters live in the route cache; with a per-process cache only a
+    # view running in the web worker can read them.
+    if not (request.user.is_active and request.user.is_staff):
+        return JsonResponse({'error': "Staff only"}, status=403)
+    return JsonResponse(route_cache_stats())
+
+
+# Longest range the route stats API returns in one response.
+ROUTE_STATS_MAX_DAYS = 366
+
+
+def route_stats_api(request):
+    # Staff are Django admin users, not travellers.
+    if not (request.user.is_active and request.user.is_staff):
+        return JsonResponse({'error': "Staff only"}, status=403)
+
+    source = (request.GET.get('source') or '').strip()
+    destination = (request.GET.get('destination') or '').strip()
+    if not source or not destination:
+        return JsonResponse({'error': "source and destination are required"}, status=400)
+    day_from, day_to = parse_day(request.GET.get('from')), parse_day(request.GET.get('to'))
+    if (request.GET.get('from') and not day_from) or (request.GET.get('to') and not day_to):
+        return JsonResponse({'error': "from and to must be dates (YYYY-MM-DD)"}, status=400)
+    day_to = day_to or timezone.localdate()
+    day_from = day_from or day_to - timedelta(days=29)
+    if day_from > day_to or (day_to - day_from).days >= ROUTE_STATS_MAX_DAYS:
+        return JsonResponse({'error': f"from must not be after to, and at most {ROUTE_STATS_MAX_DAYS} days apart"}, status=400)
+
+    travel_type = request.GET.get('type') or None
+    return JsonResponse({
+        'source': source,
+        'destination': destination,
+        'type': travel_type,
+        'from': day_from,
+        'to': day_to,
+        **route_report(source, destination, day_from, day_to, travel_type),
+    })
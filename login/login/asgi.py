@@ -12,5 +12,13 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'login.settings')
+os.environ.setdefault('DJANGO_ASGI', '1')
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', '1')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up. Static files are served outside the
+# middleware chain, which must stay async end to end (see home/asgi_static.py).
+from home.asgi_static import StaticFilesApp  # noqa: E402
+
+application = StaticFilesApp(django_application)
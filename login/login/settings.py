@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,9 +42,19 @@ INSTALLED_APPS = [
     'home',
 ]
 
+# login/asgi.py turns this on. WhiteNoiseMiddleware is sync-only, and under ASGI
+# it would push every request through one shared thread, so ASGI serves static
+# files from home.asgi_static.StaticFilesApp around the application instead.
+ASGI = os.environ.get('DJANGO_ASGI', '0') == '1'
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    *([] if ASGI else ['whitenoise.middleware.WhiteNoiseMiddleware']),
+    'home.middleware.ProfilingMiddleware',
+    'home.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'home.middleware.SlidingSessionMiddleware',
+    'home.middleware.TravelerMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -57,31 +68,255 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / "templates"],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'home.context_processors.template_fragments',
+            ],
+            # Compiled templates are kept in memory for the life of the worker.
+            # Under DEBUG the autoreloader clears them when a template changes.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
 ]
 
+# {% cache %} fragments of home.html: seconds they live, and the key version.
+# Leave the version unset to derive it from the template source.
+TEMPLATE_FRAGMENT_TIMEOUT = 3600
+TEMPLATE_FRAGMENT_VERSION = os.environ.get('TEMPLATE_FRAGMENT_VERSION') or None
+
 WSGI_APPLICATION = 'login.wsgi.application'
 
+# Serve the hot paths (register, login, home, book, my-bookings, search, contact) with
+# their async views. login/asgi.py turns this on; WSGI keeps the sync views.
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '0') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+#
+# DB_PROFILE selects the database:
+#   sqlite   - db.sqlite3 tuned for concurrent readers (WAL, relaxed fsync,
+#              busy timeout, mmap and a larger page cache). Default.
+#   postgres - PostgreSQL via psycopg 3, configured by the POSTGRES_* variables.
+#              With POSTGRES_POOL=1 (default) connections come from Django's
+#              psycopg pool (needs psycopg[pool]); otherwise they are kept
+#              open for POSTGRES_CONN_MAX_AGE seconds with health checks.
+# deployment_verification.py reports the active profile and its tuning.
+
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024)),  # negative = KiB
+    'temp_store': 'MEMORY',
+}
+
+if DB_PROFILE == 'postgres':
+    POSTGRES_POOL = os.environ.get('POSTGRES_POOL', '1') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'travelbuddy'),
+            'USER': os.environ.get('POSTGRES_USER', 'travelbuddy'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Pooling and persistent connections are mutually exclusive in Django.
+            'CONN_MAX_AGE': 0 if POSTGRES_POOL else int(os.environ.get('POSTGRES_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': not POSTGRES_POOL,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('POSTGRES_POOL_MIN', 2)),
+                    'max_size': int(os.environ.get('POSTGRES_POOL_MAX', 10)),
+                    'timeout': int(os.environ.get('POSTGRES_POOL_TIMEOUT', 10)),
+                },
+            } if POSTGRES_POOL else {},
+        }
+    }
+elif DB_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+                # Take the write lock when a transaction starts instead of
+                # failing to upgrade a read lock halfway through a booking.
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            },
+        }
+    }
+else:
+    raise ValueError(f"Unknown DB_PROFILE {DB_PROFILE!r}; use 'sqlite' or 'postgres'")
+
+# Read replicas (see home/db_router.py). Searches, fare calendars and booking
+# listings read from a replica; writes, and reads after a write, use the
+# primary. List them as comma-separated values:
+#   sqlite   - SQLITE_REPLICAS=/path/replica1.sqlite3,...  (e.g. copies kept in
+#              step with litestream, or a plain copy for local testing)
+#   postgres - POSTGRES_REPLICA_HOSTS=host[:port],...
+# Under test, replicas mirror the default database.
+if DB_PROFILE == 'postgres':
+    _replicas = [
+        {'HOST': host, 'PORT': port or DATABASES['default']['PORT']}
+        for host, _, port in (h.strip().partition(':') for h in os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',') if h.strip())
+    ]
+else:
+    _replicas = [{'NAME': path.strip()} for path in os.environ.get('SQLITE_REPLICAS', '').split(',') if path.strip()]
+for _n, _replica in enumerate(_replicas, 1):
+    DATABASES[f'replica{_n}'] = {**DATABASES['default'], **_replica, 'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['home.db_router.ReplicaRouter'] if DATABASE_REPLICAS else []
+# Seconds a browser keeps reading from the primary after one of its requests wrote.
+REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Three aliases, so that filling one never culls another: route lookups are
+# numerous and cheap to recompute, while culling a rate-limit counter resets
+# its limit. LocMemCache is per process; with several workers, point every
+# alias at a shared backend (Redis or Memcached, see deployment_guide.md).
+CACHES = {
+    # Sessions (cached_db), template fragments, itinerary change log, contact dedupe.
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'travelbuddy',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    # home/route_cache.py: route lookups, fare calendars and their hit/miss counters.
+    'routes': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'travelbuddy-routes',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    # home/ratelimit.py and home/login_throttle.py counters.
+    'counters': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'travelbuddy-counters',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+}
+# Shared cache for multi-worker deployments (`pip install redis`). Every alias
+# gets its own key prefix on the same server.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        alias: {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL, 'KEY_PREFIX': alias}
+        for alias in CACHES
     }
+
+# Seconds a cached route lookup (departures, availability, fares) stays valid.
+# Bookings and TravelOption edits evict the affected route immediately.
+ROUTE_CACHE_TIMEOUT = 300
+
+
+# Departures are moved to the archive tables this many days after they leave
+# (`python manage.py archive_departures`, e.g. nightly from cron).
+ARCHIVE_AFTER_DAYS = 30
+
+
+# Booking event log (home/events.py), read by `python manage.py consume_booking_events`.
+# Events are pruned this many days after every consumer has handled them.
+BOOKING_EVENT_RETENTION_DAYS = 7
+# On databases other than SQLite, consumers leave events this young alone so a
+# slower transaction that took a lower event id can still commit first.
+BOOKING_EVENT_SETTLE_SECONDS = 2
+
+
+# Outgoing mail. Booking emails are sent by `python manage.py dispatch_notifications`,
+# never during a request (see home/notifications.py).
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '0') == '1'
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'TravelsBuddy <no-reply@travelsbuddy.example>')
+
+NOTIFICATIONS_ENABLED = os.environ.get('NOTIFICATIONS_ENABLED', '1') == '1'
+NOTIFICATION_MAX_ATTEMPTS = 6
+NOTIFICATION_RETRY_BASE = 60  # seconds before the first retry, doubled on each one
+NOTIFICATION_RETRY_MAX = 3600
+NOTIFICATION_LEASE_SECONDS = 300  # a worker's claim on a batch; sending must finish within it
+
+
+# Seconds checkout holds seats before `manage.py sweep_seat_holds` hands them back.
+SEAT_HOLD_TTL = 600
+
+
+# Multi-leg itinerary planner (see home/itinerary.py). The timetable has no
+# arrival times, so each leg takes a fixed duration per travel type.
+ITINERARY_LEG_MINUTES = {'Flight': 120, 'Train': 360, 'Bus': 480}
+ITINERARY_MAX_LEGS = 3
+ITINERARY_MIN_TRANSFER_MINUTES = 45
+ITINERARY_MAX_TRIP_HOURS = 48  # latest arrival, counted from the start of the travel date
+ITINERARY_INDEX_MAX_AGE = 300  # seconds before a worker rebuilds its index regardless
+ITINERARY_CHANGE_LOG_TTL = 3600
+ITINERARY_CHANGE_LOG_SIZE = 1000  # cache keys the change log cycles through
+ITINERARY_MAX_REPLAY = 5000  # more pending changes than this rebuild the index instead
+
+
+# Seconds a worker may reuse a looked-up session user before re-reading it.
+TRAVELER_CACHE_TTL = 30
+TRAVELER_CACHE_MAX_ENTRIES = 10000
+
+
+# Request profiling (see home.middleware.ProfilingMiddleware). Off by default;
+# when off the middleware unloads itself and costs nothing.
+PROFILING_ENABLED = os.environ.get('DJANGO_PROFILING', '0') == '1'
+PROFILING_SAMPLE_RATE = int(os.environ.get('PROFILING_SAMPLE_RATE', '0'))  # cProfile 1 in N requests; 0 = never
+PROFILING_TRIGGER_TOKEN = os.environ.get('PROFILING_TRIGGER_TOKEN') or None  # "X-Profile: <token>" forces a profile
+PROFILING_DIR = Path(os.environ.get('PROFILING_DIR', BASE_DIR / 'profiles'))
+PROFILING_SLOW_QUERIES = 5  # slowest statements kept per request
+PROFILING_SLOW_QUERY_MS = 100  # statements slower than this are logged on their own
+PROFILING_SERVER_TIMING = True
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'home.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
 }
 
 
+# Contact form ingestion (see home/contact_queue.py)
+# Submissions are appended to a spool and written to the database in batches
+# by `python manage.py drain_contact_queue` (run it from cron or with --loop).
+CONTACT_SPOOL_DIR = Path(os.environ.get('CONTACT_SPOOL_DIR', BASE_DIR / 'spool' / 'contact'))
+CONTACT_RATE_LIMIT = (5, 60)  # messages per IP per window (seconds)
+CONTACT_DEDUPE_WINDOW = 600  # seconds an identical message is ignored
+CONTACT_MESSAGE_MAX_LENGTH = 5000  # longer messages are cut to this many characters
+
+# Failed logins allowed per scope over a sliding window (failures, seconds)
+# before further attempts are refused without checking the password.
+# None turns throttling off.
+LOGIN_RATE_LIMITS = {'ip': (30, 300), 'email': (5, 300)}
+
+# Request header holding the client IP when behind a trusted proxy,
+# e.g. 'HTTP_X_FORWARDED_FOR'. None uses REMOTE_ADDR.
+CLIENT_IP_HEADER = os.environ.get('CLIENT_IP_HEADER') or None
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -101,10 +336,65 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+#
+# PASSWORD_HASHER picks the hasher for new passwords; the others stay listed
+# so older hashes still verify, and they are rehashed on the next login.
+# Use `python manage.py bench_password_hashers` to size the costs below
+# against the login latency budget.
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+
+PASSWORD_HASHER_CHOICES = {
+    'pbkdf2': 'home.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'home.hashers.TunedScryptPasswordHasher',
+    'argon2': 'home.hashers.TunedArgon2PasswordHasher',  # needs argon2-cffi
+}
+
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER
+]
+
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 1_000_000))
+
+SCRYPT_WORK_FACTOR = int(os.environ.get('SCRYPT_WORK_FACTOR', 2 ** 14))
+SCRYPT_BLOCK_SIZE = int(os.environ.get('SCRYPT_BLOCK_SIZE', 8))
+SCRYPT_PARALLELISM = int(os.environ.get('SCRYPT_PARALLELISM', 1))
+
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 102400))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 8))
+
+# Threads that async views hand password hashing to (default: CPU count).
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None
+
+
 # Session settings
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/
+#
+# SESSION_MODE picks where sessions live:
+#   cached_db      - read from the cache, written through to the database (default)
+#   cache          - cache only; needs a shared cache backend with several workers
+#   signed_cookies - no server-side storage at all
+#   db             - database only
+# Sessions are no longer saved on every request: SlidingSessionMiddleware
+# rewrites one only when less than SESSION_REFRESH_FRACTION of its lifetime
+# is left. `python manage.py bench_sessions` compares the modes.
+
+SESSION_MODE = os.environ.get('SESSION_MODE', 'cached_db')
+
+SESSION_ENGINE = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}[SESSION_MODE]
+
 SESSION_COOKIE_AGE = 1209600  # 2 weeks in seconds
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
-SESSION_SAVE_EVERY_REQUEST = True
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_FRACTION = 0.5
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -122,7 +412,19 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = '/static/'
-STATIC_ROOT = '/home/monumaurya/travelsbuddy-a-website-for-tourist-/statics'
+STATIC_ROOT = os.environ.get('STATIC_ROOT', '/home/monumaurya/travelsbuddy-a-website-for-tourist-/statics')
+
+# collectstatic writes content-hashed copies of every asset plus .gz and .br
+# variants, and WhiteNoise serves them straight from STATIC_ROOT: hashed
+# names get a one-year "immutable" Cache-Control, and clients that accept
+# brotli or gzip get the precompressed file without recompressing per request.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
+# Tests render templates without a collectstatic run; see home/test_runner.py.
+TEST_RUNNER = 'home.test_runner.TestRunner'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field